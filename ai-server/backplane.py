@@ -0,0 +1,160 @@
+import json, os, queue, sqlite3, threading, time
+from typing import Callable, Optional
+
+# Shared log for `uvicorn --workers N`: every worker appends the events it emits and the
+# call records it finishes to one SQLite file in WAL mode, and tails it for everyone
+# else's rows, so each worker's /events stream and /metrics cover all workers.
+# No broker process: SQLite handles the cross-process locking.
+BACKPLANE_DB      = os.environ.get("BACKPLANE_DB", "")                 # e.g. /dev/shm/timephone.db; "" = single process
+BACKPLANE_POLL_MS = float(os.environ.get("BACKPLANE_POLL_MS", "50"))
+BACKPLANE_KEEP    = int(os.environ.get("BACKPLANE_KEEP", "5000"))      # rows kept in the shared log
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS log (
+    seq    INTEGER PRIMARY KEY AUTOINCREMENT,
+    worker INTEGER NOT NULL,
+    kind   TEXT NOT NULL,          -- 'event' | 'metric'
+    body   TEXT NOT NULL,          -- JSON
+    ts     REAL NOT NULL
+);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class Backplane:
+    """
+    publish_*() only enqueue; a writer thread inserts in batches (one transaction per
+    flush) and trims old rows. A poller thread reads rows past its cursor written by
+    other workers and hands them to on_event(json_text) / on_metric(record).
+    """
+
+    def __init__(self, path: str, on_event: Callable[[str], None], on_metric: Callable[[dict], None],
+                 poll_ms: float = BACKPLANE_POLL_MS, keep: int = BACKPLANE_KEEP):
+        self.path = path
+        self.worker = os.getpid()
+        self.on_event = on_event
+        self.on_metric = on_metric
+        self.poll = poll_ms / 1000.0
+        self.keep = keep
+        self._q: "queue.Queue[tuple[str, str]]" = queue.Queue(maxsize=10000)
+        self.published = 0
+        self.ingested = 0
+        self.dropped = 0
+        self.errors = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = _connect(path)
+        conn.executescript(_SCHEMA)
+        row = conn.execute("SELECT MAX(seq) FROM log").fetchone()
+        self.cursor = row[0] or 0
+        self._conn_r = conn
+
+    def warm(self, events: int, metrics: int) -> None:
+        """Load recent history written before this worker started (ring buffers, /metrics)."""
+        for kind, n, fn in (("event", events, self.on_event), ("metric", metrics, self.on_metric)):
+            rows = self._conn_r.execute(
+                "SELECT body FROM log WHERE kind = ? AND seq <= ? ORDER BY seq DESC LIMIT ?",
+                (kind, self.cursor, n)).fetchall()
+            for (body,) in reversed(rows):
+                try:
+                    fn(body if kind == "event" else json.loads(body))
+                except Exception:
+                    pass
+
+    def start(self) -> None:
+        threading.Thread(target=self._writer, name="backplane-writer", daemon=True).start()
+        threading.Thread(target=self._poller, name="backplane-poller", daemon=True).start()
+
+    # ---- publish ----
+    def publish_event(self, ev: dict, text: str) -> None:
+        self._put("event", text)
+
+    def publish_metric(self, record: dict) -> None:
+        self._put("metric", json.dumps(record, ensure_ascii=False, default=str))
+
+    def _put(self, kind: str, body: str) -> None:
+        try:
+            self._q.put_nowait((kind, body))
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer(self) -> None:
+        conn = _connect(self.path)
+        last_trim = time.monotonic()
+        while True:
+            batch = [self._q.get()]
+            time.sleep(0.005)  # let a burst (stt_done, llm_start, …) share one transaction
+            while len(batch) < 500:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            now = time.time()
+            try:
+                with conn:
+                    conn.execute("BEGIN")
+                    conn.executemany("INSERT INTO log (worker, kind, body, ts) VALUES (?, ?, ?, ?)",
+                                     [(self.worker, k, b, now) for k, b in batch])
+                self.published += len(batch)
+            except Exception:
+                self.errors += 1
+            if time.monotonic() - last_trim > 10:
+                last_trim = time.monotonic()
+                try:
+                    conn.execute("DELETE FROM log WHERE seq <= (SELECT MAX(seq) FROM log) - ?", (self.keep,))
+                except Exception:
+                    pass
+
+    # ---- consume ----
+    def _poller(self) -> None:
+        conn = self._conn_r
+        while True:
+            try:
+                rows = conn.execute(
+                    "SELECT seq, worker, kind, body FROM log WHERE seq > ? ORDER BY seq LIMIT 500",
+                    (self.cursor,)).fetchall()
+            except Exception:
+                self.errors += 1
+                rows = []
+            for seq, worker, kind, body in rows:
+                self.cursor = seq
+                if worker == self.worker:
+                    continue
+                try:
+                    if kind == "event":
+                        self.on_event(body)
+                    else:
+                        self.on_metric(json.loads(body))
+                    self.ingested += 1
+                except Exception:
+                    self.errors += 1
+            if len(rows) < 500:
+                time.sleep(self.poll)
+
+    def stats(self) -> dict:
+        return {
+            "db": self.path,
+            "worker": self.worker,
+            "published": self.published,
+            "ingested": self.ingested,
+            "pending": self._q.qsize(),
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+def start(on_event: Callable[[str], None], on_metric: Callable[[dict], None],
+          warm_events: int = 200, warm_metrics: int = 50) -> Optional[Backplane]:
+    """Backplane for BACKPLANE_DB, or None when running single-process."""
+    if not BACKPLANE_DB:
+        return None
+    bp = Backplane(BACKPLANE_DB, on_event, on_metric)
+    bp.warm(warm_events, warm_metrics)
+    bp.start()
+    return bp
@@ -0,0 +1,60 @@
+"""
+resample.resample() vs the old np.interp resample_audio at the rates the server uses
+(Piper low/medium voices are 16 kHz / 22.05 kHz, Whisper wants 16 kHz). Expect
+polyphase to lose at 16->22.05 and 48->16 kHz: see the note at the top of resample.py.
+
+    python bench/resample_bench.py [--seconds 10] [--repeat 5]
+"""
+import argparse, os, sys, time, tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from resample import resample  # noqa: E402
+
+PAIRS = [(22050, 16000), (16000, 22050), (22050, 24000), (48000, 16000)]
+
+
+def interp_resample(y: np.ndarray, src_sr: int, dst_sr: int) -> np.ndarray:
+    """The previous server.resample_audio."""
+    if src_sr == dst_sr:
+        return y
+    x_old = np.linspace(0, 1, num=len(y), endpoint=False, dtype=np.float64)
+    n_new = int(round(len(y) * (dst_sr / float(src_sr))))
+    x_new = np.linspace(0, 1, num=n_new, endpoint=False, dtype=np.float64)
+    return np.interp(x_new, x_old, y.astype(np.float64)).astype(np.float32)
+
+
+def measure(fn, y, src, dst, repeat):
+    fn(y, src, dst)  # warm filter caches
+    best = min(_timed(fn, y, src, dst) for _ in range(repeat))
+    tracemalloc.start()
+    fn(y, src, dst)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def _timed(fn, y, src, dst):
+    t0 = time.perf_counter()
+    fn(y, src, dst)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'pair':>14} {'impl':>10} {'ms':>8} {'Msamp/s':>8} {'peak MiB':>9}")
+    for src, dst in PAIRS:
+        y = (0.1 * rng.standard_normal(int(src * args.seconds))).astype(np.float32)
+        for name, fn in (("np.interp", interp_resample), ("polyphase", resample)):
+            sec, peak = measure(fn, y, src, dst, args.repeat)
+            print(f"{src:>6}->{dst:<6} {name:>10} {sec * 1000:8.1f} {len(y) / sec / 1e6:8.1f} {peak / 2**20:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Micro-benchmarks for the server's hot functions, at call-sized inputs: 30 s clips,
+10-sentence replies, a full 1000-event bus with 20 subscribers, /metrics over a full
+ring. Results go to JSON; --compare fails (exit 1) when a case got slower than the
+baseline by more than --threshold.
+
+    python bench/suite.py --json bench/results.json
+    python bench/suite.py --save-baseline                  # → bench/baseline.json (per machine, not committed)
+    python bench/suite.py --compare bench/baseline.json --threshold 0.15
+"""
+import argparse, asyncio, atexit, io, json, os, platform, statistics, sys, time
+
+# keep the import side-effect free: no call log, trace file, prewarmed voices or disk cache
+for k, v in (("CALLLOG_DB", ""), ("TRACE_FILE", ""), ("PERSONAS_PREWARM", "0"),
+             ("PERSONAS_POLL_SEC", "0"), ("TTS_CACHE_DIR", ""), ("BACKPLANE_DB", "")):
+    os.environ.setdefault(k, v)
+
+import numpy as np  # noqa: E402
+import soundfile as sf  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+import server  # noqa: E402
+from events import EventBus  # noqa: E402
+
+BASELINE = os.path.join(HERE, "baseline.json")
+REPLY = ("Ah, you ask about relativity! Time is not the same for everyone. "
+         "Imagine two trains passing each other in the night. Each passenger sees the other's clock running slow. "
+         "Is that not strange? Yet it is measured every day by satellites above us. "
+         "Light always travels at the same speed, no matter who measures it. "
+         "So space and time must bend to keep it so. Gravity, too, slows the clocks near a heavy star. "
+         "I spent ten years on that idea. Curiosity has its own reason for existing.")
+
+
+def _wav(sec: float, sr: int) -> bytes:
+    y = (np.sin(np.arange(int(sec * sr)) * 0.05) * 0.3).astype(np.float32)
+    b = io.BytesIO()
+    sf.write(b, y, sr, format="WAV", subtype="PCM_16")
+    return b.getvalue()
+
+
+def _record(i: int) -> dict:
+    return {"ts": "2025-01-01T00:00:00Z", "call_id": f"c{i}", "persona": ("einstein", "curie")[i % 2],
+            "name": "Albert Einstein", "transcript": "what is relativity " * 3, "reply_preview": REPLY[:200],
+            "llm_used": i % 5 != 0, "ms": {"stt": 300 + i % 97, "llm": 900 + i % 311, "llm_ttft": 200 + i % 53,
+                                           "tts": 600 + i % 211, "first_audio": 1200 + i % 157, "total": 2000 + i % 503}}
+
+
+# ---------- cases: name → setup() returning the zero-arg callable to time ----------
+def case_resample_30s_22k_16k():
+    y = (np.random.default_rng(0).standard_normal(30 * 22050) * 0.1).astype(np.float32)
+    return lambda: server.resample_audio(y, 22050, 16000)
+
+
+def case_resample_30s_16k_48k():
+    y = (np.random.default_rng(0).standard_normal(30 * 16000) * 0.1).astype(np.float32)
+    return lambda: server.resample_audio(y, 16000, 48000)
+
+
+def case_concat_clips_encode_10_sentences():
+    """The non-stream /converse tail: join the sentence clips, encode one WAV."""
+    clips = [_wav(2.5 + 0.3 * i, 22050) for i in range(10)]
+
+    def run():
+        y, sr = server.concat_clips(clips, target_sr=None, pause_ms=120)
+        return server.reply_codec.encode(y, sr, "wav")
+    return run
+
+
+def case_tts_clips_10_sentences_pool():
+    """
+    _tts_clips (the live TTS path) over 10 sentences on a PiperPool of the load test's
+    fake Piper (near-zero synthesis time): pool checkout, worker round trips, executor
+    hand-offs and ordering. Text changes every run so the TTS cache never hits.
+    """
+    fake = os.path.join(HERE, "..", "..", "loadtest")
+    os.environ.update(FAKE_PIPER_LOAD_SEC="0", FAKE_PIPER_RTF="0", FAKE_PIPER_CHAR_SEC="0.0005")
+    server.PIPER_POOL = server.PiperPool(os.path.join(fake, "fake_piper.py"), size=2)
+    atexit.register(server.PIPER_POOL.close)
+    voice = os.path.join(fake, "fake_voice.onnx")
+    loop = asyncio.new_event_loop()
+    n = [0]
+
+    async def sentences():
+        for i in range(10):
+            yield f"Sentence {n[0]} number {i}."
+
+    async def clips():
+        return [c async for c in server._tts_clips(sentences(), voice, voice + ".json", "bench", {})]
+
+    def run():
+        n[0] += 1
+        assert len(loop.run_until_complete(clips())) == 10
+    return run
+
+
+def case_split_and_punctuate_10_sentences():
+    return lambda: [server.clean_and_punctuate(s) for s in server.split_sentences(REPLY)]
+
+
+def case_sentence_splitter_token_stream():
+    tokens = [w + " " for w in REPLY.split(" ")]
+
+    def run():
+        sp = server.SentenceSplitter()
+        for t in tokens:
+            sp.feed(t)
+        sp.flush()
+    return run
+
+
+def case_eventbus_sse_encode():
+    bus = EventBus()
+    ev = {"id": "x" * 36, "ts": "2025-01-01T00:00:00Z", "type": "llm_done", "text": "LLM done",
+          "call_id": "c" * 36, "data": {"ms": 812, "used": True, "reply": REPLY[:500], "audio": io.BytesIO()}}
+    return lambda: bus._sse(ev)
+
+
+def case_eventbus_emit_1000_buffered_20_subscribers():
+    """emit() on the loop that owns the queues, ring full, 20 /events clients (some lagging)."""
+    loop = asyncio.new_event_loop()
+    bus = EventBus(max_events=1000)
+
+    async def _subscribe():
+        for _ in range(20):
+            bus.subscribe()
+        for i in range(1000):
+            bus.emit("tts_start", "TTS…", f"c{i}", sentence=i)
+    loop.run_until_complete(_subscribe())
+
+    async def _emit():
+        bus.emit("llm_done", "LLM done", "call", ms=812, used=True, reply=REPLY[:500])
+
+    def run():
+        loop.run_until_complete(_emit())
+    return run
+
+
+def case_metrics_endpoint_full_ring():
+    server.METRICS.clear()
+    server.LATENCY = type(server.LATENCY)()
+    for i in range(max(server.METRICS_CAP, 1000)):
+        server._ingest_metric(_record(i))
+    return server.metrics
+
+
+def case_latency_prometheus_1000_calls():
+    case_metrics_endpoint_full_ring()
+    return server.LATENCY.prometheus
+
+
+CASES = {name[5:]: fn for name, fn in sorted(globals().items()) if name.startswith("case_")}
+
+
+# ---------- runner ----------
+def measure(fn, min_time: float, repeat: int) -> dict:
+    """Calibrate loops so one round takes ≥ min_time, then time `repeat` rounds (per-call µs)."""
+    fn()
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        dt = time.perf_counter() - t0
+        if dt >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10 if dt < min_time / 10 else 2
+    rounds = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        rounds.append((time.perf_counter() - t0) / loops * 1e6)
+    return {"median_us": round(statistics.median(rounds), 2), "best_us": round(min(rounds), 2),
+            "stdev_us": round(statistics.pstdev(rounds), 2), "loops": loops, "repeat": repeat}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Cases whose median is more than `threshold` (fraction) above the baseline's."""
+    print(f"\n{'case':<48}{'base µs':>12}{'now µs':>12}{'change':>9}")
+    slower = []
+    for name, r in results.items():
+        b = baseline.get("results", {}).get(name)
+        if not b:
+            print(f"{name:<48}{'-':>12}{r['median_us']:>12.1f}{'new':>9}")
+            continue
+        change = r["median_us"] / b["median_us"] - 1 if b["median_us"] else 0.0
+        flag = "  << slower" if change > threshold else ""
+        print(f"{name:<48}{b['median_us']:>12.1f}{r['median_us']:>12.1f}{change:>+9.1%}{flag}")
+        if change > threshold:
+            slower.append(name)
+    return slower
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-k", "--filter", default="", help="only cases whose name contains this")
+    ap.add_argument("--min-time", type=float, default=0.2, help="seconds per timed round")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", help="write results here")
+    ap.add_argument("--save-baseline", action="store_true", help=f"write results to {os.path.relpath(BASELINE)}")
+    ap.add_argument("--compare", nargs="?", const=BASELINE, help="baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown (0.15 = 15%%)")
+    args = ap.parse_args()
+
+    results = {}
+    for name, setup in CASES.items():
+        if args.filter not in name:
+            continue
+        r = results[name] = measure(setup(), args.min_time, args.repeat)
+        print(f"{name:<48}{r['median_us']:>12.1f} µs  (best {r['best_us']:.1f}, ±{r['stdev_us']:.1f}, {r['loops']} loops)")
+
+    out = {"meta": {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                    "numpy": np.__version__, "machine": platform.machine(), "node": platform.node()},
+           "results": results}
+    for path in filter(None, (args.json, BASELINE if args.save_baseline else None)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
+        print(f"wrote {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            slower = compare(results, json.load(f), args.threshold)
+        if slower:
+            print(f"\n{len(slower)} case(s) slower than baseline by > {args.threshold:.0%}: {', '.join(slower)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import atexit, json, os, queue, sqlite3, threading, time
+from datetime import datetime
+from typing import Optional
+
+# Every finished call, on disk (SQLite WAL). Inserts are queued and written in batches by
+# one thread, so converse never waits on the disk. Each worker writes its own calls.
+CALLLOG_DB = os.environ.get("CALLLOG_DB", os.path.join(os.path.dirname(__file__), "calls.db"))  # "" = off
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    call_id    TEXT,
+    ts         REAL NOT NULL,        -- epoch seconds
+    persona    TEXT,
+    llm_used   INTEGER,
+    total_ms   INTEGER,
+    record     TEXT NOT NULL         -- the full metrics record, JSON
+);
+CREATE INDEX IF NOT EXISTS calls_ts       ON calls (ts);
+CREATE INDEX IF NOT EXISTS calls_persona  ON calls (persona, id);
+CREATE INDEX IF NOT EXISTS calls_total_ms ON calls (total_ms);
+"""
+
+
+def _epoch(ts) -> float:
+    """Epoch seconds from a number or an ISO-8601 string (trailing Z allowed)."""
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    try:
+        return float(ts)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(ts).replace("Z", "+00:00")).timestamp()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class CallLog:
+    def __init__(self, path: str = CALLLOG_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._read = _connect(path)
+        self._read.executescript(_SCHEMA)
+        self._read_lock = threading.Lock()
+        self._q: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=10000)
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._writer, name="calllog-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, record: dict) -> None:
+        try:
+            self._q.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer(self) -> None:
+        conn = _connect(self.path)
+        while True:
+            batch = [self._q.get()]
+            time.sleep(0.05)  # calls finishing together share one transaction
+            while len(batch) < 500:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            rows = []
+            for r in batch:
+                if r is None:
+                    continue
+                try:
+                    rows.append((r.get("call_id"), _epoch(r.get("ts", time.time())), r.get("persona"),
+                                 1 if r.get("llm_used") else 0, (r.get("ms") or {}).get("total"),
+                                 json.dumps(r, ensure_ascii=False, default=str)))
+                except Exception:
+                    self.errors += 1
+            try:
+                with conn:
+                    conn.executemany("INSERT INTO calls (call_id, ts, persona, llm_used, total_ms, record) "
+                                     "VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self.written += len(rows)
+            except Exception:
+                self.errors += 1
+            if stop:
+                conn.close()
+                return
+
+    def query(self, persona: Optional[str] = None, since=None, slow_ms: Optional[int] = None,
+              cursor: Optional[int] = None, limit: int = 50) -> dict:
+        """Newest first, keyset-paginated on id: pass back next_cursor for the following page."""
+        where, args = [], []
+        if persona:
+            where.append("persona = ?"); args.append(persona)
+        if since not in (None, ""):
+            where.append("ts >= ?"); args.append(_epoch(since))
+        if slow_ms is not None:
+            where.append("total_ms >= ?"); args.append(int(slow_ms))
+        if cursor is not None:
+            where.append("id < ?"); args.append(int(cursor))
+        sql = "SELECT id, record FROM calls"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        args.append(max(1, min(int(limit), 500)))
+        with self._read_lock:
+            rows = self._read.execute(sql, args).fetchall()
+        items = [dict(json.loads(rec), id=i) for i, rec in rows]
+        return {"items": items, "next_cursor": rows[-1][0] if len(rows) == args[-1] else None}
+
+    def stats(self) -> dict:
+        return {"db": self.path, "written": self.written, "pending": self._q.qsize(),
+                "dropped": self.dropped, "errors": self.errors}
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._q.put(None)
+            self._thread.join(timeout=2)
@@ -1,11 +1,11 @@
-import asyncio, json, uuid, io
+import asyncio, json, re, threading, uuid, io
 from collections import deque
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Request
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 
 
 def _now_iso() -> str:
@@ -30,28 +30,95 @@ def _safe_default(o):
 # -------------------------------------------------------------------------
 
 
+class _Subscriber:
+    """One /events client: a bounded queue of pre-encoded SSE frames."""
+
+    def __init__(self, maxsize: int, start: int = 0):
+        self.q: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=maxsize)
+        self.start = start  # first sequence number not covered by this client's backlog
+        self.dropped = 0   # total for this client
+        self.lagged = 0    # dropped since the client last caught up
+
+
 class EventBus:
-    def __init__(self, max_events: int = 1000):
+    """
+    Events are encoded to SSE bytes once, at emit time, and the same bytes go to every
+    subscriber. Subscriber queues are bounded: when a client falls behind, its oldest
+    undelivered frame is dropped (counted) and it gets a "lag" event before the next one.
+    The last `max_events` frames are kept in an id-indexed ring so a reconnecting client
+    resumes right after its Last-Event-ID.
+    """
+
+    def __init__(self, max_events: int = 1000, queue_size: int = 256, replay: int = 200):
         self.events: "deque[dict]" = deque(maxlen=max_events)
-        self.subscribers: "set[asyncio.Queue]" = set()
+        self._frames: "deque[bytes]" = deque(maxlen=max_events)  # SSE bytes, same order as events
+        self._index: Dict[str, int] = {}                         # event id → sequence number
+        self._seq = 0                                            # sequence number of the next event
+        self.queue_size = queue_size
+        self.replay = replay
+        self.subscribers: "set[_Subscriber]" = set()
+        self.emitted = 0
+        self.dropped = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.on_emit: Optional[Callable[[dict, str], None]] = None  # backplane hook: (event, JSON text)
+
+    @staticmethod
+    def _frame(ev_id: str, ev_type: str, data: str) -> bytes:
+        return f"id: {ev_id}\nevent: {ev_type}\ndata: {data}\n\n".encode("utf-8")
 
     def _sse(self, ev: dict) -> bytes:
         # Use safe default so odd objects (e.g., BytesIO) won't crash json.dumps
-        return (f"id: {ev['id']}\n"
-                f"event: {ev['type']}\n"
-                f"data: {json.dumps(ev, ensure_ascii=False, default=_safe_default)}\n\n").encode("utf-8")
+        return self._frame(ev["id"], ev["type"], json.dumps(ev, ensure_ascii=False, default=_safe_default))
 
-    async def _broadcast(self, ev: dict):
-        dead = []
-        for q in list(self.subscribers):
-            try:
-                q.put_nowait(ev)
-            except Exception:
-                dead.append(q)
-        for q in dead:
-            self.subscribers.discard(q)
+    def subscribe(self, last_event_id: Optional[str] = None) -> Tuple[_Subscriber, list]:
+        """
+        Register a client and return it with its backlog, taken under the same lock. A frame
+        published from a worker thread just before this is in the backlog but may still be
+        broadcast afterwards; its sequence number is below sub.start, so it isn't sent twice.
+        """
+        self._loop = asyncio.get_running_loop()
+        with self._lock:
+            sub = _Subscriber(self.queue_size, start=self._seq)
+            self.subscribers.add(sub)
+            return sub, self._backlog(last_event_id)
+
+    def unsubscribe(self, sub: _Subscriber) -> None:
+        self.subscribers.discard(sub)
+
+    def backlog(self, last_event_id: Optional[str]) -> list:
+        """Frames after last_event_id if it's still in the ring, else the last `replay` frames."""
+        with self._lock:
+            return self._backlog(last_event_id)
+
+    def _backlog(self, last_event_id: Optional[str]) -> list:
+        frames = list(self._frames)
+        seq = self._index.get(last_event_id) if last_event_id else None
+        if seq is None:
+            return frames[-self.replay:] if self.replay else []
+        first = self._seq - len(frames)
+        return frames[seq - first + 1:]
+
+    def _broadcast(self, seq: int, frame: bytes) -> None:
+        for sub in list(self.subscribers):
+            if seq < sub.start:
+                continue  # already in this client's backlog
+            if sub.q.full():
+                try:
+                    sub.q.get_nowait()  # drop-oldest
+                except asyncio.QueueEmpty:
+                    pass
+                sub.dropped += 1
+                sub.lagged += 1
+                self.dropped += 1
+            sub.q.put_nowait(frame)
 
     def emit(self, ev_type: str, text: str = "", call_id: Optional[str] = None, **data) -> dict:
+        return self.emit_data(ev_type, text, call_id, data)
+
+    def emit_data(self, ev_type: str, text: str = "", call_id: Optional[str] = None,
+                  data: Optional[Dict[str, Any]] = None) -> dict:
+        """emit() with the payload as a dict, for data whose keys we don't control (client events)."""
         ev = {
             "id": str(uuid.uuid4()),
             "ts": _now_iso(),
@@ -60,40 +127,80 @@ class EventBus:
             "call_id": call_id,
             "data": data or {},
         }
-        self.events.append(ev)
+        payload = json.dumps(ev, ensure_ascii=False, default=_safe_default)
+        self._publish(ev, self._frame(ev["id"], ev_type, payload))
+        if self.on_emit is not None:
+            try:
+                self.on_emit(ev, payload)
+            except Exception:
+                pass
+        return ev
+
+    def ingest(self, text: str) -> None:
+        """An event another worker emitted (JSON text from the backplane): buffer + fan out locally."""
+        ev = json.loads(text)
+        self._publish(ev, self._frame(ev["id"], ev["type"], text))
+
+    def _publish(self, ev: dict, frame: bytes) -> None:
+        with self._lock:
+            if len(self._frames) == self._frames.maxlen:
+                self._index.pop(self.events[0]["id"], None)
+            self.events.append(ev)
+            self._frames.append(frame)
+            seq = self._index[ev["id"]] = self._seq
+            self._seq += 1
+            self.emitted += 1
+        if not self.subscribers:
+            return
         try:
-            loop = asyncio.get_running_loop()
-            loop.create_task(self._broadcast(ev))
+            on_loop = asyncio.get_running_loop() is self._loop
         except RuntimeError:
-            # No running loop (e.g., during sync init) — skip broadcast
-            pass
-        return ev
+            on_loop = False
+        if on_loop:
+            self._broadcast(seq, frame)
+        elif self._loop is not None and not self._loop.is_closed():
+            # emitted from a worker thread: hand the frame to the loop that owns the queues
+            self._loop.call_soon_threadsafe(self._broadcast, seq, frame)
+
+    def stats(self) -> dict:
+        subs = list(self.subscribers)
+        return {
+            "subscribers": len(subs),
+            "queue_size": self.queue_size,
+            "max_queued": max((s.q.qsize() for s in subs), default=0),
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+            "buffered": len(self._frames),
+        }
 
 
 import os
-event_bus = EventBus(max_events=int(os.environ.get("EVENTS_MAX", "1000")))
+event_bus = EventBus(max_events=int(os.environ.get("EVENTS_MAX", "1000")),
+                     queue_size=int(os.environ.get("EVENTS_QUEUE_MAX", "256")))
 
 # Routers
 sse_router = APIRouter()
 event_router = APIRouter()
 
 @sse_router.get("/events")
-async def events(request: Request):
-    q: asyncio.Queue = asyncio.Queue()
-    event_bus.subscribers.add(q)
+async def events(request: Request, last_event_id: Optional[str] = None):
+    """SSE stream. Resumes after the Last-Event-ID header (or ?last_event_id=) when it's still buffered."""
+    sub, backlog = event_bus.subscribe(request.headers.get("last-event-id") or last_event_id)
 
     async def gen():
-        # Send last 200 events to new subscribers
-        for ev in list(event_bus.events)[-200:]:
-            yield event_bus._sse(ev)
         try:
+            for frame in backlog:
+                yield frame
             while True:
                 if await request.is_disconnected():
                     break
-                ev = await q.get()
-                yield event_bus._sse(ev)
+                frame = await sub.q.get()
+                if sub.lagged:
+                    yield (f"event: lag\ndata: {json.dumps({'type': 'lag', 'dropped': sub.lagged})}\n\n").encode("utf-8")
+                    sub.lagged = 0
+                yield frame
         finally:
-            event_bus.subscribers.discard(q)
+            event_bus.unsubscribe(sub)
 
     return StreamingResponse(
         gen(),
@@ -111,9 +218,63 @@ class ClientEvent(BaseModel):
     text: Optional[str] = ""
     call_id: Optional[str] = None
     data: Optional[Dict[str, Any]] = None
+    ts: Optional[str] = None  # when the client queued it (batches arrive late)
+
+
+class ClientEventBatch(BaseModel):
+    events: List[Any]  # checked one by one, so one bad event doesn't sink the batch
+    dropped: int = 0   # events the client's queue discarded since its last batch
+
+
+EVENTS_BATCH_MAX = int(os.environ.get("EVENTS_BATCH_MAX", "500"))
+_EVENT_TYPE = re.compile(r"[A-Za-z0-9_.:-]{1,64}")  # also keeps SSE framing intact (no newlines)
+
+
+def _client_event(raw: Any) -> ClientEvent:
+    """Validate one client event; ValueError says what's wrong with it."""
+    try:
+        ev = raw if isinstance(raw, ClientEvent) else ClientEvent.model_validate(raw)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, x['loc']))}: {x['msg']}" for x in e.errors())) from None
+    if not _EVENT_TYPE.fullmatch(ev.type):
+        raise ValueError(f"type: must match {_EVENT_TYPE.pattern}")
+    return ev
+
+
+def _emit_client(ev: ClientEvent) -> None:
+    data = dict(ev.data or {})
+    if ev.ts:
+        data.setdefault("client_ts", ev.ts)
+    event_bus.emit_data(ev.type, ev.text or "", ev.call_id, data)
 
 
 @event_router.post("/event")
 async def post_event(ev: ClientEvent):
-    event_bus.emit(ev.type, ev.text or "", ev.call_id, **(ev.data or {}))
+    try:
+        _emit_client(_client_event(ev))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=422)
     return {"ok": True}
+
+
+@event_router.post("/events/batch")
+async def post_events_batch(batch: ClientEventBatch):
+    """
+    Many client events in one request, emitted in order (the Pi's telemetry sender).
+    Invalid events are skipped and listed in "rejected"; the rest still go out, so a
+    retry never has to resend (and duplicate) the good ones.
+    """
+    if len(batch.events) > EVENTS_BATCH_MAX:
+        return JSONResponse({"error": f"more than {EVENTS_BATCH_MAX} events"}, status_code=413)
+    n, rejected = 0, []
+    for i, raw in enumerate(batch.events):
+        try:
+            _emit_client(_client_event(raw))
+            n += 1
+        except ValueError as e:
+            rejected.append({"index": i, "error": str(e)})
+    if batch.dropped:
+        event_bus.emit("telemetry_dropped", "Client dropped events", None, dropped=batch.dropped)
+    if rejected:
+        event_bus.emit("telemetry_rejected", "Client sent bad events", None, rejected=len(rejected))
+    return {"ok": not rejected, "n": n, "rejected": rejected}
@@ -0,0 +1,160 @@
+import os, threading
+from typing import Callable, Optional
+from math import ceil, log2
+
+# Log-bucketed histograms: SUB buckets per doubling (~9% relative error), 1 ms .. 2^MAX_OCTAVE ms,
+# plus one overflow bucket. Fixed memory per series, O(1) record().
+SUB = 8
+MAX_OCTAVE = 17                  # ~131 s
+N_BUCKETS = SUB * MAX_OCTAVE + 1
+STAGES = ("stt", "llm", "llm_ttft", "tts", "first_audio", "total")
+QUANTILES = (0.5, 0.95, 0.99)
+MAX_PERSONAS = int(os.environ.get("LATENCY_MAX_PERSONAS", "32"))  # persona label values; the rest → "other"
+OTHER = "other"
+
+
+def _upper(i: float) -> float:
+    return 2.0 ** (i / SUB)
+
+
+class LogHistogram:
+    """Bucket i counts values in (2^((i-1)/SUB), 2^(i/SUB)] ms; bucket 0 is ≤ 1 ms."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (N_BUCKETS + 1)  # last = overflow
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, v: float) -> None:
+        i = 0 if v <= 1 else min(N_BUCKETS, ceil(log2(v) * SUB - 1e-9))
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += v
+        if v > self.max:
+            self.max = v
+
+    def merge(self, other: "LogHistogram") -> None:
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Geometric middle of the bucket holding the q-th value (±4.5%, never above the max seen)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                if i == N_BUCKETS:
+                    return self.max
+                return min(_upper(i - 0.5) if i else 1.0, self.max)
+        return self.max
+
+    def cumulative(self):
+        """(le, cumulative count) at every doubling — the Prometheus bucket edges."""
+        seen = 0
+        for i, c in enumerate(self.counts[:N_BUCKETS]):
+            seen += c
+            if i % SUB == 0:
+                yield _upper(i), seen
+
+
+class LatencyStats:
+    """
+    Histograms per (stage, persona, source), source = llm | fallback | cache. Personas
+    `known` rejects, and any beyond `max_personas`, share the "other" label, so the
+    number of series stays bounded whatever persona strings clients send.
+    """
+
+    def __init__(self, known: Optional[Callable[[str], bool]] = None, max_personas: int = MAX_PERSONAS):
+        self._h: dict[tuple[str, str, str], LogHistogram] = {}
+        self._lock = threading.Lock()
+        self.known = known
+        self.max_personas = max_personas
+        self._personas: set[str] = set()
+
+    def _label(self, persona: str) -> str:
+        """Lock held."""
+        if persona in self._personas:
+            return persona
+        if (self.known is not None and not self.known(persona)) or len(self._personas) >= self.max_personas:
+            return OTHER
+        self._personas.add(persona)
+        return persona
+
+    @staticmethod
+    def source(record: dict) -> str:
+        if record.get("reply_cache") in ("exact", "near"):
+            return "cache"
+        return "llm" if record.get("llm_used") else "fallback"
+
+    def observe(self, record: dict) -> None:
+        src = self.source(record)
+        ms = record.get("ms", {})
+        with self._lock:
+            persona = self._label(str(record.get("persona", "")))
+            for stage in STAGES:
+                if stage in ms:
+                    key = (stage, persona, src)
+                    h = self._h.get(key)
+                    if h is None:
+                        h = self._h[key] = LogHistogram()
+                    h.record(float(ms[stage]))
+
+    def _merged(self, by) -> dict:
+        out: dict = {}
+        with self._lock:
+            for key, h in self._h.items():
+                k = by(key)
+                m = out.get(k)
+                if m is None:
+                    m = out[k] = LogHistogram()
+                m.merge(h)
+        return out
+
+    @staticmethod
+    def _pct(h: LogHistogram) -> dict:
+        d = {f"p{int(q * 100)}": int(round(h.quantile(q))) for q in QUANTILES}
+        d.update(count=h.count, max=int(h.max))
+        return d
+
+    def summary(self) -> dict:
+        """Percentiles per stage: overall, by persona and by reply source."""
+        out: dict = {}
+        for (stage,), h in sorted(self._merged(lambda k: (k[0],)).items()):
+            out.setdefault(stage, {})["all"] = self._pct(h)
+        for (stage, persona), h in sorted(self._merged(lambda k: (k[0], k[1])).items()):
+            out[stage].setdefault("persona", {})[persona] = self._pct(h)
+        for (stage, src), h in sorted(self._merged(lambda k: (k[0], k[2])).items()):
+            out[stage].setdefault("source", {})[src] = self._pct(h)
+        return out
+
+    def prometheus(self, prefix: str = "timephone") -> str:
+        """Prometheus text exposition: one histogram plus p50/p95/p99 gauges per series."""
+        series = sorted(self._merged(lambda k: k).items())
+        hist, quant = f"{prefix}_stage_latency_ms", f"{prefix}_stage_latency_quantile_ms"
+        lines = [f"# HELP {hist} Per-stage call latency in milliseconds.", f"# TYPE {hist} histogram"]
+        for (stage, persona, src), h in series:
+            lbl = f'stage="{stage}",persona="{_esc(persona)}",source="{src}"'
+            for le, c in h.cumulative():
+                lines.append(f'{hist}_bucket{{{lbl},le="{le:g}"}} {c}')
+            lines.append(f'{hist}_bucket{{{lbl},le="+Inf"}} {h.count}')
+            lines.append(f"{hist}_sum{{{lbl}}} {h.sum:g}")
+            lines.append(f"{hist}_count{{{lbl}}} {h.count}")
+        lines += [f"# HELP {quant} Per-stage latency percentiles from the log buckets.", f"# TYPE {quant} gauge"]
+        for (stage, persona, src), h in series:
+            lbl = f'stage="{stage}",persona="{_esc(persona)}",source="{src}"'
+            for q in QUANTILES:
+                lines.append(f'{quant}{{{lbl},quantile="{q:g}"}} {h.quantile(q):g}')
+        return "\n".join(lines) + "\n"
+
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -1,26 +1,202 @@
-import os, requests
+import os, json, asyncio, threading, time, requests, httpx
+import tracing
+from requests.adapters import HTTPAdapter
+from typing import AsyncIterator, Optional
 
 ENDPOINT = os.environ.get("LLM_ENDPOINT", "http://127.0.0.1:8001/v1")
 MODEL    = os.environ.get("LLM_MODEL",  os.environ.get("VLLM_MODEL", "gpt-oss-20B"))
 TIMEOUT  = float(os.environ.get("LLM_TIMEOUT", "20"))
+CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "8"))  # in-flight requests from async callers
 
-def _get(url: str, timeout: float = TIMEOUT) -> requests.Response:
-    r = requests.get(url, timeout=timeout)
-    r.raise_for_status()
-    return r
+# Health is probed in the background and cached, not fetched on every call
+HEALTH_INTERVAL = float(os.environ.get("LLM_HEALTH_INTERVAL", "5"))
+HEALTH_TTL      = float(os.environ.get("LLM_HEALTH_TTL", "15"))
+HEALTH_TIMEOUT  = float(os.environ.get("LLM_HEALTH_TIMEOUT", "2"))
+
+# Circuit breaker: open after N consecutive failures, let one probe request through after RESET s
+BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "3"))
+BREAKER_RESET    = float(os.environ.get("LLM_BREAKER_RESET", "15"))
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """closed → (N failures) → open → (reset_sec) → half_open: one probe → closed / open."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_sec: float = BREAKER_RESET):
+        self.max_failures = failures
+        self.reset_sec = reset_sec
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._probe = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_sec:
+                self.state = "half_open"
+                self._probe = False
+            if self.state == "half_open" and not self._probe:
+                self._probe = True
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.max_failures:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probe = False
+
+    def release(self) -> None:
+        """A request ended with no verdict (caller gave up): let the next one probe instead."""
+        with self._lock:
+            if self.state == "half_open":
+                self._probe = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "retry_in_s": round(max(0.0, self.reset_sec - (time.monotonic() - self.opened_at)), 1)
+                              if self.state == "open" else 0,
+            }
+
+
+BREAKER = CircuitBreaker()
+
+# Keep-alive pools: a requests.Session for the health prober, an httpx.AsyncClient for the server
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=CONCURRENCY))
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=CONCURRENCY))
+
+# Async client + limiter, created lazily inside the server's event loop
+_aclient: Optional[httpx.AsyncClient] = None
+_asem: Optional[asyncio.Semaphore] = None
+_aloop: Optional[asyncio.AbstractEventLoop] = None
+
+_stats = {"requests": 0, "in_flight": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+def _retire(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Close a client made on another event loop, on that loop if it's still running."""
+    try:
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+    except Exception:
+        pass
+    # the loop is gone: best effort from here; sockets tied to the dead loop may refuse
+    asyncio.get_running_loop().create_task(client.aclose()).add_done_callback(
+        lambda t: t.cancelled() or t.exception())
+
+def _async_client() -> httpx.AsyncClient:
+    global _aclient, _asem, _aloop
+    loop = asyncio.get_running_loop()
+    if _aclient is None or _aloop is not loop:
+        if _aclient is not None and not _aclient.is_closed:
+            _retire(_aclient, _aloop)
+        _aloop = loop
+        _aclient = httpx.AsyncClient(
+            timeout=TIMEOUT,
+            limits=httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY),
+        )
+        _asem = asyncio.Semaphore(CONCURRENCY)
+    return _aclient
+
+async def aclose() -> None:
+    """Close the async client's connections (server shutdown)."""
+    global _aclient
+    client, _aclient = _aclient, None
+    if client is not None and not client.is_closed:
+        if _aloop is asyncio.get_running_loop():
+            await client.aclose()
+        else:
+            _retire(client, _aloop)
+
+def pool_stats() -> dict:
+    with _stats_lock:
+        out = dict(_stats, max_connections=CONCURRENCY)
+    try:  # httpx doesn't expose this publicly; best effort
+        out["open_connections"] = len(_aclient._transport._pool.connections)
+    except Exception:
+        pass
+    return out
+
+# ---- cached health ----
+_health = {"ok": False, "ts": 0.0}
+_prober: Optional[threading.Thread] = None
+
+def _probe() -> bool:
+    try:
+        r = _session.get(f"{ENDPOINT}/models", timeout=HEALTH_TIMEOUT)
+        r.raise_for_status()
+        ok = True
+    except Exception:
+        ok = False
+    _health.update(ok=ok, ts=time.monotonic())
+    return ok
+
+def _probe_loop() -> None:
+    while True:
+        _probe()
+        time.sleep(HEALTH_INTERVAL)
+
+def start_prober() -> None:
+    global _prober
+    if _prober is None:
+        _prober = threading.Thread(target=_probe_loop, daemon=True)
+        _prober.start()
 
 def health() -> bool:
-    """Return True if the vLLM server responds to /v1/models."""
+    """Return True if the vLLM server responds to /v1/models (cached for HEALTH_TTL)."""
+    start_prober()
+    if time.monotonic() - _health["ts"] < HEALTH_TTL:
+        return _health["ok"]
+    return _probe()
+
+async def ahealth() -> bool:
+    """health() for async callers; only touches the network when the cache is stale."""
+    start_prober()
+    if time.monotonic() - _health["ts"] < HEALTH_TTL:
+        return _health["ok"]
     try:
-        _get(f"{ENDPOINT}/models")
-        return True
+        r = await _async_client().get(f"{ENDPOINT}/models", timeout=HEALTH_TIMEOUT)
+        r.raise_for_status()
+        ok = True
     except Exception:
-        return False
+        ok = False
+    _health.update(ok=ok, ts=time.monotonic())
+    return ok
 
-def chat(system: str, user: str, temperature: float = 0.7, max_tokens: int = 256) -> str:
-    """OpenAI-compatible /v1/chat/completions call to vLLM."""
-    url = f"{ENDPOINT}/chat/completions"
-    payload = {
+async def awarm() -> bool:
+    """Open the async client's keep-alive connection and refresh the health cache (startup)."""
+    start_prober()
+    _health["ts"] = 0.0
+    return await ahealth()
+
+def _payload(system: str, user: str, temperature: float, max_tokens: int) -> dict:
+    return {
         "model": MODEL,
         "messages": [
             {"role": "system", "content": system},
@@ -29,7 +205,75 @@ def chat(system: str, user: str, temperature: float = 0.7, max_tokens: int = 256
         "temperature": float(os.environ.get("LLM_TEMPERATURE", temperature)),
         "max_tokens": int(os.environ.get("LLM_MAX_TOKENS", max_tokens)),
     }
-    r = requests.post(url, json=payload, timeout=TIMEOUT)
-    r.raise_for_status()
-    data = r.json()
-    return data["choices"][0]["message"]["content"].strip()
+
+def _begin() -> None:
+    if not BREAKER.allow():
+        raise CircuitOpen(f"LLM circuit open ({BREAKER.failures} failures)")
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["in_flight"] += 1
+
+def _end(ok: Optional[bool]) -> None:
+    """ok=None: the caller stopped early, so the request says nothing about the LLM's health."""
+    with _stats_lock:
+        _stats["in_flight"] -= 1
+        if ok is False:
+            _stats["errors"] += 1
+    if ok is None:
+        BREAKER.release()
+    elif ok:
+        BREAKER.success()
+    else:
+        BREAKER.failure()
+
+async def achat_stream(system: str, user: str, temperature: float = 0.7, max_tokens: int = 256) -> AsyncIterator[str]:
+    """
+    OpenAI-compatible /v1/chat/completions with "stream": true; yields content deltas from
+    the SSE stream. At most CONCURRENCY requests in flight. Only a stream that reaches
+    [DONE] (or its normal end) counts as a success for the circuit breaker; one the caller
+    closes early (hang-up) counts as neither.
+    """
+    url = f"{ENDPOINT}/chat/completions"
+    payload = _payload(system, user, temperature, max_tokens)
+    payload["stream"] = True
+    client = _async_client()
+    _begin()
+    failed = complete = False
+    ids = tracing.current()
+    t0 = time.perf_counter()
+    t_conn = t_first = None
+    tokens = 0
+    try:
+        async with _asem:
+            t_conn = time.perf_counter()
+            tracing.record(ids, "llm.sem_wait", t0, t_conn)
+            async with client.stream("POST", url, json=payload) as r:
+                tracing.record(ids, "llm.connect", t_conn, time.perf_counter(), status=r.status_code)
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    done, delta = _sse_delta(line)
+                    if done:
+                        break
+                    if delta:
+                        if t_first is None:
+                            t_first = time.perf_counter()
+                            tracing.record(ids, "llm.first_token", t_conn, t_first)
+                        tokens += 1
+                        yield delta
+                complete = True
+    except Exception:
+        failed = True
+        raise
+    finally:
+        _end(False if failed else True if complete else None)
+        tracing.record(ids, "llm.stream", t0, time.perf_counter(), deltas=tokens, failed=failed)
+
+def _sse_delta(line: str) -> tuple[bool, Optional[str]]:
+    """One SSE line of a chat completion stream → (done, content delta)."""
+    if not line or not line.startswith("data:"):
+        return False, None
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return True, None
+    choices = json.loads(data).get("choices") or [{}]
+    return False, (choices[0].get("delta") or {}).get("content")
@@ -0,0 +1,156 @@
+import json, os, threading, time
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
+PERSONAS_POLL_SEC = float(os.environ.get("PERSONAS_POLL_SEC", "2"))      # 0 = no hot reload
+PERSONAS_PREWARM  = os.environ.get("PERSONAS_PREWARM", "1") == "1"
+
+
+def resolve_voice(entry: dict, default_voice: str) -> tuple[str, str]:
+    """(voice .onnx, voice .onnx.json) for a persona entry; a voice given as the .json is mapped back to its .onnx."""
+    voice = entry.get("voice", default_voice)
+    voice_json = entry.get("voice_json")
+    if voice.endswith(".json"):
+        guess = voice[:-5]  # strip .json
+        if os.path.exists(guess):
+            voice_json = voice_json or voice
+            voice = guess
+    return voice, voice_json or f"{voice}.json"
+
+
+class _Snapshot:
+    """One parsed personas.json: entries by dial key and by id, voice paths already resolved."""
+
+    def __init__(self, raw: dict, default_voice: str, mtime: float):
+        self.by_key: dict[str, dict] = {}
+        self.by_id: dict[str, dict] = {}
+        self.mtime = mtime
+        for key, entry in raw.items():
+            if not isinstance(entry, dict):
+                continue
+            p = dict(entry)
+            p["voice"], p["voice_json"] = resolve_voice(entry, default_voice)
+            self.by_key[str(key)] = p
+            if p.get("id") is not None:
+                self.by_id.setdefault(str(p["id"]), p)
+
+    def voices(self) -> set[tuple[str, str]]:
+        return {(p["voice"], p["voice_json"]) for p in self.by_key.values()}
+
+
+class PersonaRegistry:
+    """
+    personas.json → O(1) lookups by key or id. A watcher thread polls the file's mtime
+    and swaps in a new snapshot (one attribute assignment) when it changes; a file that
+    fails to parse keeps the previous snapshot. Voices of new personas are prewarmed.
+    """
+
+    def __init__(self, path: str, default_voice: str,
+                 prewarm: Optional[Callable[[str, str], None]] = None, executor: Optional[Executor] = None):
+        self.path = path
+        self.default_voice = default_voice
+        self.prewarm_fn = prewarm if PERSONAS_PREWARM else None
+        self.executor = executor
+        self.reloads = 0
+        self.errors = 0
+        self._warmed: set[tuple[str, str]] = set()
+        self._snap = _Snapshot({}, default_voice, 0.0)
+        self._watcher: Optional[threading.Thread] = None
+        self.reload()
+
+    def _stat(self) -> float:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return 0.0
+
+    def reload(self) -> bool:
+        """Re-read the file if it changed since the last load. True if a new snapshot went live."""
+        mtime = self._stat()
+        if mtime == self._snap.mtime:
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            if not isinstance(raw, dict):
+                raise ValueError("personas.json must be an object")
+        except Exception:
+            self.errors += 1
+            if not self._snap.by_key:  # first load: behave like an empty file
+                self._snap = _Snapshot({}, self.default_voice, mtime)
+            return False
+        self._snap = _Snapshot(raw, self.default_voice, mtime)
+        self.reloads += 1
+        self._prewarm(self._snap.voices() | {resolve_voice({}, self.default_voice)})
+        return True
+
+    def _prewarm(self, voices: set) -> None:
+        if self.prewarm_fn is None:
+            return
+        for v in voices - self._warmed:
+            self._warmed.add(v)
+            if self.executor is not None:
+                self.executor.submit(self._warm_one, *v)
+            else:
+                self._warm_one(*v)
+
+    def _warm_one(self, voice: str, voice_json: str) -> None:
+        if not os.path.exists(voice):
+            return
+        try:
+            self.prewarm_fn(voice, voice_json)
+        except Exception:
+            self._warmed.discard((voice, voice_json))  # retry on the next reload
+
+    def start(self) -> None:
+        if self._watcher is None and PERSONAS_POLL_SEC > 0:
+            self._watcher = threading.Thread(target=self._watch, name="personas-watch", daemon=True)
+            self._watcher.start()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(PERSONAS_POLL_SEC)
+            try:
+                self.reload()
+            except Exception:
+                self.errors += 1
+
+    def lookup(self, persona_key: str) -> dict:
+        """
+        persona_key may be a digit key like '1' or an 'id' field in any persona entry.
+        Expected schema example:
+        {
+          "1": { "id": "einstein", "name": "Albert Einstein",
+                 "system": "You are Albert Einstein ...",
+                 "voice": "/root/piper/voices/en_US-amy-low.onnx" }
+        }
+        """
+        snap = self._snap
+        p = snap.by_key.get(persona_key) or snap.by_id.get(persona_key)
+        if p is not None:
+            return p
+        # default fallback
+        voice, voice_json = resolve_voice({}, self.default_voice)
+        return {
+            "id": persona_key,
+            "name": persona_key,
+            "system": f"You are {persona_key}. Respond concisely and speak like the historical figure.",
+            "voice": voice,
+            "voice_json": voice_json,
+        }
+
+    def known(self, persona_id: str) -> bool:
+        """A persona from personas.json (vs. lookup()'s fallback for anything else)."""
+        snap = self._snap
+        return persona_id in snap.by_id or persona_id in snap.by_key
+
+    def stats(self) -> dict:
+        snap = self._snap
+        return {
+            "path": self.path,
+            "loaded": len(snap.by_key),
+            "ids": sorted(snap.by_id),
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "voices_warmed": len(self._warmed),
+        }
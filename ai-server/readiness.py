@@ -0,0 +1,83 @@
+import threading, time
+from typing import Callable, Iterable
+
+# Startup progress per component. The app binds its port right away and loads models in
+# the background; /ready turns green once every required component is loaded and warmed
+# and every soft one has either loaded or failed (a failed soft component only degrades).
+PENDING, LOADING, WARMING, READY, ERROR = "pending", "loading", "warming", "ready", "error"
+
+
+class Readiness:
+    def __init__(self, required: Iterable[str], optional: Iterable[str] = (), t0: float = 0.0,
+                 soft: Iterable[str] = ()):
+        """t0 = perf_counter() at process import, so the *_ms fields read as time since import."""
+        self.required = tuple(required)
+        self.soft = tuple(soft)
+        self._t0 = t0 or time.perf_counter()
+        self._lock = threading.Lock()
+        self._c: dict[str, dict] = {n: {"state": PENDING, "required": n in self.required}
+                                    for n in (*self.required, *self.soft, *optional)}
+        self._ready_at: float = 0.0
+
+    def set(self, name: str, state: str, **info) -> None:
+        with self._lock:
+            c = self._c[name]
+            now = time.perf_counter()
+            if state in (LOADING, WARMING) and "started_ms" not in c:
+                c["started_ms"] = int((now - self._t0) * 1000)
+            if state in (READY, ERROR):
+                c["done_ms"] = int((now - self._t0) * 1000)
+            c["state"] = state
+            if state == READY:
+                c.pop("error", None)
+            c.update(info)
+            if (not self._ready_at and all(self._c[n]["state"] == READY for n in self.required)
+                    and all(self._c[n]["state"] in (READY, ERROR) for n in self.soft)):
+                self._ready_at = now
+
+    def run(self, name: str, load: Callable[[], None], warm: Callable[[], None] = None,
+            tries: int = 1, retry_sec: float = 2.0, permanent: tuple = ()) -> bool:
+        """
+        load() then warm(), timing each. A failure is retried up to `tries` times (backing
+        off from retry_sec) unless it's one of the `permanent` exception types; the last
+        failure marks the component as failed.
+        """
+        for attempt in range(1, tries + 1):
+            try:
+                self.set(name, LOADING, attempt=attempt)
+                t = time.perf_counter()
+                load()
+                info = {"load_ms": int((time.perf_counter() - t) * 1000)}
+                if warm is not None:
+                    self.set(name, WARMING, **info)
+                    t = time.perf_counter()
+                    warm()
+                    info["warm_ms"] = int((time.perf_counter() - t) * 1000)
+                self.set(name, READY, **info)
+                return True
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt == tries or isinstance(e, permanent):
+                    self.set(name, ERROR, error=error)
+                    return False
+                self.set(name, LOADING, error=error)  # still coming: keeps /ready at 503 meanwhile
+                time.sleep(retry_sec * 2 ** (attempt - 1))
+        return False
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._ready_at)
+
+    def failed(self) -> list[str]:
+        """Required components that failed for good: the app will never be ready."""
+        with self._lock:
+            return [n for n in self.required if self._c[n]["state"] == ERROR]
+
+    def ready_ms(self) -> int:
+        return int((self._ready_at - self._t0) * 1000) if self._ready_at else 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"ready": self.ready, "ready_ms": self.ready_ms() or None,
+                    "degraded": [n for n, c in self._c.items() if not c["required"] and c["state"] == ERROR],
+                    "components": {n: dict(c) for n, c in self._c.items()}}
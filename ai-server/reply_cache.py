@@ -0,0 +1,148 @@
+import os, re, threading, time, zlib
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+REPLY_CACHE      = os.environ.get("REPLY_CACHE", "0") == "1"           # off unless asked for
+REPLY_CACHE_TTL  = float(os.environ.get("REPLY_CACHE_TTL", "3600"))
+REPLY_CACHE_MAX  = int(os.environ.get("REPLY_CACHE_MAX", "500"))
+REPLY_CACHE_NEAR = float(os.environ.get("REPLY_CACHE_NEAR", "0.9"))    # min Jaccard for a near hit; 0 = exact only
+
+_PRIME = (1 << 31) - 1
+_NON_WORD = re.compile(r"[^a-z0-9' ]+")
+_NUMBER = re.compile(r"\d+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def shingles(norm: str, k: int = 3) -> frozenset:
+    """Character k-grams — short questions have too few words for word shingles."""
+    s = f" {norm} "
+    return frozenset(s[i:i + k] for i in range(max(1, len(s) - k + 1)))
+
+
+def numbers(norm: str) -> tuple:
+    """Digits in the question: "nobel prize in 1921" and "... 1922" are near in shingles, not in meaning."""
+    return tuple(_NUMBER.findall(norm))
+
+
+class _Entry:
+    __slots__ = ("reply", "ts", "shingles", "bands", "numbers")
+
+    def __init__(self, reply: str, sh: frozenset, bands: list, nums: tuple):
+        self.reply = reply
+        self.ts = time.monotonic()
+        self.shingles = sh
+        self.bands = bands
+        self.numbers = nums
+
+
+class ReplyCache:
+    """
+    (persona, normalized transcript) → reply. Exact lookups by key; near-duplicates by
+    MinHash/LSH over character shingles (bands x rows signatures), confirmed with the
+    exact Jaccard of the candidates' shingle sets; a near hit also needs the same numbers.
+    LRU with TTL.
+    """
+
+    def __init__(self, ttl: float = REPLY_CACHE_TTL, max_entries: int = REPLY_CACHE_MAX,
+                 near: float = REPLY_CACHE_NEAR, bands: int = 16, rows: int = 4):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.near = near
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.default_rng(0x5EED)
+        self._a = rng.integers(1, _PRIME, bands * rows, dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, bands * rows, dtype=np.int64)
+        self._entries: "OrderedDict[tuple[str, str], _Entry]" = OrderedDict()
+        self._lsh: dict[tuple, set] = {}
+        self._lock = threading.Lock()
+        self.hits_exact = 0
+        self.hits_near = 0
+        self.misses = 0
+
+    def _band_keys(self, persona: str, sh: frozenset) -> list:
+        x = np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIME for s in sh), dtype=np.int64, count=len(sh))
+        sig = ((self._a[:, None] * x[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+        return [(persona, i, sig[i * self.rows:(i + 1) * self.rows].tobytes()) for i in range(self.bands)]
+
+    def _drop(self, key: tuple) -> None:
+        e = self._entries.pop(key, None)
+        if e is None:
+            return
+        for bk in e.bands:
+            keys = self._lsh.get(bk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._lsh[bk]
+
+    def _fresh(self, key: tuple) -> Optional[_Entry]:
+        e = self._entries.get(key)
+        if e is not None and time.monotonic() - e.ts > self.ttl:
+            self._drop(key)
+            return None
+        return e
+
+    def get(self, persona: str, transcript: str) -> tuple[Optional[str], str]:
+        """→ (reply, "exact" | "near") on a hit, (None, "miss") otherwise."""
+        norm = normalize(transcript)
+        if not norm:
+            return None, "miss"
+        key = (persona, norm)
+        with self._lock:
+            e = self._fresh(key)
+            if e is not None:
+                self._entries.move_to_end(key)
+                self.hits_exact += 1
+                return e.reply, "exact"
+        if self.near > 0:
+            sh, nums = shingles(norm), numbers(norm)
+            bands = self._band_keys(persona, sh)
+            with self._lock:
+                best, best_j = None, self.near
+                for bk in bands:
+                    for cand in list(self._lsh.get(bk, ())):
+                        ce = self._fresh(cand)
+                        if ce is None or ce.numbers != nums:
+                            continue
+                        j = len(sh & ce.shingles) / len(sh | ce.shingles)
+                        if j >= best_j:
+                            best, best_j = cand, j
+                if best is not None:
+                    self._entries.move_to_end(best)
+                    self.hits_near += 1
+                    return self._entries[best].reply, "near"
+        with self._lock:
+            self.misses += 1
+        return None, "miss"
+
+    def put(self, persona: str, transcript: str, reply: str) -> None:
+        norm = normalize(transcript)
+        if not norm or not reply:
+            return
+        key = (persona, norm)
+        sh = shingles(norm)
+        bands = self._band_keys(persona, sh) if self.near > 0 else []
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = _Entry(reply, sh, bands, numbers(norm))
+            for bk in bands:
+                self._lsh.setdefault(bk, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_exact + self.hits_near + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits_exact": self.hits_exact,
+                "hits_near": self.hits_near,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits_exact + self.hits_near) / lookups, 3) if lookups else 0,
+            }
@@ -0,0 +1,79 @@
+import io
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+
+# Reply audio formats: name → (media type, soundfile format, subtype). "pcm" is headerless S16LE.
+FORMATS = {
+    "wav":  ("audio/wav", "WAV", "PCM_16"),
+    "pcm":  ("audio/pcm", None, None),
+    "flac": ("audio/flac", "FLAC", "PCM_16"),
+    "opus": ("audio/ogg; codecs=opus", "OGG", "OPUS"),
+}
+STREAMABLE = ("wav", "pcm")
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)  # the only rates libopus encodes
+
+_ACCEPT = {
+    "audio/wav": "wav", "audio/x-wav": "wav", "audio/wave": "wav",
+    "audio/pcm": "pcm", "audio/l16": "pcm", "application/octet-stream": "pcm",
+    "audio/flac": "flac", "audio/x-flac": "flac",
+    "audio/ogg": "opus", "audio/opus": "opus",
+}
+
+
+def negotiate(fmt: Optional[str], accept: Optional[str]) -> str:
+    """Form field wins; else the first Accept type we can produce (q-values honoured); else WAV."""
+    if fmt:
+        fmt = fmt.strip().lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"unsupported format {fmt!r} (use {', '.join(FORMATS)})")
+        return fmt
+    ranked = []
+    for i, part in enumerate((accept or "").split(",")):
+        fields = [f.strip() for f in part.split(";")]
+        q = 1.0
+        for f in fields[1:]:
+            if f.startswith("q="):
+                try:
+                    q = float(f[2:])
+                except ValueError:
+                    q = 0.0
+        name = _ACCEPT.get(fields[0].lower())
+        if name and q > 0:
+            ranked.append((-q, i, name))
+    return min(ranked)[2] if ranked else "wav"
+
+
+def output_rate(fmt: str, sr: int) -> int:
+    """Opus only takes OPUS_RATES: round up to the next one (48 kHz at most)."""
+    if fmt != "opus" or sr in OPUS_RATES:
+        return sr
+    return next((r for r in OPUS_RATES if r >= sr), OPUS_RATES[-1])
+
+
+def media_type(fmt: str, sr: int, channels: int) -> str:
+    if fmt == "pcm":
+        return f"audio/pcm;rate={sr};channels={channels};format=s16le"
+    return FORMATS[fmt][0]
+
+
+def layout(y: np.ndarray, channels: int) -> np.ndarray:
+    """Mono float → (frames,) for 1 channel or (frames, channels) with the mono signal duplicated."""
+    if y.ndim > 1:
+        y = y.mean(axis=1)
+    return y if channels == 1 else np.repeat(y[:, None], channels, axis=1)
+
+
+def pcm16(y: np.ndarray, channels: int = 1) -> bytes:
+    return (np.clip(layout(y, channels), -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def encode(y: np.ndarray, sr: int, fmt: str, channels: int = 1) -> bytes:
+    """Encode a mono float32 clip (already at `sr`) in one pass."""
+    if fmt == "pcm":
+        return pcm16(y, channels)
+    _, container, subtype = FORMATS[fmt]
+    out = io.BytesIO()
+    sf.write(out, layout(y, channels), sr, format=container, subtype=subtype)
+    return out.getvalue()
@@ -0,0 +1,104 @@
+import os
+from functools import lru_cache
+from math import ceil, gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Windowed-sinc polyphase resampler. For output sample n the input position is
+# n * down / up; its fractional part only takes `up` values, so the filter taps for
+# every phase are computed once per rate pair and reused (the "bank"). float32 throughout.
+# Not faster than np.interp everywhere (bench/resample_bench.py, 10 s clip): ~2x faster
+# for 22.05->16 and 22.05->24 kHz, ~15% slower for 16->22.05 kHz (441 phases), ~2x
+# slower for 48->16 kHz, where it does the anti-alias filtering interpolation skipped.
+# Worst case is still ~2 ms per second of audio; the filtering is what we pay for.
+RESAMPLE_ZEROS   = int(os.environ.get("RESAMPLE_ZEROS", "16"))     # sinc zero crossings per side (quality vs speed)
+RESAMPLE_ROLLOFF = 0.945                                          # cutoff as a fraction of the lower Nyquist
+RESAMPLE_BETA    = 8.6                                            # Kaiser window shape (~-80 dB stopband)
+
+
+@lru_cache(maxsize=32)
+def _plan(src_sr: int, dst_sr: int) -> tuple[int, int, int, np.ndarray, np.ndarray]:
+    """→ (up, down, half, tap offsets, bank[up, 2*half]) for one rate pair."""
+    g = gcd(src_sr, dst_sr)
+    up, down = dst_sr // g, src_sr // g
+    fc = RESAMPLE_ROLLOFF * min(1.0, up / down)       # cutoff in input-rate Nyquist units
+    half = int(ceil(RESAMPLE_ZEROS / fc))
+    k = np.arange(-half + 1, half + 1, dtype=np.int64)
+    t = np.arange(up, dtype=np.float64)[:, None] / up - k[None, :]  # phase frac − tap offset
+    w = np.i0(RESAMPLE_BETA * np.sqrt(np.clip(1.0 - (t / half) ** 2, 0.0, None))) / np.i0(RESAMPLE_BETA)
+    bank = (fc * np.sinc(fc * t) * w).astype(np.float32)
+    bank.setflags(write=False)
+    return up, down, half, k, bank
+
+
+def _run(x: np.ndarray, start: int, n0: int, n1: int, up: int, down: int,
+         k: np.ndarray, bank: np.ndarray) -> np.ndarray:
+    """
+    Output samples [n0, n1) from input `x`, whose first element is input index `start`.
+    Outputs n, n + up, n + 2*up… share one phase and step `down` inputs apart, so each
+    phase is a single matrix-vector product over a strided window view (no gather copies).
+    """
+    out = np.empty(max(0, n1 - n0), dtype=np.float32)
+    if not len(out):  # a chunk too short to complete any output yet (x may be shorter than the taps)
+        return out
+    win = sliding_window_view(x, len(k))  # win[r] = x[r:r + taps]
+    for j in range(min(up, len(out))):
+        n = n0 + j
+        cnt = len(range(n, n1, up))
+        r = (n * down) // up - start + int(k[0])
+        out[j::up] = win[r:r + cnt * down:down][:cnt] @ bank[(n * down) % up]
+    return out
+
+
+def resample(y: np.ndarray, src_sr: int, dst_sr: int) -> np.ndarray:
+    """Resample a whole float clip (mono, or frames x channels) → float32."""
+    if src_sr == dst_sr:
+        return y
+    if y.ndim == 2:
+        return np.stack([resample(y[:, c], src_sr, dst_sr) for c in range(y.shape[1])], axis=1)
+    up, down, half, k, bank = _plan(src_sr, dst_sr)
+    x = np.zeros(len(y) + 2 * half + 1, dtype=np.float32)
+    x[half:half + len(y)] = y
+    return _run(x, -half, 0, int(round(len(y) * up / down)), up, down, k, bank)
+
+
+class StreamResampler:
+    """
+    Chunk-at-a-time resample() for mono audio: process() returns every output sample
+    whose taps are already available, keeping only the short input history it needs;
+    flush() pads the tail. Concatenated output equals resample() on the whole clip.
+    """
+
+    def __init__(self, src_sr: int, dst_sr: int):
+        self.passthrough = src_sr == dst_sr
+        if not self.passthrough:
+            self.up, self.down, self.half, self.k, self.bank = _plan(src_sr, dst_sr)
+            self.buf = np.zeros(self.half, dtype=np.float32)
+            self.start = -self.half
+        self.n = 0
+        self.total = 0
+
+    def process(self, y: np.ndarray) -> np.ndarray:
+        if self.passthrough:
+            return np.asarray(y, dtype=np.float32)
+        self.buf = np.concatenate([self.buf, np.asarray(y, dtype=np.float32)])
+        self.total += len(y)
+        avail = self.total - self.half  # inputs [0, avail) have their full right context
+        n1 = max(self.n, -(-avail * self.up // self.down)) if avail > 0 else self.n
+        out = _run(self.buf, self.start, self.n, n1, self.up, self.down, self.k, self.bank)
+        self.n = n1
+        drop = max(0, (n1 * self.down) // self.up - self.half + 1 - self.start)
+        drop = min(drop, len(self.buf))
+        self.buf = self.buf[drop:]
+        self.start += drop
+        return out
+
+    def flush(self) -> np.ndarray:
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        x = np.concatenate([self.buf, np.zeros(self.half + 1, dtype=np.float32)])
+        n_end = max(self.n, int(round(self.total * self.up / self.down)))
+        out = _run(x, self.start, self.n, n_end, self.up, self.down, self.k, self.bank)
+        self.n = n_end
+        return out
@@ -1,12 +1,30 @@
-from fastapi import FastAPI, UploadFile, Form
-from fastapi.responses import StreamingResponse, JSONResponse, RedirectResponse
-import io, os, re, tempfile, subprocess, time, json, pathlib, shlex
+import time
+T_IMPORT = time.perf_counter()  # import-to-listening / import-to-ready are measured from here
+from fastapi import FastAPI, UploadFile, Form, Header, Query, Request, WebSocket, WebSocketDisconnect
+from starlette.requests import ClientDisconnect
+from fastapi.responses import Response, StreamingResponse, JSONResponse, RedirectResponse, PlainTextResponse
+import asyncio, io, os, re, tempfile, subprocess, json, logging, threading, pathlib, shlex, struct
 from datetime import datetime, timezone
 from collections import deque
+from functools import lru_cache
 import numpy as np, soundfile as sf
-from faster_whisper import WhisperModel
+from concurrent.futures import ThreadPoolExecutor
+from faster_whisper import WhisperModel, decode_audio
 import uuid
 from events import sse_router, event_router, event_bus
+from tts_pool import PiperPool
+from tts_cache import TTSCache
+from reply_cache import ReplyCache, REPLY_CACHE as REPLY_CACHE_ON
+from stt_batch import TranscribeBatcher, transcribe_batch
+from stt_stream import StreamingTranscriber, partial_segments
+from resample import StreamResampler, resample
+import reply_codec
+from latency_stats import LatencyStats
+import tracing
+import backplane
+from calllog import CallLog, CALLLOG_DB
+from personas import PersonaRegistry
+from readiness import Readiness
 from fastapi.staticfiles import StaticFiles
 
 
@@ -39,6 +57,24 @@ PIPER_BIN   = os.environ.get("PIPER_BIN", "/root/piper/build/piper")
 PIPER_VOICE = os.environ.get("PIPER_VOICE", "/root/piper/voices/en_US-amy-low.onnx")
 PIPER_JSON  = os.environ.get("PIPER_JSON",  f"{PIPER_VOICE}.json")
 PIPER_EXTRA_ARGS = os.environ.get("PIPER_EXTRA_ARGS", "").strip()  # pass-through to Piper CLI
+PIPER_POOL = PiperPool(PIPER_BIN, PIPER_EXTRA_ARGS)                 # size via PIPER_POOL_SIZE (0 = off)
+TTS_CACHE  = TTSCache()                                             # TTS_CACHE_MB / TTS_CACHE_DIR / TTS_CACHE_DISK_MB
+REPLY_CACHE = ReplyCache() if REPLY_CACHE_ON else None              # REPLY_CACHE=1 to enable (TTL / MAX / NEAR)
+
+# Per-stage concurrency (each stage has its own executor/limit so calls overlap)
+STT_WORKERS     = int(os.environ.get("STT_WORKERS", "2"))      # Whisper threads (and ctranslate2 workers)
+TTS_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", "4"))  # one-shot Piper processes when the pool is off
+STT_EXECUTOR = ThreadPoolExecutor(max_workers=STT_WORKERS, thread_name_prefix="whisper")
+_tts_sem = None
+_tts_sem_loop = None
+
+def _tts_semaphore() -> asyncio.Semaphore:
+    """TTS_CONCURRENCY limit bound to the running loop (created on first use, not at import)."""
+    global _tts_sem, _tts_sem_loop
+    loop = asyncio.get_running_loop()
+    if _tts_sem is None or _tts_sem_loop is not loop:
+        _tts_sem, _tts_sem_loop = asyncio.Semaphore(TTS_CONCURRENCY), loop
+    return _tts_sem
 
 # Personas
 PERSONAS_PATH = os.environ.get("PERSONAS_PATH", "personas.json")
@@ -46,9 +82,87 @@ PERSONAS_PATH = os.environ.get("PERSONAS_PATH", "personas.json")
 # ---- metrics ring buffer (unified) ----
 METRICS_CAP = int(os.environ.get("METRICS_CAP", os.environ.get("METRICS_MAX", "50")))
 METRICS: "deque[dict]" = deque(maxlen=METRICS_CAP)
+LATENCY = LatencyStats(known=lambda p: PERSONAS.known(p))  # every call since start; unknown personas → "other"
+CALLLOG = CallLog(CALLLOG_DB) if CALLLOG_DB else None  # every call, on disk (CALLLOG_DB="" = off)
+
+# ---------- Startup ----------
+# Models load in a background thread once the app is up, so the port binds immediately;
+# /converse answers 503 until /ready is green: Whisper loaded and warmed, Piper loaded and
+# warmed or given up on (then replies are silence, as before, and /ready lists it as degraded).
+log = logging.getLogger("uvicorn.error")
+READY = Readiness(required=("whisper",), soft=("tts",), optional=("llm",), t0=T_IMPORT)
+TTS_WARM_TRIES = int(os.environ.get("TTS_WARM_TRIES", "3"))  # Piper warm-up attempts (2 s, 4 s apart)
 
 # ---------- Load Whisper ----------
-model = WhisperModel(WHISPER_MODEL, device=WHISPER_DEVICE, compute_type=WHISPER_COMPUTE)
+model = None  # set by load_whisper() in the background
+
+WHISPER_SR = 16000
+
+def load_whisper() -> None:
+    global model
+    model = WhisperModel(WHISPER_MODEL, device=WHISPER_DEVICE, compute_type=WHISPER_COMPUTE,
+                         num_workers=STT_WORKERS)
+
+def warm_whisper() -> None:
+    """One throwaway decode (encoder + decoder) and one VAD pass, so the first call pays neither."""
+    rng = np.random.default_rng(0)
+    noise = (rng.standard_normal(WHISPER_SR) * 0.01).astype(np.float32)
+    segments, _info = model.transcribe(noise, beam_size=5, vad_filter=False, language="en",
+                                       initial_prompt=STT_PROMPT)
+    list(segments)
+    transcribe(np.zeros(WHISPER_SR // 2, dtype=np.float32))
+
+def decode_upload(data: bytes) -> np.ndarray:
+    """Uploaded audio (WAV/FLAC/Ogg Vorbis/Opus) → float32 mono 16 kHz, decoded in memory."""
+    try:
+        with tracing.span("stt.decode_upload", bytes=len(data)):
+            y, sr = sf.read(io.BytesIO(data), dtype="float32")
+    except Exception:
+        # containers libsndfile can't parse (WebM, MP3 on old builds) → PyAV
+        with tracing.span("stt.decode_upload_av", bytes=len(data)):
+            return decode_audio(io.BytesIO(data), sampling_rate=WHISPER_SR)
+    if y.ndim > 1:
+        y = y.mean(axis=1)
+    with tracing.span("stt.resample", src_sr=sr):
+        return resample_audio(y, sr, WHISPER_SR)  # no-op when already 16 kHz
+
+STT_PROMPT = "Casual, modern English conversation."
+
+def transcribe(audio: np.ndarray) -> str:
+    """Blocking Whisper pass (segments are lazy, so they're consumed here too). Run on STT_EXECUTOR."""
+    with tracing.span("stt.whisper", sec=round(len(audio) / WHISPER_SR, 2)):
+        segments, _info = model.transcribe(
+            audio,
+            beam_size=5,
+            vad_filter=True,
+            vad_parameters={"min_silence_duration_ms": 300},
+            language="en",
+            initial_prompt=STT_PROMPT,
+        )
+        return "".join(s.text for s in segments).strip()
+
+# Concurrent calls within STT_BATCH_WINDOW_MS share one batched decode (STT_BATCH_MAX=1 turns it off)
+STT_BATCHER = TranscribeBatcher(
+    transcribe,
+    lambda audios: transcribe_batch(model, audios, beam_size=5, initial_prompt=STT_PROMPT),
+    STT_EXECUTOR, concurrency=STT_WORKERS,
+)
+
+# /converse/ws partials are best-effort: they take at most STT_PARTIAL_SLOTS Whisper threads
+# (across all sockets) and are skipped while final transcripts are queued, so finals go first
+STT_PARTIAL_SLOTS = int(os.environ.get("STT_PARTIAL_SLOTS", str(max(1, STT_WORKERS - 1))))
+STT_PARTIALS = {"running": 0, "run": 0, "skipped": 0}
+
+def _partial_slot() -> bool:
+    if STT_PARTIALS["running"] >= STT_PARTIAL_SLOTS or STT_BATCHER.queued():
+        STT_PARTIALS["skipped"] += 1
+        return False
+    STT_PARTIALS["running"] += 1
+    STT_PARTIALS["run"] += 1
+    return True
+
+def _partial_done(_task) -> None:
+    STT_PARTIALS["running"] -= 1
 
 # ---------- Prosody helpers ----------
 _SENT_SPLIT = re.compile(r'(?<=[\.\?\!])\s+')
@@ -66,27 +180,48 @@ def clean_and_punctuate(text: str) -> str:
 def split_sentences(text: str) -> list[str]:
     return [s.strip() for s in _SENT_SPLIT.split(text) if s.strip()]
 
+class SentenceSplitter:
+    """
+    split_sentences/clean_and_punctuate applied incrementally to a token stream:
+    a sentence is complete once its .?! is followed by whitespace.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.n = 0
+
+    def _fix(self, s: str) -> str:
+        if self.n == 0:
+            s = clean_and_punctuate(s)
+        elif s[-1] not in ".?!":
+            s += "."
+        self.n += 1
+        return s
+
+    def feed(self, token: str) -> list[str]:
+        self.buf += token
+        parts = _SENT_SPLIT.split(self.buf)
+        self.buf = parts.pop()
+        return [self._fix(p.strip()) for p in parts if p.strip()]
+
+    def flush(self) -> list[str]:
+        tail, self.buf = self.buf.strip(), ""
+        return [self._fix(tail)] if tail else []
+
 def resample_audio(y: np.ndarray, src_sr: int, dst_sr: int) -> np.ndarray:
-    if src_sr == dst_sr:
-        return y
-    x_old = np.linspace(0, 1, num=len(y), endpoint=False, dtype=np.float64)
-    n_new = int(round(len(y) * (dst_sr / float(src_sr))))
-    x_new = np.linspace(0, 1, num=n_new, endpoint=False, dtype=np.float64)
-    y_new = np.interp(x_new, x_old, y.astype(np.float64)).astype(np.float32)
-    return y_new
-
-def concat_wavs(buffers: list[bytes], target_sr: int | None = None, pause_ms: int = 120) -> bytes:
+    return resample(y, src_sr, dst_sr)  # polyphase, filter banks cached per rate pair
+
+def concat_clips(buffers: list[bytes], target_sr: int | None = None, pause_ms: int = 120) -> tuple[np.ndarray, int]:
+    """Decode WAV clips and join them with pauses → (float32 mono, sr). Empty → 1 s of silence."""
     waves, srs = [], []
     for b in buffers:
         y, sr = sf.read(io.BytesIO(b), dtype="float32")
+        if y.ndim > 1:
+            y = y.mean(axis=1)
         waves.append(y); srs.append(sr)
     if not waves:
         sr = target_sr or 16000
-        blank = np.zeros(int(sr * 1.0), dtype=np.float32)
-        out = io.BytesIO()
-        sf.write(out, blank, sr, format="WAV", subtype="PCM_16")
-        out.seek(0)
-        return out.getvalue()
+        return np.zeros(int(sr * 1.0), dtype=np.float32), sr
     ref_sr = target_sr or srs[0]
     waves = [resample_audio(y, srs[i], ref_sr) for i, y in enumerate(waves)]
     pause = np.zeros(int(ref_sr * (pause_ms/1000.0)), dtype=np.float32)
@@ -95,22 +230,54 @@ def concat_wavs(buffers: list[bytes], target_sr: int | None = None, pause_ms: in
         seq.append(y)
         if i != len(waves) - 1:
             seq.append(pause)
-    ycat = np.concatenate(seq) if seq else pause
-    out = io.BytesIO()
-    sf.write(out, ycat, ref_sr, format="WAV", subtype="PCM_16")
-    out.seek(0)
-    return out.getvalue()
+    return (np.concatenate(seq) if seq else pause), ref_sr
+
+@lru_cache(maxsize=64)
+def voice_sample_rate(json_path: str) -> int:
+    """Piper voice output rate from its .onnx.json (22050 if unreadable)."""
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            return int(json.load(f)["audio"]["sample_rate"])
+    except Exception:
+        return 22050
+
+# ---------- Streaming WAV ----------
+def wav_stream_header(sr: int, channels: int = 1) -> bytes:
+    """PCM_16 WAV header with unknown length (0xFFFFFFFF), for chunked playback."""
+    block = channels * 2
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sr, sr * block, block, 16)
+            + b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+def pcm16_bytes(y: np.ndarray, channels: int = 1) -> bytes:
+    return reply_codec.pcm16(y, channels)
+
+def _piper_cmd(model_path: str, json_path: str, out_path: str) -> list[str]:
+    cmd = [PIPER_BIN, "-m", model_path]
+    if os.path.exists(json_path):
+        cmd += ["-c", json_path]
+    if PIPER_EXTRA_ARGS:
+        cmd += shlex.split(PIPER_EXTRA_ARGS)
+    return cmd + ["-f", out_path]
 
 def piper_tts_once(text: str, model_path: str, json_path: str) -> bytes:
+    key = TTS_CACHE.key(text, model_path, json_path, PIPER_EXTRA_ARGS)
+    with tracing.span("tts.cache_get"):
+        data = TTS_CACHE.get(key)
+    if data is None:
+        with tracing.span("tts.piper", chars=len(text)):
+            data = _piper_synth(text, model_path, json_path)
+        with tracing.span("tts.cache_put"):
+            TTS_CACHE.put(key, data)
+    return data
+
+def _piper_synth(text: str, model_path: str, json_path: str) -> bytes:
+    if PIPER_POOL.enabled:
+        return PIPER_POOL.synth(text, model_path, json_path)
     with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
         out_path = tmp.name
     try:
-        cmd = [PIPER_BIN, "-m", model_path]
-        if os.path.exists(json_path):
-            cmd += ["-c", json_path]
-        if PIPER_EXTRA_ARGS:
-            cmd += shlex.split(PIPER_EXTRA_ARGS)
-        cmd += ["-f", out_path]
+        cmd = _piper_cmd(model_path, json_path, out_path)
         subprocess.run(cmd, input=text.encode("utf-8"), check=True)
         with open(out_path, "rb") as f:
             data = f.read()
@@ -121,54 +288,69 @@ def piper_tts_once(text: str, model_path: str, json_path: str) -> bytes:
         except Exception:
             pass
 
-def piper_tts_multi(text: str, model_path: str, json_path: str, target_sr: int | None = None, pause_ms: int = 120) -> bytes:
-    text = clean_and_punctuate(text)
-    parts = split_sentences(text)
-    clips = []
-    for s in parts if parts else [text]:
+async def piper_tts_async(text: str, model_path: str, json_path: str) -> bytes:
+    """piper_tts_once for the event loop: pool workers on their executor, else an async subprocess."""
+    if PIPER_POOL.enabled:
+        with tracing.span("tts.sentence", chars=len(text)):
+            return await asyncio.wrap_future(PIPER_POOL.executor.submit(
+                tracing.bind(piper_tts_once, wait="tts.executor_wait"), text, model_path, json_path))
+    key = TTS_CACHE.key(text, model_path, json_path, PIPER_EXTRA_ARGS)
+    with tracing.span("tts.sentence", chars=len(text)):
+        with tracing.span("tts.cache_get"):
+            data = await asyncio.to_thread(TTS_CACHE.get, key)
+        if data is None:
+            data = await _piper_synth_async(text, model_path, json_path)
+            with tracing.span("tts.cache_put"):
+                await asyncio.to_thread(TTS_CACHE.put, key, data)
+    return data
+
+async def _piper_synth_async(text: str, model_path: str, json_path: str) -> bytes:
+    t_wait = time.perf_counter()
+    async with _tts_semaphore():
+        tracing.record(tracing.current(), "tts.sem_wait", t_wait, time.perf_counter())
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+            out_path = tmp.name
         try:
-            clips.append(piper_tts_once(s, model_path, json_path))
-        except Exception:
-            pass
-    return concat_wavs(clips, target_sr=target_sr, pause_ms=pause_ms)
+            with tracing.span("tts.piper_proc", chars=len(text)):
+                proc = await asyncio.create_subprocess_exec(
+                    *_piper_cmd(model_path, json_path, out_path),
+                    stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                await proc.communicate(text.encode("utf-8"))
+            if proc.returncode != 0:
+                raise subprocess.CalledProcessError(proc.returncode, PIPER_BIN)
+            with open(out_path, "rb") as f:
+                return f.read()
+        finally:
+            try:
+                os.unlink(out_path)
+            except Exception:
+                pass
 
 # ---------- Personas ----------
-def _load_personas() -> dict:
-    try:
-        with open(PERSONAS_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-_PERSONAS = _load_personas()
-
-def _persona_lookup(persona_key: str) -> dict:
-    """
-    persona_key may be a digit key like '1' or an 'id' field in any persona entry.
-    Expected schema example:
-    {
-      "1": { "id": "einstein", "name": "Albert Einstein",
-             "system": "You are Albert Einstein ...",
-             "voice": "/root/piper/voices/en_US-amy-low.onnx" }
-    }
-    """
-    if persona_key in _PERSONAS:
-        return _PERSONAS[persona_key]
-    # search by id
-    for k, v in _PERSONAS.items():
-        if isinstance(v, dict) and v.get("id") == persona_key:
-            return v
-    # default fallback
-    return {
-        "id": persona_key,
-        "name": persona_key,
-        "system": f"You are {persona_key}. Respond concisely and speak like the historical figure.",
-        # no voice override by default
-    }
+# Indexed by key and id, voice paths resolved once; personas.json is watched and hot-swapped,
+# and every persona's voice gets a warm Piper worker.
+PERSONAS = PersonaRegistry(PERSONAS_PATH, PIPER_VOICE, prewarm=PIPER_POOL.prewarm, executor=PIPER_POOL.executor)
+PERSONAS.start()
 
 # ---------- Metrics ----------
 def _push_metric(m: dict) -> None:
+    if BACKPLANE:
+        m["worker"] = BACKPLANE.worker
+        BACKPLANE.publish_metric(m)
+    if CALLLOG:
+        CALLLOG.append(m)
+    _ingest_metric(m)
+    tracing.finish(m.get("call_id"), persona=m.get("persona"), llm_used=m.get("llm_used"))
+
+def _ingest_metric(m: dict) -> None:
     METRICS.append(m)
+    LATENCY.observe(m)
+
+# With BACKPLANE_DB set (uvicorn --workers N), events and call records from every worker
+# are merged into this worker's event ring, METRICS and LATENCY.
+BACKPLANE = backplane.start(event_bus.ingest, _ingest_metric, warm_metrics=METRICS_CAP)
+if BACKPLANE:
+    event_bus.on_emit = BACKPLANE.publish_event
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
@@ -191,20 +373,86 @@ def health():
             llm_ok = False
     return {
         "ok": True,
+        "ready": READY.ready,
         "whisper_model": WHISPER_MODEL,
         "device": WHISPER_DEVICE,
         "piper_bin": PIPER_BIN,
         "piper_voice": PIPER_VOICE,
         "piper_json": PIPER_JSON,
+        "piper_pool": PIPER_POOL.stats(),
         "piper_ok": os.path.exists(PIPER_BIN) and os.path.exists(PIPER_VOICE),
         "json_ok": os.path.exists(PIPER_JSON),
         "llm_endpoint": llm_ep,
         "llm_model": llm_model,
         "llm_ok": llm_ok,
-        "personas_loaded": bool(_PERSONAS),
+        "llm_breaker": llm_backends.BREAKER.stats() if llm_backends else None,
+        "llm_pool": llm_backends.pool_stats() if llm_backends else None,
+        "personas_loaded": bool(PERSONAS.stats()["loaded"]),
+        "personas": PERSONAS.stats(),
         "metrics_buffer": len(METRICS),
+        "events": event_bus.stats(),
+        "worker": os.getpid(),
+        "backplane": BACKPLANE.stats() if BACKPLANE else None,
+        "calllog": CALLLOG.stats() if CALLLOG else None,
     }
 
+# ---------- Readiness ----------
+@app.get("/ready")
+def ready():
+    """Readiness (vs. /health liveness): 200 once models are loaded and warmed, else 503 with progress."""
+    return JSONResponse(READY.stats(), status_code=200 if READY.ready else 503)
+
+def _not_ready_error() -> tuple[str, bool]:
+    """(message, worth retrying) while READY isn't green."""
+    failed = READY.failed()
+    if failed:
+        return f"unavailable: {', '.join(failed)} failed to load", False
+    return "warming up", True
+
+def not_ready() -> JSONResponse:
+    error, retry = _not_ready_error()
+    return JSONResponse({"error": error, **READY.stats()}, status_code=503,
+                        headers={"Retry-After": "2"} if retry else None)  # no Retry-After when it won't recover
+
+WARMUP_TEXT = "Hello."
+
+def _load_tts() -> None:
+    if not (os.path.exists(PIPER_BIN) and os.path.exists(PIPER_VOICE)):
+        raise FileNotFoundError(PIPER_BIN if not os.path.exists(PIPER_BIN) else PIPER_VOICE)
+    PIPER_POOL.prewarm(PIPER_VOICE, PIPER_JSON)
+
+def _warm_up() -> None:
+    READY.run("whisper", load_whisper, warm_whisper)
+    READY.run("tts", _load_tts, lambda: _piper_synth(WARMUP_TEXT, PIPER_VOICE, PIPER_JSON),  # bypasses TTS_CACHE
+              tries=TTS_WARM_TRIES, permanent=(FileNotFoundError,))
+    errors = {n: c.get("error") for n, c in READY.stats()["components"].items() if c["state"] == "error"}
+    if READY.ready:
+        log.info("ready %d ms after import", READY.ready_ms())
+        if errors:
+            log.warning("degraded: %s", errors)
+    else:
+        log.error("not ready: %s", errors)
+
+async def _warm_llm() -> None:
+    if llm_backends is None:
+        READY.set("llm", "error", error="llm_backends unavailable")
+        return
+    READY.set("llm", "loading")
+    ok = await llm_backends.awarm()
+    READY.set("llm", "ready" if ok else "error", **({} if ok else {"error": "endpoint unreachable; fallback replies"}))
+
+@app.on_event("startup")
+async def _startup():
+    log.info("listening %d ms after import", (time.perf_counter() - T_IMPORT) * 1000)
+    threading.Thread(target=_warm_up, name="warmup", daemon=True).start()
+    asyncio.create_task(_warm_llm())
+
+@app.on_event("shutdown")
+async def _shutdown():
+    if llm_backends:
+        await llm_backends.aclose()
+    PIPER_POOL.close()  # workers and their /dev/shm output dirs
+
 # ---------- Mini dashboard ----------
 @app.get("/metrics")
 def metrics():
@@ -220,110 +468,454 @@ def metrics():
             "tts":   avg("tts"),
             "total": avg("total"),
         },
-        "items": items[::-1],  # newest first
+        "items": items[::-1],  # newest first (all workers when BACKPLANE_DB is set)
+        "worker": os.getpid(),  # stt_batch / caches below are this worker's own
+        "stt_batch": STT_BATCHER.stats(),
+        "stt_partials": {**STT_PARTIALS, "slots": STT_PARTIAL_SLOTS},
+        "tts_cache": TTS_CACHE.stats(),
+        "reply_cache": REPLY_CACHE.stats() if REPLY_CACHE else None,
+        "latency": LATENCY.summary(),  # p50/p95/p99 per stage, by persona and by llm/fallback/cache
     })
 
+@app.get("/calls")
+def calls(persona: str | None = None, since: str | None = None, slow_ms: int | None = None,
+          cursor: int | None = None, limit: int = 50):
+    """
+    Call history from the on-disk log, newest first. since = ISO time or epoch seconds,
+    slow_ms = only calls with total ≥ this; page with cursor=<next_cursor>.
+    """
+    if not CALLLOG:
+        return JSONResponse({"error": "call log disabled (CALLLOG_DB)"}, status_code=404)
+    try:
+        return JSONResponse(CALLLOG.query(persona, since, slow_ms, cursor, limit))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+@app.get("/trace/{call_id}")
+def trace(call_id: str):
+    """Chrome trace-event JSON for a recent call (open in Perfetto / chrome://tracing)."""
+    tr = tracing.get(call_id)
+    if tr is None:
+        return JSONResponse({"error": "unknown or expired call_id"}, status_code=404)
+    return JSONResponse(tr.chrome())
+
+@app.get("/metrics/prom", include_in_schema=False)
+def metrics_prom():
+    """Prometheus text format: per-stage latency histograms + percentile gauges."""
+    return PlainTextResponse(LATENCY.prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# ---------- LLM → sentences → TTS (overlapped) ----------
+async def _reply_sentences(persona_info: dict, persona: str, system_prompt: str,
+                           transcript: str, call_id: str, record: dict):
+    """
+    Yield reply sentences as soon as the LLM completes each one, else the canned fallback. Fills record["ms"] llm/llm_ttft/llm_ttfs,
+    record["llm_used"], record["reply_cache"] and record["reply_preview"].
+    A reply cache hit (REPLY_CACHE=1) skips the LLM; only complete LLM replies are stored.
+    """
+    t1 = time.time()
+    tp1 = time.perf_counter()
+    name = persona_info.get("name", persona)
+    persona_id = persona_info.get("id", persona)
+    ms = record["ms"]
+    used_llm = False
+    reply_text = ""
+    try:
+        if transcript:
+            event_bus.emit("llm_start", "Generating…", call_id)
+        if transcript and REPLY_CACHE:
+            cached, record["reply_cache"] = REPLY_CACHE.get(persona_id, transcript)
+            if cached:  # llm_used stays False: reply_cache / X-Reply-Cache say where it came from
+                reply_text = cached
+                splitter = SentenceSplitter()  # same sentences the LLM path produced
+                for sent in splitter.feed(cached) + splitter.flush():
+                    yield sent
+                return
+        if transcript:
+            if llm_backends and await llm_backends.ahealth():
+                splitter = SentenceSplitter()
+                tokens = llm_backends.achat_stream(system_prompt, transcript)
+                complete = False
+                try:
+                    while True:
+                        try:
+                            tok = await anext(tokens)
+                        except StopAsyncIteration:
+                            complete = True
+                            break
+                        except Exception:  # the LLM failed mid-reply
+                            break
+                        if "llm_ttft" not in ms:
+                            ms["llm_ttft"] = int((time.time() - t1) * 1000)
+                        used_llm = record["llm_used"] = True
+                        reply_text += tok
+                        for sent in splitter.feed(tok):
+                            if "llm_ttfs" not in ms:
+                                ms["llm_ttfs"] = int((time.time() - t1) * 1000)
+                            yield sent
+                finally:
+                    await tokens.aclose()
+                for sent in splitter.flush():
+                    yield sent
+                if complete and used_llm and REPLY_CACHE:
+                    REPLY_CACHE.put(persona_id, transcript, reply_text.strip())
+            if not used_llm:
+                fallback = f"{name} says: {clean_and_punctuate(transcript)}"
+        else:
+            fallback = f"{name} is listening."
+        if not used_llm:
+            reply_text = fallback
+            for sent in split_sentences(clean_and_punctuate(fallback)) or [fallback]:
+                yield sent
+    finally:
+        reply_text = reply_text.strip()
+        ms["llm"] = int((time.time() - t1) * 1000)
+        record["llm_used"] = used_llm
+        record["reply_preview"] = reply_text[:500]
+        tracing.record(tracing.current(), "llm", tp1, time.perf_counter(),
+                       used=used_llm, cache=record.get("reply_cache"))
+        event_bus.emit("llm_done", "LLM reply", call_id,
+                       ms=ms["llm"], used=used_llm, reply=reply_text[:500], cache=record.get("reply_cache"),
+                       ttft_ms=ms.get("llm_ttft"), ttfs_ms=ms.get("llm_ttfs"))
+
+async def _chain(first, rest):
+    if first is not None:
+        yield first
+    async for s in rest:
+        yield s
+
+async def _tts_clips(sentences, voice_path: str, voice_json: str, call_id: str, tts_t: dict):
+    """
+    Start synthesis of each sentence the moment it arrives; yield WAV clips in order.
+    tts_t["start"] is set when the first sentence arrives (TTS timing starts there).
+    """
+    q: asyncio.Queue = asyncio.Queue()
+
+    async def feed():
+        try:
+            async for s in sentences:
+                if "start" not in tts_t:
+                    tts_t["start"] = time.time()
+                    event_bus.emit("tts_start", "Speaking…", call_id)
+                task = asyncio.ensure_future(piper_tts_async(s, voice_path, voice_json))
+                pending.append(task)
+                q.put_nowait(task)
+        finally:
+            q.put_nowait(None)
+
+    pending: list[asyncio.Future] = []
+    feeder = asyncio.create_task(feed())
+    try:
+        while (task := await q.get()) is not None:
+            try:
+                yield await task
+            except Exception:
+                continue
+    finally:
+        feeder.cancel()
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(feeder, *pending, return_exceptions=True)
+
+async def _stream_tts(sentences, voice_path: str, voice_json: str, call_id: str,
+                      t_all0: float, record: dict, out_fmt: str, out_sr: int, channels: int = 1,
+                      pause_ms: int = 120):
+    """
+    Yield the reply as each sentence is ready, at `out_sr`: out_fmt "wav" is a header
+    followed by PCM per sentence, "pcm" is bare S16LE. One StreamResampler runs across
+    the sentences and pauses, so the joins have no filter edges; it holds back a few
+    input samples (~1 ms), which go out with the next sentence or at the end.
+    """
+    tts_t: dict = {}
+    t_first = None
+    t_enc = 0.0
+    rs, rs_sr = None, 0
+    clips = _tts_clips(sentences, voice_path, voice_json, call_id, tts_t)
+    try:
+        async for clip in clips:
+            try:
+                y, sr = sf.read(io.BytesIO(clip), dtype="float32")
+            except Exception:
+                continue
+            t_e = time.time()
+            pause = 0
+            if t_first is None:
+                t_first = time.time() - t_all0
+                event_bus.emit("tts_first_audio", "First audio", call_id, ms=int(t_first * 1000))
+                if out_fmt == "wav":
+                    yield wav_stream_header(out_sr, channels)
+            else:
+                pause = int(sr * (pause_ms / 1000.0))
+            if y.ndim > 1:
+                y = y.mean(axis=1)
+            with tracing.span("encode", format=out_fmt, rate=out_sr):
+                parts = []
+                if rs_sr != sr:  # first clip, or a voice at another rate
+                    if rs is not None:
+                        parts.append(rs.flush())
+                    rs, rs_sr = StreamResampler(sr, out_sr), sr
+                parts.append(rs.process(np.concatenate([np.zeros(pause, dtype=np.float32), y]) if pause else y))
+                chunk = pcm16_bytes(np.concatenate(parts), channels)
+            t_enc += time.time() - t_e
+            yield chunk
+        if t_first is None:
+            # nothing synthesized — same 1 s of silence as concat_clips
+            head = wav_stream_header(out_sr, channels) if out_fmt == "wav" else b""
+            yield head + pcm16_bytes(np.zeros(out_sr, dtype=np.float32), channels)
+        elif rs is not None:
+            tail = rs.flush()
+            if len(tail):
+                yield pcm16_bytes(tail, channels)
+    finally:
+        await clips.aclose()
+        t_tts = time.time() - tts_t.get("start", time.time())
+        event_bus.emit("tts_done", "TTS done", call_id, ms=int(t_tts * 1000))
+        record["ms"]["tts"] = int(t_tts * 1000)
+        record["ms"]["encode"] = int(t_enc * 1000)
+        record["ms"]["total"] = int((time.time() - t_all0) * 1000)
+        if t_first is not None:
+            record["ms"]["first_audio"] = int(t_first * 1000)
+        record["streamed"] = True
+        _push_metric(record)
+        event_bus.emit("call_end", "Completed", call_id, total_ms=record["ms"]["total"])
 
 # ---------- Main endpoint ----------
 @app.post("/converse")
-async def converse(persona: str = Form(...), audio: UploadFile = Form(...)):
-    t_all0 = time.time()
-    persona_info = _persona_lookup(persona)
+async def converse(persona: str = Form(...), audio: UploadFile = Form(...), stream: int = 0,
+                   out_format: str | None = Form(None, alias="format"), sample_rate: int = Form(0),
+                   channels: int = Form(1), accept: str | None = Header(None)):
+    """
+    Non-streaming (default): reply is one file, sent after every sentence is synthesized.
+    ?stream=1: WAV header + PCM (or bare PCM) sent sentence by sentence as soon as each is ready.
+    Reply format: `format` field (wav | pcm | flac | opus) or the Accept header; `sample_rate`
+    (0 = the voice's own) and `channels` (1 | 2). FLAC and Opus are never streamed.
+    """
+    # upload: WAV, FLAC or Ogg — decoded in memory, no temp file
+    return await _converse(persona, audio.read, decode_upload, stream, out_format, sample_rate, channels, accept)
+
+PCM_MAX_SEC = float(os.environ.get("PCM_MAX_SEC", "60"))  # /converse/pcm upload cap
+
+@app.post("/converse/pcm")
+async def converse_pcm(request: Request, persona: str, stream: int = 0, out_format: str | None = Query(None, alias="format"),
+                       sample_rate: int = 0, channels: int = 1, in_rate: int = WHISPER_SR,
+                       accept: str | None = Header(None)):
+    """
+    /converse for audio uploaded while the caller is still speaking. Body (chunked) =
+    frames of [4-byte big-endian length][S16LE mono PCM at in_rate]; a zero-length frame
+    ends the utterance. Reply options are query parameters, same meaning as /converse.
+    """
+    async def read_frames() -> bytes:
+        buf, pcm = bytearray(), bytearray()
+        cap = int(PCM_MAX_SEC * in_rate) * 2
+        too_long = f"upload longer than PCM_MAX_SEC ({PCM_MAX_SEC:g} s)"
+        async for chunk in request.stream():
+            buf += chunk
+            while len(buf) >= 4:
+                n = int.from_bytes(buf[:4], "big")
+                if n == 0:
+                    return bytes(pcm)
+                if n > cap - len(pcm):  # checked on the prefix, before the frame is buffered
+                    raise ValueError(too_long)
+                if len(buf) < 4 + n:
+                    break
+                pcm += buf[4:4 + n]
+                del buf[:4 + n]
+        raise ValueError("upload ended without the end-of-utterance frame")
+
+    def decode(pcm: bytes) -> np.ndarray:
+        y = np.frombuffer(pcm[:len(pcm) & ~1], dtype="<i2").astype(np.float32) / 32768.0
+        with tracing.span("stt.resample", src_sr=in_rate):
+            return resample_audio(y, in_rate, WHISPER_SR)
+
+    if not 8000 <= in_rate <= 48000:
+        return JSONResponse({"error": "in_rate must be 8000-48000"}, status_code=400)
+    return await _converse(persona, read_frames, decode, stream, out_format, sample_rate, channels, accept,
+                           live_upload=True)
+
+@app.websocket("/converse/ws")
+async def converse_ws(ws: WebSocket, persona: str, out_format: str | None = Query(None, alias="format"),
+                      sample_rate: int = 0, channels: int = 1, in_rate: int = WHISPER_SR):
+    """
+    Speech in, partial transcripts and reply audio out, on one socket.
+    Client → binary S16LE mono PCM at in_rate as the caller speaks; {"type": "end"} (or an
+    empty binary message) ends the utterance.
+    Server → {"type": "partial", "text"} while audio arrives, {"type": "final", "text", "ms"},
+    {"type": "reply_start", "format", "rate", "channels", ...}, binary audio (wav | pcm, sent
+    sentence by sentence as with /converse?stream=1), {"type": "reply_end", "ms"}.
+    """
+    await ws.accept()
+    try:
+        out_fmt = reply_codec.negotiate(out_format or "pcm", None)
+        if out_fmt not in reply_codec.STREAMABLE:
+            raise ValueError("format must be wav or pcm over a WebSocket")
+        if channels not in (1, 2) or not (sample_rate == 0 or 8000 <= sample_rate <= 48000) \
+                or not 8000 <= in_rate <= 48000:
+            raise ValueError("channels must be 1 or 2, sample_rate 0 or 8000-48000, in_rate 8000-48000")
+    except ValueError as e:
+        await ws.send_json({"type": "error", "error": str(e)})
+        return await ws.close(code=1008)
+    if not READY.ready:
+        error, retry = _not_ready_error()
+        await ws.send_json({"type": "error", "error": error, **READY.stats()})
+        return await ws.close(code=1013 if retry else 1011)
+
+    persona_info = PERSONAS.lookup(persona)
     call_id = str(uuid.uuid4())
+    tracing.begin(call_id)
     event_bus.emit("phone_start", "Call started", call_id, persona=persona_info.get("id", persona))
-
     system_prompt = persona_info.get("system") or f"You are {persona_info.get('name', persona)}. Be concise."
-    # Allow per-persona voice override
-    voice_path = persona_info.get("voice", PIPER_VOICE)               # expects .onnx
-    voice_json = persona_info.get("voice_json", f"{voice_path}.json") # optional explicit override
-    if voice_path.endswith(".json"):
-        guess = voice_path[:-5]  # strip .json
-        if os.path.exists(guess):
-            voice_path = guess
+    voice_path, voice_json = persona_info["voice"], persona_info["voice_json"]
+    out_sr = reply_codec.output_rate(out_fmt, sample_rate or voice_sample_rate(voice_json))
 
-    # 1) read upload
-    wav_bytes = await audio.read()
-
-    # 2) save temp
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        tmp.write(wav_bytes)
-        tmp_path = tmp.name
+    # 1) audio in, partials out: one partial decode in flight at a time, on the STT executor
+    stt = StreamingTranscriber(WHISPER_SR)
+    loop = asyncio.get_running_loop()
+    pending: asyncio.Task | None = None
 
-    # 3) transcribe
-    event_bus.emit("stt_start", "Transcribing…", call_id)
-    t0 = time.time()
-    segments, _info = model.transcribe(
-        tmp_path,
-        beam_size=5,
-        vad_filter=True,
-        vad_parameters={"min_silence_duration_ms": 300},
-        language="en",
-        initial_prompt="Casual, modern English conversation.",
-    )
-    transcript = "".join(s.text for s in segments).strip()
-    t_stt = time.time() - t0
-    event_bus.emit("stt_done", "Transcript ready", call_id,
-                   ms=int(t_stt * 1000), transcript=transcript)
+    async def run_partial():
+        try:
+            start, y = stt.window()
+            segs = await loop.run_in_executor(STT_EXECUTOR, tracing.bind(partial_segments, wait="stt.executor_wait"),
+                                              model, y, stt.prompt(STT_PROMPT))
+            text = stt.apply(start, segs)
+            if text:
+                event_bus.emit("stt_partial", "Hearing…", call_id, transcript=text, sec=round(stt.n / WHISPER_SR, 2))
+                await ws.send_json({"type": "partial", "text": text})
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass  # a failed partial only costs a progress update
 
-    # cleanup temp
     try:
-        os.unlink(tmp_path)
-    except Exception:
-        pass
+        with tracing.span("upload_read"):
+            while True:
+                msg = await ws.receive()
+                if msg["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(msg.get("code", 1000))
+                data = msg.get("bytes")
+                if data is None:
+                    if (json.loads(msg.get("text") or "{}") or {}).get("type") == "end":
+                        break
+                    continue
+                if not data:
+                    break
+                if stt.n == 0:
+                    event_bus.emit("stt_start", "Transcribing…", call_id, streaming=True)
+                y = np.frombuffer(data[:len(data) & ~1], dtype="<i2").astype(np.float32) / 32768.0
+                stt.feed(resample_audio(y, in_rate, WHISPER_SR))
+                if stt.n > PCM_MAX_SEC * WHISPER_SR:
+                    break
+                if stt.due() and (pending is None or pending.done()) and _partial_slot():
+                    pending = asyncio.create_task(run_partial())
+                    pending.add_done_callback(_partial_done)  # also runs if cancelled before it starts
+    except WebSocketDisconnect:
+        if pending:
+            pending.cancel()
+        event_bus.emit("call_end", "Caller hung up", call_id, reason="disconnect")
+        return
+
+    # 2) final transcript: only the uncommitted tail is decoded now
+    t_all0 = t0 = time.time()
+    if pending and not pending.done():
+        pending.cancel()
+    with tracing.span("stt", partials=stt.partials):
+        tail = stt.tail()
+        transcript = stt.final(await STT_BATCHER.transcribe(tail) if len(tail) else "")
+    t_stt = time.time() - t0
+    event_bus.emit("stt_done", "Transcript ready", call_id, ms=int(t_stt * 1000), transcript=transcript,
+                   partials=stt.partials, upload_sec=round(stt.n / WHISPER_SR, 2))
+    record = _call_record(call_id, persona_info, persona, transcript, t_stt)
+    record["streamed_stt"] = True
 
-    # 4) LLM (vLLM if up, else fallback stub)
-    t1 = time.time()
-    used_llm = False
-    reply_text = ""
-    if transcript:
-        event_bus.emit("llm_start", "Generating…", call_id)    
-        if llm_backends and llm_backends.health():
-            try:
-                reply_text = llm_backends.chat(system_prompt, transcript)
-                used_llm = True
-            except Exception:
-                used_llm = False
-        if not used_llm:
-            reply_text = f"{persona_info.get('name', persona)} says: {clean_and_punctuate(transcript)}"
-    else:
-        reply_text = f"{persona_info.get('name', persona)} is listening."
-    t_llm = time.time() - t1
-    event_bus.emit("llm_done", "LLM reply", call_id,                     
-               ms=int(t_llm * 1000), used=used_llm, reply=reply_text[:500])
-
-    # 5) TTS
-    event_bus.emit("tts_start", "Speaking…", call_id) 
-    t2 = time.time()
+    # 3) LLM starts right away; reply audio goes back on the socket sentence by sentence
+    audio = None
     try:
-        audio_bytes = piper_tts_multi(reply_text, voice_path, voice_json, target_sr=None, pause_ms=120)
-        buf = io.BytesIO(audio_bytes)
+        await ws.send_json({"type": "final", "text": transcript, "call_id": call_id, "ms": dict(record["ms"])})
+        sentences = _reply_sentences(persona_info, persona, system_prompt, transcript, call_id, record)
+        first = await anext(sentences, None)
+        await ws.send_json({"type": "reply_start", "format": out_fmt, "rate": out_sr, "channels": channels,
+                            "persona": record["persona"], "llm_used": record["llm_used"],
+                            "reply_cache": record.get("reply_cache"), "ms": dict(record["ms"])})
+        audio = _stream_tts(_chain(first, sentences), voice_path, voice_json, call_id, t_all0, record,
+                            out_fmt, out_sr, channels, pause_ms=120)
+        async for chunk in audio:
+            await ws.send_bytes(chunk)
+        await ws.send_json({"type": "reply_end", "ms": record["ms"]})
+        await ws.close()
+    except WebSocketDisconnect:
+        pass  # caller hung up mid-reply; _stream_tts still records the call
     except Exception:
-        sr = 16000
-        y = np.zeros(int(sr * 1.0), dtype=np.float32)
-        buf = io.BytesIO()
-        sf.write(buf, y, sr, format="WAV", subtype="PCM_16")
-        buf.seek(0)
-    t_tts = time.time() - t2
-    event_bus.emit("tts_done", "TTS done", call_id,
-                   ms=int(t_tts * 1000), audio=buf)
+        log.exception("/converse/ws %s: reply failed", call_id)
+        try:
+            await ws.send_json({"type": "error", "error": "reply failed", "call_id": call_id})
+            await ws.close(code=1011)
+        except Exception:
+            pass  # the socket went too
+    finally:
+        if audio is not None:
+            await audio.aclose()
 
-    # 6) metrics
-    METRICS.append({
-        "ts": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+def _call_record(call_id: str, persona_info: dict, persona: str, transcript: str, t_stt: float) -> dict:
+    return {
+        "ts": _now_iso(),
+        "call_id": call_id,
         "persona": persona_info.get("id", persona),
         "name": persona_info.get("name", persona),
         "transcript": transcript,
-        "reply_preview": reply_text[:500],
-        "ms": {
-            "stt":   int(t_stt * 1000),
-            "llm":   int(t_llm * 1000),
-            "tts":   int(t_tts * 1000),
-            "total": int((time.time() - t_all0) * 1000),
-        },
-        "llm_used": used_llm,
-    })
+        "reply_preview": "",
+        "ms": {"stt": int(t_stt * 1000)},
+        "llm_used": False,
+    }
+
+async def _converse(persona: str, read_upload, decode, stream: int, out_format: str | None,
+                    sample_rate: int, channels: int, accept: str | None, live_upload: bool = False):
+    """
+    The call itself: read_upload() → bytes, decode(bytes) → float32 16 kHz, then STT → LLM → TTS.
+    live_upload: the upload lasts as long as the caller speaks, so timings start once it's in.
+    """
+    t_all0 = time.time()
+    try:
+        out_fmt = reply_codec.negotiate(out_format, accept)
+        if channels not in (1, 2) or not (sample_rate == 0 or 8000 <= sample_rate <= 48000):
+            raise ValueError("channels must be 1 or 2, sample_rate 0 or 8000-48000")
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if not READY.ready:
+        return not_ready()
+    if out_fmt not in reply_codec.STREAMABLE:
+        stream = 0
+    persona_info = PERSONAS.lookup(persona)
+    call_id = str(uuid.uuid4())
+    tracing.begin(call_id)
+    event_bus.emit("phone_start", "Call started", call_id, persona=persona_info.get("id", persona))
+
+    system_prompt = persona_info.get("system") or f"You are {persona_info.get('name', persona)}. Be concise."
+    # per-persona voice override, resolved when personas.json was loaded
+    voice_path, voice_json = persona_info["voice"], persona_info["voice_json"]
+    out_sr = reply_codec.output_rate(out_fmt, sample_rate or voice_sample_rate(voice_json))
 
-    # 7) headers + end event
+    # 1) read upload
+    try:
+        with tracing.span("upload_read"):
+            audio_bytes = await read_upload()
+    except (ValueError, ClientDisconnect) as e:
+        event_bus.emit("call_end", "Upload failed", call_id, error=str(e) or type(e).__name__)
+        return JSONResponse({"error": str(e) or "client disconnected"}, status_code=400)
+    if live_upload:
+        t_all0 = time.time()
+
+    # 2) decode + transcribe
+    event_bus.emit("stt_start", "Transcribing…", call_id)
+    t0 = time.time()
+    with tracing.span("stt"):
+        transcript = await STT_BATCHER.transcribe(await asyncio.to_thread(decode, audio_bytes))
+    t_stt = time.time() - t0
+    event_bus.emit("stt_done", "Transcript ready", call_id,
+                   ms=int(t_stt * 1000), transcript=transcript, upload_bytes=len(audio_bytes))
+
+    # 3) LLM → TTS, overlapped: each sentence is synthesized as soon as the LLM finishes it
+    record = _call_record(call_id, persona_info, persona, transcript, t_stt)
+    sentences = _reply_sentences(persona_info, persona, system_prompt, transcript, call_id, record)
     headers = {
         "X-Persona": persona_info.get("id", persona),
         "X-Transcript": transcript[:1000] if transcript else "",
@@ -331,14 +923,59 @@ async def converse(persona: str = Form(...), audio: UploadFile = Form(...)):
         "X-Device": WHISPER_DEVICE,
         "X-LLM-Endpoint": getattr(llm_backends, "ENDPOINT", "") if llm_backends else "",
         "X-LLM-Model": getattr(llm_backends, "MODEL", "") if llm_backends else "",
-        "X-LLM-Used": "1" if used_llm else "0",
         "X-Timing-STT-ms": str(int(t_stt * 1000)),
-        "X-Timing-LLM-ms": str(int(t_llm * 1000)),
-        "X-Timing-TTS-ms": str(int(t_tts * 1000)),
-        "X-Timing-Total-ms": str(int((time.time() - t_all0) * 1000)),
+        "X-Call-Id": call_id,
+        "X-Audio-Format": f"{out_fmt};rate={out_sr};channels={channels}",
     }
-    headers["X-Call-Id"] = call_id
-    event_bus.emit("call_end", "Completed", call_id, total_ms=int((time.time() - t_all0) * 1000))
 
-    return StreamingResponse(buf, media_type="audio/wav", headers=headers)
+    def llm_headers():
+        headers["X-LLM-Used"] = "1" if record["llm_used"] else "0"
+        if "reply_cache" in record:
+            headers["X-Reply-Cache"] = record["reply_cache"]  # exact | near | miss
+        for key, h in (("llm", "LLM"), ("llm_ttft", "LLM-TTFT"), ("llm_ttfs", "LLM-TTFS")):
+            if key in record["ms"]:
+                headers[f"X-Timing-{h}-ms"] = str(record["ms"][key])
+
+    # 4) TTS — streamed sentence by sentence (headers go out with the first sentence)...
+    if stream:
+        first = await anext(sentences, None)
+        llm_headers()
+        headers["X-Streaming"] = "1"
+        return StreamingResponse(
+            _stream_tts(_chain(first, sentences), voice_path, voice_json, call_id, t_all0, record,
+                        out_fmt, out_sr, channels, pause_ms=120),
+            media_type=reply_codec.media_type(out_fmt, out_sr, channels), headers=headers)
+
+    # ...or as one file, encoded once in the requested format
+    tts_t: dict = {}
+    try:
+        clips = [c async for c in _tts_clips(sentences, voice_path, voice_json, call_id, tts_t)]
+        with tracing.span("tts.concat", clips=len(clips)):
+            y, sr = concat_clips(clips, target_sr=None, pause_ms=120)
+    except Exception:
+        y, sr = np.zeros(out_sr, dtype=np.float32), out_sr
+    t_tts = time.time() - tts_t.get("start", time.time())
+    if not sample_rate:  # the clips' actual rate, rather than the one the voice config claims
+        out_sr = reply_codec.output_rate(out_fmt, sr)
+        headers["X-Audio-Format"] = f"{out_fmt};rate={out_sr};channels={channels}"
+    t_e = time.time()
+    with tracing.span("encode", format=out_fmt, rate=out_sr):
+        buf = io.BytesIO(await asyncio.to_thread(
+            lambda: reply_codec.encode(resample_audio(y, sr, out_sr), out_sr, out_fmt, channels)))
+    t_enc = time.time() - t_e
+    event_bus.emit("tts_done", "TTS done", call_id,
+                   ms=int(t_tts * 1000), audio=buf)
+
+    # 5) metrics + end event
+    record["ms"]["tts"] = int(t_tts * 1000)
+    record["ms"]["encode"] = int(t_enc * 1000)
+    record["ms"]["total"] = int((time.time() - t_all0) * 1000)
+    _push_metric(record)
+    llm_headers()
+    headers["X-Timing-TTS-ms"] = str(int(t_tts * 1000))
+    headers["X-Timing-Encode-ms"] = str(int(t_enc * 1000))
+    headers["X-Timing-Total-ms"] = str(int((time.time() - t_all0) * 1000))
+    event_bus.emit("call_end", "Completed", call_id, total_ms=int((time.time() - t_all0) * 1000))
 
+    # one body (with Content-Length): iterating the BytesIO would send it line by line, thousands of tiny chunks
+    return Response(buf.getvalue(), media_type=reply_codec.media_type(out_fmt, out_sr, channels), headers=headers)
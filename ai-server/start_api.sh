@@ -30,5 +30,10 @@ else
   echo "ℹ️  $THIS_DIR/make_voice_assets.sh not found or not executable; skipping asset generation."
 fi
 
-# Start API
-exec python -m uvicorn server:app --host 0.0.0.0 --port "${PORT:-8000}"
+# Start API. WORKERS>1 runs several processes (each loads its own Whisper); they share
+# dashboard events and metrics through a SQLite WAL file on /dev/shm.
+WORKERS="${WORKERS:-1}"
+if [ "$WORKERS" -gt 1 ]; then
+  export BACKPLANE_DB="${BACKPLANE_DB:-/dev/shm/timephone-backplane.db}"
+fi
+exec python -m uvicorn server:app --host 0.0.0.0 --port "${PORT:-8000}" --workers "$WORKERS"
@@ -0,0 +1,204 @@
+import asyncio, contextvars, os, time
+from collections import Counter
+from concurrent.futures import Executor
+from typing import Callable
+
+import numpy as np
+from faster_whisper.audio import pad_or_trim
+from faster_whisper.tokenizer import Tokenizer
+from faster_whisper.transcribe import get_compression_ratio, get_ctranslate2_storage, get_suppressed_tokens
+from faster_whisper.vad import VadOptions, collect_chunks, get_speech_timestamps
+
+import tracing
+
+STT_BATCH_MAX       = int(os.environ.get("STT_BATCH_MAX", "4"))          # 1 = no batching
+STT_BATCH_WINDOW_MS = float(os.environ.get("STT_BATCH_WINDOW_MS", "40"))  # wait this long for company (only when busy)
+
+# transcribe()'s defaults: a decode past these is retried at higher temperatures, unless it's silence
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOG_PROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def _check(text: str, avg_logprob: float, no_speech_prob: float) -> str:
+    """What transcribe() would do with this greedy-temperature decode: "ok", "silence" or "fallback"."""
+    if no_speech_prob > NO_SPEECH_THRESHOLD and avg_logprob < LOG_PROB_THRESHOLD:
+        return "silence"
+    if get_compression_ratio(text) > COMPRESSION_RATIO_THRESHOLD or avg_logprob < LOG_PROB_THRESHOLD:
+        return "fallback"
+    return "ok"
+
+
+def transcribe_batch(model, audios: list[np.ndarray], beam_size: int = 5,
+                     initial_prompt: str = "", min_silence_ms: int = 300) -> list[str]:
+    """
+    One batched Whisper decode for several 16 kHz clips. Each clip is VAD-trimmed like
+    transcribe(vad_filter=True); clips whose speech fits one 30 s window (every phone
+    question: MAX_RECORD_SEC is 30) share a single encode + generate call.
+    Returns None for clips that don't fit, and for clips whose decode fails transcribe()'s
+    compression-ratio / log-prob checks (which would retry at a higher temperature), so
+    the caller can transcribe them alone.
+    """
+    fe = model.feature_extractor
+    tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language="en")
+    vad = VadOptions(min_silence_duration_ms=min_silence_ms)
+
+    out: list = [""] * len(audios)  # no speech → empty transcript, as transcribe() gives
+    idx, segs = [], []
+    for i, a in enumerate(audios):
+        with tracing.span("stt.vad", clip=i):
+            speech = collect_chunks(a, get_speech_timestamps(a, vad))
+        if len(speech) == 0:
+            continue
+        if len(speech) > fe.n_samples:
+            out[i] = None
+            continue
+        with tracing.span("stt.features", clip=i):
+            feats = fe(speech)
+        content = feats.shape[-1] - fe.nb_max_frames
+        segs.append(pad_or_trim(feats[:, :content], fe.nb_max_frames))
+        idx.append(i)
+    if not segs:
+        return out
+
+    prev = tokenizer.encode(" " + initial_prompt.strip()) if initial_prompt else []
+    prompt = model.get_prompt(tokenizer, prev, without_timestamps=True)
+    with tracing.span("stt.encode", batch=len(segs)):
+        encoder_output = model.model.encode(get_ctranslate2_storage(np.stack(segs)), to_cpu=False)
+    with tracing.span("stt.generate", batch=len(segs)):
+        results = model.model.generate(
+            encoder_output,
+            [prompt] * len(segs),
+            beam_size=beam_size,
+            max_length=model.max_length,
+            return_scores=True,
+            return_no_speech_prob=True,
+            suppress_blank=True,
+            suppress_tokens=get_suppressed_tokens(tokenizer, [-1]),
+        )
+    for i, r in zip(idx, results):
+        tokens = [t for t in r.sequences_ids[0] if t < tokenizer.eot]
+        avg_logprob = r.scores[0] * len(tokens) / (len(tokens) + 1)
+        text = tokenizer.decode(tokens).strip()
+        verdict = _check(text, avg_logprob, r.no_speech_prob)
+        if verdict == "silence":
+            continue
+        out[i] = text if verdict == "ok" else None
+    return out
+
+
+class TranscribeBatcher:
+    """
+    Collects transcription requests that arrive within `window_ms` of each other (up to
+    `max_batch`) and runs them as one batch on `executor`; at most `concurrency` batches
+    run at once. A batch of one uses the regular single-clip path.
+
+    The window only opens under load: a request that finds nothing queued and nothing
+    decoding starts right away, so a lone phone never waits for company that won't come.
+    """
+
+    def __init__(self, single: Callable[[np.ndarray], str], batch: Callable[[list], list],
+                 executor: Executor, concurrency: int,
+                 max_batch: int = STT_BATCH_MAX, window_ms: float = STT_BATCH_WINDOW_MS):
+        self.single = single
+        self.batch = batch
+        self.executor = executor
+        self.concurrency = concurrency
+        self.max_batch = max(1, max_batch)
+        self.window = window_ms / 1000.0
+        self._q: "asyncio.Queue | None" = None
+        self._task: "asyncio.Task | None" = None
+        self._running = 0  # batches dispatched and not finished
+        # stats
+        self.batches = 0
+        self.requests = 0
+        self.fill: Counter = Counter()
+        self.wait_ms_sum = 0.0
+        self.wait_ms_max = 0.0
+
+    async def transcribe(self, audio: np.ndarray) -> str:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.get_loop() is not loop:
+            self._q = asyncio.Queue()
+            # fresh context: the collector must not inherit the first caller's trace ids
+            self._task = contextvars.Context().run(asyncio.create_task, self._run())
+        fut = loop.create_future()
+        self._q.put_nowait((audio, fut, time.perf_counter(), tracing.current()))
+        return await fut
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        while True:
+            await slots.acquire()
+            batch = [await self._q.get()]
+            deadline = loop.time() + (self.window if self._running or not self._q.empty() else 0.0)
+            while len(batch) < self.max_batch:
+                if not self._q.empty():
+                    batch.append(self._q.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._q.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._running += 1
+            asyncio.create_task(self._dispatch(batch, slots))
+
+    async def _dispatch(self, batch: list, slots: asyncio.Semaphore) -> None:
+        now = time.perf_counter()
+        for _, _, t_in, ids in batch:
+            w = (now - t_in) * 1000
+            self.wait_ms_sum += w
+            self.wait_ms_max = max(self.wait_ms_max, w)
+            tracing.record(ids, "stt.batch_wait", t_in, now, batch=len(batch))
+        self.batches += 1
+        self.requests += len(batch)
+        self.fill[len(batch)] += 1
+        loop = asyncio.get_running_loop()
+        audios = [a for a, _, _, _ in batch]
+        all_ids = tuple(cid for _, _, _, ids in batch for cid in ids)
+        try:
+            if len(batch) == 1:
+                single = tracing.bind(self.single, wait="stt.executor_wait", ids=all_ids)
+                texts = [await loop.run_in_executor(self.executor, single, audios[0])]
+            else:
+                try:
+                    run = tracing.bind(self.batch, wait="stt.executor_wait", ids=all_ids)
+                    texts = await loop.run_in_executor(self.executor, run, audios)
+                except Exception:
+                    texts = [None] * len(audios)
+                for i, t in enumerate(texts):
+                    if t is None:  # too long to batch, or the batched decode failed
+                        single = tracing.bind(self.single, wait="stt.executor_wait", ids=batch[i][3])
+                        texts[i] = await loop.run_in_executor(self.executor, single, audios[i])
+            for (_, fut, _, _), t in zip(batch, texts):
+                if not fut.done():
+                    fut.set_result(t)
+        except Exception as e:
+            for _, fut, _, _ in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+        finally:
+            self._running -= 1
+            slots.release()
+
+    def queued(self) -> int:
+        """Requests waiting for a batch slot (not yet on the executor)."""
+        return self._q.qsize() if self._q is not None else 0
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "window_ms": int(self.window * 1000),
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_fill": round(self.requests / self.batches / self.max_batch, 3) if self.batches else 0,
+            "fill": {str(k): v for k, v in sorted(self.fill.items())},
+            "queue_wait_ms": {
+                "avg": int(self.wait_ms_sum / self.requests) if self.requests else 0,
+                "max": int(self.wait_ms_max),
+            },
+        }
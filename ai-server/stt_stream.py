@@ -0,0 +1,87 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+# Incremental Whisper over a sliding window, for audio that arrives while the caller speaks.
+STT_PARTIAL_MS = float(os.environ.get("STT_PARTIAL_MS", "700"))   # new audio between partial decodes; 0 = final only
+STT_WINDOW_SEC = float(os.environ.get("STT_WINDOW_SEC", "15"))    # most audio one partial decodes
+
+
+def partial_segments(model, audio: np.ndarray, prompt: str = "") -> list[tuple[float, float, str]]:
+    """Fast greedy pass for partials: (start s, end s, text) per segment, no VAD so times line up."""
+    segments, _info = model.transcribe(audio, beam_size=1, vad_filter=False, language="en",
+                                       initial_prompt=prompt or None, condition_on_previous_text=False)
+    return [(s.start, s.end, s.text.strip()) for s in segments if s.text.strip()]
+
+
+class StreamingTranscriber:
+    """
+    Audio is fed in pieces (float32, 16 kHz). Every STT_PARTIAL_MS of new audio the
+    uncommitted tail is re-decoded for a partial transcript. Once the tail is longer
+    than the window, every segment but the last is committed and the window moves past
+    it, so a partial never decodes more than ~STT_WINDOW_SEC and the final decode
+    (full beam search + VAD, like /converse) only covers the uncommitted tail.
+
+    Not thread-safe: call feed/window/apply from one task; only the decode runs elsewhere.
+    """
+
+    def __init__(self, sr: int = 16000, partial_ms: float = STT_PARTIAL_MS, window_sec: float = STT_WINDOW_SEC):
+        self.sr = sr
+        self.step = int(sr * partial_ms / 1000)
+        self.window_len = int(sr * window_sec)
+        self._chunks: list[np.ndarray] = []
+        self._audio = np.zeros(0, dtype=np.float32)
+        self.n = 0                 # samples received
+        self.commit_at = 0         # samples before this are transcribed for good
+        self.committed = ""
+        self.text = ""             # latest partial (committed + hypothesis)
+        self._last_partial = 0     # self.n at the last window()
+        self.partials = 0
+
+    def feed(self, y: np.ndarray) -> None:
+        if len(y):
+            self._chunks.append(y)
+            self.n += len(y)
+
+    def _all(self) -> np.ndarray:
+        if self._chunks:
+            self._audio = np.concatenate([self._audio, *self._chunks])
+            self._chunks.clear()
+        return self._audio
+
+    def due(self) -> bool:
+        return self.step > 0 and self.n - self._last_partial >= self.step
+
+    def window(self) -> tuple[int, np.ndarray]:
+        """(start sample, audio) to decode for the next partial."""
+        self._last_partial = self.n
+        a = self._all()
+        return self.commit_at, a[self.commit_at:]
+
+    def prompt(self, base: str = "") -> str:
+        """Base prompt plus the end of the committed text, so the window continues it."""
+        tail = " ".join(self.committed.split()[-40:])
+        return f"{base} {tail}".strip()
+
+    def apply(self, start: int, segs: list[tuple[float, float, str]]) -> str:
+        """Take a partial decode of window(start); commit and slide when the window is full."""
+        if start != self.commit_at:  # the window moved while this decoded (shouldn't happen)
+            return self.text
+        hyp = " ".join(t for _, _, t in segs)
+        if segs and self.n - start > self.window_len:
+            keep = segs[:-1] if len(segs) > 1 else segs
+            cut = segs[-1][0] if len(segs) > 1 else segs[-1][1]
+            self.committed = f"{self.committed} {' '.join(t for _, _, t in keep)}".strip()
+            self.commit_at = min(self.n, start + int(cut * self.sr))
+            hyp = segs[-1][2] if len(segs) > 1 else ""
+        self.partials += 1
+        self.text = f"{self.committed} {hyp}".strip()
+        return self.text
+
+    def tail(self) -> np.ndarray:
+        """Uncommitted audio, for the final decode."""
+        return self._all()[self.commit_at:]
+
+    def final(self, tail_text: Optional[str]) -> str:
+        return f"{self.committed} {tail_text or ''}".strip()
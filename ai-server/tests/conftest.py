@@ -0,0 +1,52 @@
+import os, sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOADTEST = os.path.join(HERE, "..", "..", "loadtest")
+
+# same side-effect-free import as bench/suite.py: no call log, trace file, prewarmed voices or disk cache
+for k, v in (("CALLLOG_DB", ""), ("TRACE_FILE", ""), ("PERSONAS_PREWARM", "0"),
+             ("PERSONAS_POLL_SEC", "0"), ("TTS_CACHE_DIR", ""), ("BACKPLANE_DB", "")):
+    os.environ.setdefault(k, v)
+# server tests: the load test's stand-in Piper, no LLM (fallback replies)
+for k, v in (("PIPER_BIN", os.path.join(LOADTEST, "fake_piper.py")),
+             ("PIPER_VOICE", os.path.join(LOADTEST, "fake_voice.onnx")),
+             ("FAKE_PIPER_LOAD_SEC", "0"), ("FAKE_PIPER_RTF", "0"),
+             ("LLM_ENDPOINT", "http://127.0.0.1:9/v1"), ("LLM_HEALTH_TIMEOUT", "0.2")):
+    os.environ.setdefault(k, v)
+
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+
+class _Seg:
+    def __init__(self, start: float, end: float, text: str):
+        self.start, self.end, self.text = start, end, text
+
+
+class FakeWhisper:
+    """Hears `text` in any clip with sound in it, nothing in silence."""
+
+    def __init__(self, text: str = "What is relativity?"):
+        self.text = text
+
+    def transcribe(self, audio, **kw):
+        if not len(audio) or float(abs(audio).max()) < 1e-3:
+            return iter([]), None
+        return iter([_Seg(0.0, len(audio) / 16000, " " + self.text)]), None
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """The app module with a stub Whisper and READY green, without running the startup warm-up."""
+    import server as srv
+    monkeypatch.setattr(srv, "model", FakeWhisper())
+    for name in ("whisper", "tts"):
+        srv.READY.set(name, "ready")
+    return srv
+
+
+def pytest_sessionfinish(session, exitstatus):
+    srv = sys.modules.get("server")
+    if srv is not None:
+        srv.PIPER_POOL.close()  # fake Piper workers and their /dev/shm dirs
@@ -0,0 +1,73 @@
+import asyncio, json, time
+
+import pytest
+
+from backplane import Backplane
+from events import EventBus
+
+
+def until(cond, timeout: float = 3.0):
+    end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.01)
+
+
+class Worker:
+    """One uvicorn worker's view of the shared log (both live in this process, so fake the pid)."""
+
+    def __init__(self, db: str, pid: int, start: bool = True):
+        self.events, self.metrics = [], []
+        self.bp = Backplane(db, self.events.append, self.metrics.append, poll_ms=10)
+        self.bp.worker = pid
+        if start:
+            self.bp.start()
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "bp.db")
+
+
+def test_rows_reach_the_other_worker_only(db):
+    a, b = Worker(db, 1), Worker(db, 2)
+    a.bp.publish_event({}, json.dumps({"id": "e1", "type": "stt_done"}))
+    a.bp.publish_metric({"call_id": "c1", "ms": {"total": 900}})
+    until(lambda: b.events and b.metrics)
+    assert json.loads(b.events[0])["id"] == "e1" and b.metrics[0]["call_id"] == "c1"
+    until(lambda: a.bp.cursor >= b.bp.cursor)
+    assert a.events == [] and a.metrics == []  # its own rows aren't echoed back
+    assert a.bp.stats()["published"] == 2 and b.bp.stats()["ingested"] == 2
+
+
+def test_new_worker_warms_from_history_then_tails(db):
+    a = Worker(db, 1)
+    for i in range(5):
+        a.bp.publish_metric({"call_id": f"old{i}"})
+    until(lambda: a.bp.published == 5)
+    late = Worker(db, 3, start=False)
+    late.bp.warm(events=10, metrics=3)
+    assert [m["call_id"] for m in late.metrics] == ["old2", "old3", "old4"]  # newest 3, oldest first
+    late.bp.start()
+    a.bp.publish_metric({"call_id": "new"})
+    until(lambda: late.metrics[-1]["call_id"] == "new")
+    assert len(late.metrics) == 4  # history isn't delivered a second time
+
+
+def test_event_bus_fans_in_across_workers(db):
+    async def main():
+        bus_a, bus_b = EventBus(), EventBus()
+        b = Backplane(db, bus_b.ingest, lambda m: None, poll_ms=10)
+        b.worker = 2
+        a = Backplane(db, bus_a.ingest, lambda m: None, poll_ms=10)
+        a.worker = 1
+        bus_a.on_emit = a.publish_event
+        a.start(); b.start()
+        ev = bus_a.emit("llm_done", "LLM done", "c1", ms=812)
+        for _ in range(300):
+            if bus_b.events:
+                break
+            await asyncio.sleep(0.01)
+        return ev, list(bus_b.events)
+    ev, seen = asyncio.run(main())
+    assert seen == [ev]  # same id, same payload, on the other worker's /events
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from calllog import CallLog
+
+
+def call(i: int, persona: str = "einstein", total: int = 1000, ts: float = 1_700_000_000.0) -> dict:
+    return {"call_id": f"c{i}", "ts": ts + i, "persona": persona, "llm_used": True, "ms": {"total": total}}
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = CallLog(str(tmp_path / "calls.db"))
+    yield log
+    log.close()
+
+
+def fill(log: CallLog, records: list) -> None:
+    for r in records:
+        log.append(r)
+    end = time.monotonic() + 3
+    while log.written < len(records):
+        assert time.monotonic() < end
+        time.sleep(0.01)
+
+
+def test_pages_walk_every_call_newest_first(log):
+    fill(log, [call(i) for i in range(7)])
+    seen, cursor = [], None
+    while True:
+        page = log.query(cursor=cursor, limit=3)
+        seen += [r["call_id"] for r in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"c{i}" for i in reversed(range(7))]
+
+
+def test_new_calls_dont_shift_later_pages(log):
+    fill(log, [call(i) for i in range(4)])
+    first = log.query(limit=2)
+    fill(log, [call(i) for i in range(4, 6)])  # arrive while the client is paging
+    second = log.query(cursor=first["next_cursor"], limit=2)
+    assert [r["call_id"] for r in second["items"]] == ["c1", "c0"]
+
+
+def test_full_last_page_then_empty_page(log):
+    fill(log, [call(i) for i in range(2)])
+    page = log.query(limit=2)
+    assert page["next_cursor"] is not None
+    assert log.query(cursor=page["next_cursor"], limit=2) == {"items": [], "next_cursor": None}
+
+
+def test_filters_combine_with_the_cursor(log):
+    fill(log, [call(0, "curie", 500), call(1, "einstein", 3000), call(2, "einstein", 800),
+               call(3, "einstein", 4000), call(4, "einstein", 5000)])
+    page = log.query(persona="einstein", slow_ms=2000, limit=2)
+    assert [r["call_id"] for r in page["items"]] == ["c4", "c3"]
+    page = log.query(persona="einstein", slow_ms=2000, cursor=page["next_cursor"], limit=2)
+    assert [r["call_id"] for r in page["items"]] == ["c1"] and page["next_cursor"] is None
+    assert [r["call_id"] for r in log.query(since="2023-11-14T22:13:23Z")["items"]] == ["c4", "c3"]
+    assert log.query(since=1_700_000_003)["items"] == log.query(since="2023-11-14T22:13:23+00:00")["items"]
+
+
+def test_calls_endpoint(server, monkeypatch, log):
+    client = TestClient(server.app)
+    monkeypatch.setattr(server, "CALLLOG", None)
+    assert client.get("/calls").status_code == 404
+    monkeypatch.setattr(server, "CALLLOG", log)
+    fill(log, [call(i) for i in range(3)])
+    r = client.get("/calls", params={"limit": 2})
+    assert r.status_code == 200 and [c["call_id"] for c in r.json()["items"]] == ["c2", "c1"]
+    assert client.get("/calls", params={"since": "yesterday"}).status_code == 400
@@ -0,0 +1,44 @@
+import struct
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+
+def frame(pcm: bytes) -> bytes:
+    return struct.pack(">I", len(pcm)) + pcm
+
+
+def speech(sec: float, rate: int = 16000) -> bytes:
+    return (np.sin(np.arange(int(sec * rate)) * 0.05) * 8000).astype("<i2").tobytes()
+
+
+def test_framed_upload_gets_a_reply(server):
+    body = frame(speech(0.5)) + frame(speech(0.5)) + frame(b"")
+    r = TestClient(server.app).post("/converse/pcm?persona=einstein&format=wav", content=body)
+    assert r.status_code == 200
+    assert r.content[:4] == b"RIFF"
+    assert r.headers["x-llm-used"] == "0"  # no LLM here: the fallback reply
+
+
+def test_oversized_length_prefix_is_rejected_before_buffering(server, monkeypatch):
+    monkeypatch.setattr(server, "PCM_MAX_SEC", 1.0)
+    def body():
+        yield struct.pack(">I", 0x7FFFFFFF)  # claims ~2 GB, then keeps streaming
+        for _ in range(50):
+            yield b"\0" * 65536
+
+    r = TestClient(server.app).post("/converse/pcm?persona=einstein", content=body())
+    assert r.status_code == 400
+    assert "PCM_MAX_SEC" in r.json()["error"]
+
+
+def test_frames_past_the_cap_are_rejected(server, monkeypatch):
+    monkeypatch.setattr(server, "PCM_MAX_SEC", 1.0)
+    body = b"".join(frame(speech(0.4)) for _ in range(3)) + frame(b"")
+    r = TestClient(server.app).post("/converse/pcm?persona=einstein", content=body)
+    assert r.status_code == 400
+
+
+def test_missing_end_frame_is_400(server):
+    r = TestClient(server.app).post("/converse/pcm?persona=einstein", content=frame(speech(0.2)))
+    assert r.status_code == 400
@@ -0,0 +1,61 @@
+import asyncio, io, time
+
+import numpy as np
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+
+def question() -> bytes:
+    buf = io.BytesIO()
+    sf.write(buf, (np.sin(np.arange(16000) * 0.05) * 0.3).astype("float32"), 16000, format="WAV")
+    return buf.getvalue()
+
+
+def converse(client, stream: int, **form):
+    return client.post(f"/converse?stream={stream}", data={"persona": "einstein", **form},
+                       files={"audio": ("q.wav", question(), "audio/wav")})
+
+
+def test_streamed_reply_is_the_one_shot_audio(server):
+    client = TestClient(server.app)
+    whole, streamed = converse(client, 0), converse(client, 1)
+    assert whole.status_code == streamed.status_code == 200
+    assert streamed.headers["x-streaming"] == "1" and "content-length" not in streamed.headers
+    # streaming WAV header: sizes unknown up front
+    assert streamed.content[:4] == b"RIFF" and streamed.content[4:8] == b"\xff\xff\xff\xff"
+    assert streamed.content[40:44] == b"\xff\xff\xff\xff"
+    a, b = (np.frombuffer(r.content[44:], dtype="<i2").astype(int) for r in (whole, streamed))
+    assert len(a) == len(b) and np.abs(a - b).max() <= 1  # same samples (up to int16 rounding)
+
+
+def test_first_sentence_goes_out_before_the_rest_is_synthesized(server, monkeypatch):
+    delays = {"One.": 0.05, "Two.": 0.4}
+
+    async def fake_tts(text, *_):
+        await asyncio.sleep(delays[text])
+        buf = io.BytesIO()
+        sf.write(buf, np.full(2205, 0.1, dtype="float32"), 22050, format="WAV")
+        return buf.getvalue()
+    monkeypatch.setattr(server, "piper_tts_async", fake_tts)
+
+    async def sentences():
+        for s in delays:
+            yield s
+
+    async def main():
+        t0, out = time.monotonic(), []
+        record = {"call_id": "c", "persona": "einstein", "ms": {}, "llm_used": False}
+        async for chunk in server._stream_tts(sentences(), "v.onnx", "v.onnx.json", "c", time.time(),
+                                              record, "pcm", 22050):
+            out.append((time.monotonic() - t0, len(chunk)))
+        return out
+    out = asyncio.run(main())
+    assert len(out) >= 2
+    assert out[0][0] < 0.3  # sentence one played while sentence two was still in Piper
+    assert sum(n for _, n in out) == 2 * (2205 + int(22050 * 0.12) + 2205)  # both clips and the pause between
+
+
+def test_formats_that_cant_stream_fall_back_to_one_file(server):
+    r = converse(TestClient(server.app), 1, format="flac")
+    assert r.status_code == 200 and r.content[:4] == b"fLaC"
+    assert "x-streaming" not in r.headers
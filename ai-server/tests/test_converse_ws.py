@@ -0,0 +1,40 @@
+import json, time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+
+def speech(sec: float, rate: int = 16000) -> bytes:
+    return (np.sin(np.arange(int(sec * rate)) * 0.05) * 8000).astype("<i2").tobytes()
+
+
+def converse(server, chunks: int = 10) -> list:
+    msgs = []
+    with TestClient(server.app).websocket_connect("/converse/ws?persona=einstein") as ws:
+        for _ in range(chunks):
+            ws.send_bytes(speech(0.2))
+            time.sleep(0.02)  # let partial decodes run between chunks
+        ws.send_json({"type": "end"})
+        while not msgs or msgs[-1].get("type") not in ("reply_end", "error"):
+            m = ws.receive()
+            msgs.append({"type": "audio"} if m.get("bytes") is not None else json.loads(m["text"]))
+    return [m["type"] for m in msgs]
+
+
+def test_partials_then_final_then_reply(server):
+    before = dict(server.STT_PARTIALS)
+    types = converse(server)
+    assert "partial" in types
+    assert types.index("final") < types.index("reply_start") < types.index("audio") < len(types) - 1
+    assert types[-1] == "reply_end"
+    assert server.STT_PARTIALS["run"] > before["run"]
+    assert server.STT_PARTIALS["running"] == 0
+
+
+def test_partials_yield_to_queued_finals(server, monkeypatch):
+    monkeypatch.setattr(server.STT_BATCHER, "queued", lambda: 1)  # finals waiting for a Whisper thread
+    before = dict(server.STT_PARTIALS)
+    types = converse(server)
+    assert "partial" not in types and types[-1] == "reply_end"
+    assert server.STT_PARTIALS["run"] == before["run"]
+    assert server.STT_PARTIALS["skipped"] > before["skipped"]
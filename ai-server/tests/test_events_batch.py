@@ -0,0 +1,64 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from events import event_bus, event_router
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(event_router)
+    event_bus.events.clear()
+    return TestClient(app)
+
+
+def posted():
+    return [(e["type"], e["data"]) for e in event_bus.events]
+
+
+def test_batch_emits_in_order_with_client_ts(client):
+    r = client.post("/events/batch", json={"events": [
+        {"type": "dial", "data": {"digit": 3}, "ts": "2026-01-01T00:00:00.000Z"},
+        {"type": "hook_up"},
+    ]})
+    assert r.status_code == 200
+    assert r.json() == {"ok": True, "n": 2, "rejected": []}
+    assert posted() == [("dial", {"digit": 3, "client_ts": "2026-01-01T00:00:00.000Z"}), ("hook_up", {})]
+
+
+def test_data_keys_that_clash_with_emit_args(client):
+    data = {"text": "t", "call_id": "c", "ev_type": "x", "data": 1}
+    r = client.post("/events/batch", json={"events": [{"type": "odd", "data": data}]})
+    assert r.status_code == 200 and r.json()["n"] == 1
+    assert posted() == [("odd", data)]
+    assert client.post("/event", json={"type": "odd", "data": data}).status_code == 200
+
+
+def test_bad_events_are_skipped_not_fatal(client):
+    r = client.post("/events/batch", json={"events": [
+        {"type": "ok1"},
+        {"data": {}},                      # no type
+        {"type": "two\nlines"},            # would break SSE framing
+        "not an object",
+        {"type": "ok2", "data": "not a dict"},
+        {"type": "ok3"},
+    ], "dropped": 4})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["ok"] is False and body["n"] == 2
+    assert [x["index"] for x in body["rejected"]] == [1, 2, 3, 4]
+    assert [t for t, _ in posted()] == ["ok1", "ok3", "telemetry_dropped", "telemetry_rejected"]
+
+
+def test_oversized_batch_is_413(client, monkeypatch):
+    import events
+    monkeypatch.setattr(events, "EVENTS_BATCH_MAX", 3)
+    r = client.post("/events/batch", json={"events": [{"type": "x"}] * 4})
+    assert r.status_code == 413
+    assert posted() == []
+
+
+def test_single_event_rejects_bad_type(client):
+    assert client.post("/event", json={"type": "a b"}).status_code == 422
+    assert posted() == []
@@ -0,0 +1,56 @@
+import asyncio, threading
+
+from events import EventBus
+
+
+def ids(frames):
+    return [f.split(b"\n", 1)[0][4:].decode() for f in frames]
+
+
+def drain(sub):
+    out = []
+    while not sub.q.empty():
+        out.append(sub.q.get_nowait())
+    return out
+
+
+def test_resume_after_last_event_id():
+    async def main():
+        bus = EventBus(replay=2)
+        evs = [bus.emit("e", str(i)) for i in range(5)]
+        _, fresh = bus.subscribe()
+        _, resumed = bus.subscribe(evs[1]["id"])
+        _, unknown = bus.subscribe("gone")
+        return [e["id"] for e in evs], fresh, resumed, unknown
+    evs, fresh, resumed, unknown = asyncio.run(main())
+    assert ids(resumed) == evs[2:]
+    assert ids(fresh) == ids(unknown) == evs[-2:]  # not buffered: last `replay` frames
+
+
+def test_worker_thread_emit_during_subscribe_is_not_sent_twice():
+    async def main():
+        bus = EventBus()
+        first, _ = bus.subscribe()  # so the worker's emit schedules a broadcast
+        t = threading.Thread(target=bus.emit, args=("worker",))
+        t.start(); t.join()  # frame is in the ring; its broadcast is queued on this loop
+        sub, backlog = bus.subscribe()
+        await asyncio.sleep(0)  # let the broadcast run
+        live = drain(sub)
+        bus.emit("after")
+        return backlog, live, drain(sub), drain(first)
+    backlog, live, later, first = asyncio.run(main())
+    assert len(backlog) == 1 and live == []
+    assert len(later) == 1 and b"event: after" in later[0]
+    assert len(first) == 2
+
+
+def test_slow_client_drops_oldest_and_counts_lag():
+    async def main():
+        bus = EventBus(queue_size=3)
+        sub, _ = bus.subscribe()
+        evs = [bus.emit("e", str(i)) for i in range(5)]
+        return bus, sub, [e["id"] for e in evs]
+    bus, sub, evs = asyncio.run(main())
+    assert ids(drain(sub)) == evs[-3:]
+    assert sub.dropped == sub.lagged == 2
+    assert bus.stats()["dropped"] == 2
@@ -0,0 +1,54 @@
+from latency_stats import LatencyStats, LogHistogram
+
+
+def rec(persona: str, total: float, **kw) -> dict:
+    return {"persona": persona, "ms": {"total": total, "stt": total / 4}, **kw}
+
+
+def test_quantiles_within_bucket_error():
+    h = LogHistogram()
+    for v in range(1, 1001):
+        h.record(float(v))
+    assert h.count == 1000 and h.max == 1000
+    for q, want in ((0.5, 500), (0.95, 950), (0.99, 990)):
+        assert abs(h.quantile(q) - want) / want < 0.1
+
+
+def test_summary_by_persona_and_source():
+    s = LatencyStats()
+    s.observe(rec("einstein", 1000, llm_used=True))
+    s.observe(rec("einstein", 2000, reply_cache="exact"))
+    s.observe(rec("curie", 3000))
+    out = s.summary()["total"]
+    assert out["all"]["count"] == 3
+    assert set(out["persona"]) == {"einstein", "curie"}
+    assert {k: v["count"] for k, v in out["source"].items()} == {"llm": 1, "cache": 1, "fallback": 1}
+
+
+def test_unknown_personas_share_one_label():
+    s = LatencyStats(known=lambda p: p in ("einstein", "curie"))
+    s.observe(rec("einstein", 1000))
+    for i in range(100):
+        s.observe(rec(f"junk{i}", 1000))
+    assert set(s.summary()["total"]["persona"]) == {"einstein", "other"}
+    assert s.summary()["total"]["persona"]["other"]["count"] == 100
+    assert 'persona="junk' not in s.prometheus()
+
+
+def test_persona_labels_are_capped():
+    s = LatencyStats(max_personas=3)
+    for i in range(10):
+        s.observe(rec(f"p{i}", 500))
+    s.observe(rec("p0", 500))  # already has a series: keeps it
+    personas = s.summary()["total"]["persona"]
+    assert set(personas) == {"p0", "p1", "p2", "other"}
+    assert personas["p0"]["count"] == 2 and personas["other"]["count"] == 7
+
+
+def test_prometheus_histogram_is_cumulative():
+    s = LatencyStats()
+    for v in (10, 100, 1000):
+        s.observe(rec("einstein", v))
+    lines = [l for l in s.prometheus().splitlines() if l.startswith('timephone_stage_latency_ms_bucket{stage="total"')]
+    counts = [int(l.rsplit(" ", 1)[1]) for l in lines]
+    assert counts == sorted(counts) and counts[-1] == 3
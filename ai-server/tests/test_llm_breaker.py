@@ -0,0 +1,117 @@
+import asyncio, json
+
+import httpx
+import pytest
+
+import llm_backends
+from llm_backends import CircuitBreaker, CircuitOpen
+
+
+def test_opens_after_n_failures_and_rejects():
+    b = CircuitBreaker(failures=3, reset_sec=60)
+    for _ in range(2):
+        b.failure()
+    assert b.allow() and b.state == "closed"
+    b.failure()
+    assert b.state == "open" and b.stats()["trips"] == 1
+    assert not b.allow() and not b.allow()
+    assert b.stats()["rejected"] == 2 and b.stats()["retry_in_s"] > 0
+
+
+def test_success_resets_the_failure_count():
+    b = CircuitBreaker(failures=2, reset_sec=60)
+    b.failure()
+    b.success()
+    b.failure()
+    assert b.state == "closed"
+
+
+def test_half_open_lets_one_probe_through():
+    b = CircuitBreaker(failures=1, reset_sec=0)
+    b.failure()
+    assert b.allow() and b.state == "half_open"  # reset_sec passed: the probe
+    assert not b.allow()                          # everyone else waits for its verdict
+    b.success()
+    assert b.state == "closed" and b.allow() and b.allow()
+
+
+def test_failed_probe_reopens():
+    b = CircuitBreaker(failures=1, reset_sec=0)
+    b.failure()
+    assert b.allow()
+    b.failure()
+    assert b.state == "open" and b.stats()["trips"] == 2
+
+
+def test_release_frees_the_probe_without_a_verdict():
+    b = CircuitBreaker(failures=1, reset_sec=0)
+    b.failure()
+    assert b.allow() and not b.allow()
+    b.release()  # the probe's caller hung up
+    assert b.state == "half_open" and b.allow()
+
+
+def test_release_when_closed_changes_nothing():
+    b = CircuitBreaker(failures=2, reset_sec=60)
+    b.failure()
+    b.release()
+    assert b.state == "closed" and b.failures == 1
+
+
+# achat_stream reports to the breaker: [DONE] = success, error = failure, early close = neither
+def sse(*deltas: str) -> bytes:
+    lines = [f"data: {json.dumps({'choices': [{'delta': {'content': d}}]})}\n\n" for d in deltas]
+    return ("".join(lines) + "data: [DONE]\n\n").encode()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    def use(handler, breaker: CircuitBreaker):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(llm_backends, "_async_client", lambda: client)
+        monkeypatch.setattr(llm_backends, "_asem", asyncio.Semaphore(4))
+        monkeypatch.setattr(llm_backends, "BREAKER", breaker)
+    return use
+
+
+def half_open() -> CircuitBreaker:
+    b = CircuitBreaker(failures=1, reset_sec=0)
+    b.failure()
+    return b
+
+
+def test_complete_stream_closes_the_breaker(llm):
+    b = half_open()
+    llm(lambda req: httpx.Response(200, content=sse("Hello", " there.")), b)
+
+    async def main():
+        return [d async for d in llm_backends.achat_stream("sys", "hi")]
+    assert asyncio.run(main()) == ["Hello", " there."]
+    assert b.state == "closed"
+
+
+def test_http_error_opens_the_breaker(llm):
+    b = CircuitBreaker(failures=1, reset_sec=60)
+    llm(lambda req: httpx.Response(500), b)
+
+    async def main():
+        async for _ in llm_backends.achat_stream("sys", "hi"):
+            pass
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(main())
+    assert b.state == "open"
+    with pytest.raises(CircuitOpen):
+        asyncio.run(main())
+
+
+def test_caller_closing_early_releases_the_probe(llm):
+    b = half_open()
+    llm(lambda req: httpx.Response(200, content=sse("One.", " Two.", " Three.")), b)
+
+    async def main():
+        stream = llm_backends.achat_stream("sys", "hi")
+        first = await anext(stream)
+        await stream.aclose()  # hang-up after the first sentence
+        return first
+    assert asyncio.run(main()) == "One."
+    assert b.state == "half_open" and b.allow()
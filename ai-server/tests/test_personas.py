@@ -0,0 +1,99 @@
+import json, os, time
+
+import pytest
+
+import personas
+from personas import PersonaRegistry
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(personas, "PERSONAS_PREWARM", True)
+    for v in ("amy", "ryan", "default"):
+        (tmp_path / f"{v}.onnx").write_bytes(b"onnx")
+        (tmp_path / f"{v}.onnx.json").write_text("{}")
+    path = tmp_path / "personas.json"
+    version = [0]
+
+    def write(raw):
+        path.write_text(raw if isinstance(raw, str) else json.dumps(raw))
+        version[0] += 1
+        os.utime(path, (1000 + version[0], 1000 + version[0]))  # mtime moves even within one clock tick
+
+    def voice(name):
+        return str(tmp_path / f"{name}.onnx")
+    return str(path), write, voice
+
+
+def test_lookup_by_key_or_id_and_fallback(setup):
+    path, write, voice = setup
+    write({"314": {"id": "einstein", "name": "Albert Einstein", "voice": voice("amy") + ".json"}})
+    reg = PersonaRegistry(path, voice("default"))
+    assert reg.lookup("314") is reg.lookup("einstein")
+    assert reg.lookup("einstein")["voice"] == voice("amy")  # .json voice mapped back to its .onnx
+    assert reg.lookup("einstein")["voice_json"] == voice("amy") + ".json"
+    other = reg.lookup("napoleon")
+    assert other["id"] == "napoleon" and other["voice"] == voice("default")
+    assert reg.known("einstein") and reg.known("314") and not reg.known("napoleon")
+
+
+def test_reload_swaps_in_the_edited_file(setup):
+    path, write, voice = setup
+    write({"1": {"id": "einstein", "name": "Einstein"}})
+    reg = PersonaRegistry(path, voice("default"))
+    assert reg.reload() is False  # unchanged
+    write({"1": {"id": "einstein", "name": "Albert"}, "2": {"id": "curie", "name": "Marie Curie"}})
+    assert reg.reload() is True
+    assert reg.lookup("einstein")["name"] == "Albert" and reg.lookup("2")["id"] == "curie"
+    assert reg.stats()["reloads"] == 2 and reg.stats()["ids"] == ["curie", "einstein"]
+
+
+def test_broken_edit_keeps_the_last_good_snapshot(setup):
+    path, write, voice = setup
+    write({"1": {"id": "einstein", "name": "Einstein"}})
+    reg = PersonaRegistry(path, voice("default"))
+    write('{"1": {"id": "einstein",')  # saved mid-edit
+    assert reg.reload() is False
+    assert reg.lookup("1")["name"] == "Einstein" and reg.stats()["errors"] == 1
+    write(["not", "an", "object"])
+    assert reg.reload() is False and reg.known("einstein")
+
+
+def test_new_voices_are_prewarmed_once(setup):
+    path, write, voice = setup
+    warmed = []
+    write({"1": {"id": "einstein", "voice": voice("amy")}, "2": {"id": "x", "voice": "/missing.onnx"}})
+    reg = PersonaRegistry(path, voice("default"), prewarm=lambda v, j: warmed.append(os.path.basename(v)))
+    assert sorted(warmed) == ["amy.onnx", "default.onnx"]  # a missing voice file isn't warmed
+    write({"1": {"id": "einstein", "voice": voice("amy")}, "3": {"id": "newton", "voice": voice("ryan")}})
+    reg.reload()
+    assert sorted(warmed) == ["amy.onnx", "default.onnx", "ryan.onnx"]
+
+
+def test_failed_prewarm_is_retried_on_the_next_reload(setup):
+    path, write, voice = setup
+    calls = []
+
+    def prewarm(v, j):
+        calls.append(os.path.basename(v))
+        if len(calls) == 1:
+            raise RuntimeError("piper not ready")
+    write({})
+    reg = PersonaRegistry(path, voice("default"), prewarm=prewarm)
+    assert calls == ["default.onnx"] and reg.stats()["voices_warmed"] == 0
+    write({"1": {"id": "a"}})
+    reg.reload()
+    assert calls == ["default.onnx", "default.onnx"] and reg.stats()["voices_warmed"] == 1
+
+
+def test_watcher_picks_up_edits(setup, monkeypatch):
+    path, write, voice = setup
+    monkeypatch.setattr(personas, "PERSONAS_POLL_SEC", 0.02)
+    write({"1": {"id": "einstein", "name": "Einstein"}})
+    reg = PersonaRegistry(path, voice("default"))
+    reg.start()
+    write({"1": {"id": "einstein", "name": "Albert Einstein"}})
+    end = time.monotonic() + 3
+    while reg.lookup("1")["name"] != "Albert Einstein":
+        assert time.monotonic() < end, "edit not picked up"
+        time.sleep(0.01)
@@ -0,0 +1,78 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from readiness import Readiness
+
+
+def flaky(fails: int, exc=RuntimeError):
+    n = [0]
+
+    def load():
+        n[0] += 1
+        if n[0] <= fails:
+            raise exc(f"attempt {n[0]}")
+    return load, n
+
+
+def test_load_then_warm_goes_ready():
+    r = Readiness(required=("whisper",))
+    steps = []
+    assert r.run("whisper", lambda: steps.append("load"), lambda: steps.append("warm"))
+    c = r.stats()["components"]["whisper"]
+    assert steps == ["load", "warm"] and r.ready
+    assert c["state"] == "ready" and {"load_ms", "warm_ms", "started_ms", "done_ms"} <= set(c)
+
+
+def test_transient_failure_is_retried_with_backoff():
+    r = Readiness(required=("whisper",))
+    load, n = flaky(2)
+    t = time.perf_counter()
+    assert r.run("whisper", load, tries=3, retry_sec=0.05)
+    c = r.stats()["components"]["whisper"]
+    assert n[0] == 3 and time.perf_counter() - t >= 0.15  # waited 0.05 then 0.1
+    assert c["state"] == "ready" and c["attempt"] == 3 and "error" not in c
+
+
+def test_out_of_tries_marks_the_component_failed():
+    r = Readiness(required=("whisper",))
+    load, n = flaky(5)
+    assert not r.run("whisper", load, tries=2, retry_sec=0)
+    assert n[0] == 2 and r.failed() == ["whisper"] and not r.ready
+    assert r.stats()["components"]["whisper"]["error"] == "RuntimeError: attempt 2"
+
+
+def test_permanent_errors_are_not_retried():
+    r = Readiness(required=("tts",))
+    load, n = flaky(5, FileNotFoundError)
+    assert not r.run("tts", load, tries=5, permanent=(FileNotFoundError,))
+    assert n[0] == 1 and r.failed() == ["tts"]
+
+
+def test_failed_warmup_counts_as_a_failure():
+    r = Readiness(required=("tts",))
+    warm, n = flaky(1)
+    assert r.run("tts", lambda: None, warm, tries=2, retry_sec=0)
+    assert n[0] == 2 and r.ready
+
+
+def test_soft_component_failure_only_degrades():
+    r = Readiness(required=("whisper",), soft=("tts",), optional=("llm",))
+    r.run("whisper", lambda: None)
+    assert not r.ready  # soft components still loading hold /ready back
+    r.run("tts", flaky(1)[0])
+    assert r.ready and r.failed() == []
+    assert r.stats()["degraded"] == ["tts"]  # optional "llm" never reported: doesn't matter
+
+
+def test_ready_endpoint_and_not_ready_errors(server, monkeypatch):
+    client = TestClient(server.app)
+    monkeypatch.setattr(server, "READY", Readiness(required=("whisper",)))
+    r = client.get("/ready")
+    assert r.status_code == 503 and r.json()["components"]["whisper"]["state"] == "pending"
+    assert server._not_ready_error() == ("warming up", True)
+    server.READY.run("whisper", flaky(1)[0])
+    assert server._not_ready_error() == ("unavailable: whisper failed to load", False)
+    monkeypatch.setattr(server, "READY", Readiness(required=("whisper",)))
+    server.READY.run("whisper", lambda: None)
+    assert client.get("/ready").status_code == 200
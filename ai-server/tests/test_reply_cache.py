@@ -0,0 +1,68 @@
+import reply_cache
+from reply_cache import ReplyCache, normalize, shingles
+
+
+def jaccard(a: str, b: str) -> float:
+    sa, sb = shingles(normalize(a)), shingles(normalize(b))
+    return len(sa & sb) / len(sa | sb)
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    c = ReplyCache()
+    c.put("einstein", "What is relativity?", "Time is relative.")
+    assert c.get("einstein", "what is  RELATIVITY") == ("Time is relative.", "exact")
+    assert c.stats()["hits_exact"] == 1
+
+
+def test_miss_other_persona_and_other_question():
+    c = ReplyCache()
+    c.put("einstein", "What is relativity?", "Time is relative.")
+    assert c.get("newton", "What is relativity?") == (None, "miss")
+    assert c.get("einstein", "Tell me about your violin") == (None, "miss")
+    assert c.stats()["misses"] == 2
+
+
+def test_near_hit_for_a_small_rewording():
+    c = ReplyCache()
+    q = "tell me about the theory of general relativity please"
+    c.put("einstein", q, "Gravity bends space.")
+    near = "tell me about the theory of general relativity, please sir"
+    assert jaccard(q, near) >= c.near
+    assert c.get("einstein", near) == ("Gravity bends space.", "near")
+
+
+def test_near_threshold():
+    q, other = "when did you move to princeton", "when did you move to berlin"
+    j = jaccard(q, other)
+    lo, hi = ReplyCache(near=j - 0.01), ReplyCache(near=j + 0.01)
+    for c in (lo, hi):
+        c.put("einstein", q, "In 1933.")
+    assert lo.get("einstein", other)[1] == "near"
+    assert hi.get("einstein", other) == (None, "miss")
+    off = ReplyCache(near=0)
+    off.put("einstein", q, "In 1933.")
+    assert off.get("einstein", q + " then") == (None, "miss")
+
+
+def test_near_hit_needs_the_same_numbers():
+    assert reply_cache.REPLY_CACHE_NEAR >= 0.9
+    c = ReplyCache(near=0.5)  # even with a loose threshold
+    c.put("einstein", "why did you win the nobel prize in 1921", "For the photoelectric effect.")
+    assert jaccard("why did you win the nobel prize in 1921", "why did you win the nobel prize in 1922") > 0.8
+    assert c.get("einstein", "why did you win the nobel prize in 1922") == (None, "miss")
+    assert c.get("einstein", "so why did you win the nobel prize in 1921")[1] == "near"
+
+
+def test_ttl_and_lru_bound(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(reply_cache.time, "monotonic", lambda: now[0])
+    c = ReplyCache(ttl=60, max_entries=2, near=0)
+    c.put("p", "one", "1")
+    c.put("p", "two", "2")
+    c.get("p", "one")          # "two" is now least recently used
+    c.put("p", "three", "3")
+    assert c.get("p", "two") == (None, "miss")
+    assert c.get("p", "one")[1] == "exact"
+    now[0] += 61
+    assert c.get("p", "one") == (None, "miss")
+    assert c.stats()["entries"] == 1
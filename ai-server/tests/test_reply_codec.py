@@ -0,0 +1,71 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+import reply_codec
+
+
+def question() -> bytes:
+    buf = io.BytesIO()
+    sf.write(buf, (np.sin(np.arange(16000) * 0.05) * 0.3).astype("float32"), 16000, format="WAV")
+    return buf.getvalue()
+
+
+def test_form_field_beats_accept():
+    assert reply_codec.negotiate("FLAC", "audio/pcm") == "flac"
+    with pytest.raises(ValueError):
+        reply_codec.negotiate("mp3", None)
+
+
+@pytest.mark.parametrize("accept, fmt", [
+    (None, "wav"),
+    ("audio/mpeg", "wav"),                                    # nothing we can make
+    ("audio/ogg, audio/flac", "opus"),                        # first listed wins a tie
+    ("audio/wav;q=0.5, audio/flac;q=0.9", "flac"),
+    ("audio/flac;q=0, audio/l16", "pcm"),                     # q=0 means "not this"
+    ("audio/flac;q=oops, audio/wav;q=0.1", "wav"),
+])
+def test_accept_header(accept, fmt):
+    assert reply_codec.negotiate(None, accept) == fmt
+
+
+def test_opus_rate_rounds_up_to_a_supported_one():
+    assert reply_codec.output_rate("opus", 22050) == 24000
+    assert reply_codec.output_rate("opus", 16000) == 16000
+    assert reply_codec.output_rate("opus", 96000) == 48000
+    assert reply_codec.output_rate("flac", 22050) == 22050
+
+
+@pytest.mark.parametrize("fmt", ["wav", "flac", "opus"])
+def test_encode_round_trips_rate_and_channels(fmt):
+    sr = reply_codec.output_rate(fmt, 22050)
+    y = (np.sin(np.arange(sr // 2) * 0.05) * 0.5).astype(np.float32)
+    data, got_sr = sf.read(io.BytesIO(reply_codec.encode(y, sr, fmt, channels=2)))
+    assert got_sr == sr and data.shape[1] == 2
+    assert abs(len(data) - len(y)) < sr // 50  # opus adds a little padding
+
+
+def test_pcm_is_interleaved_s16le():
+    pcm = reply_codec.encode(np.array([0.5, -1.0], dtype=np.float32), 16000, "pcm", channels=2)
+    assert np.frombuffer(pcm, dtype="<i2").tolist() == [16383, 16383, -32767, -32767]
+
+
+def test_converse_honours_format_rate_and_channels(server):
+    r = TestClient(server.app).post(
+        "/converse", data={"persona": "einstein", "format": "pcm", "sample_rate": "16000", "channels": "2"},
+        files={"audio": ("q.wav", question(), "audio/wav")})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "audio/pcm;rate=16000;channels=2;format=s16le"
+    assert r.headers["x-audio-format"] == "pcm;rate=16000;channels=2"
+    assert len(r.content) % 4 == 0
+
+
+def test_converse_rejects_unknown_format_and_layout(server):
+    client = TestClient(server.app)
+    for form in ({"format": "mp3"}, {"channels": "6"}, {"sample_rate": "100"}):
+        r = client.post("/converse", data={"persona": "einstein", **form},
+                        files={"audio": ("q.wav", question(), "audio/wav")})
+        assert r.status_code == 400, form
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from resample import StreamResampler, resample
+
+PAIRS = [(22050, 16000), (16000, 22050), (22050, 24000), (48000, 16000), (16000, 48000)]
+
+
+def tone(freq: float, sr: int, sec: float = 0.5) -> np.ndarray:
+    return (0.5 * np.sin(2 * np.pi * freq * np.arange(int(sr * sec)) / sr)).astype(np.float32)
+
+
+@pytest.mark.parametrize("src,dst", PAIRS)
+def test_matches_the_analytic_signal(src, dst):
+    # a 1 kHz tone resampled should be the same tone sampled at dst (ignore the filter's edges)
+    y = resample(tone(1000, src), src, dst)
+    assert len(y) == round(len(tone(1000, src)) * dst / src)
+    assert y.dtype == np.float32
+    edge = dst // 100
+    ref = tone(1000, dst)[:len(y)]
+    assert np.abs(y - ref)[edge:-edge].max() < 2e-3
+
+
+def test_downsampling_filters_out_what_would_alias():
+    # 10 kHz can't exist at 16 kHz: linear interpolation folds it to 6 kHz, the filter removes it
+    y = resample(tone(10000, 48000), 48000, 16000)
+    edge = 160
+    assert np.sqrt(np.mean(y[edge:-edge] ** 2)) < 1e-3
+
+
+def test_same_rate_and_stereo():
+    y = tone(440, 16000)
+    assert resample(y, 16000, 16000) is y
+    st = np.stack([y, -y], axis=1)
+    out = resample(st, 16000, 22050)
+    assert out.shape == (round(len(y) * 22050 / 16000), 2)
+    np.testing.assert_allclose(out[:, 0], -out[:, 1], atol=1e-6)
+
+
+@pytest.mark.parametrize("max_chunk", [2000, 8])  # 8: chunks shorter than the filter
+@pytest.mark.parametrize("src,dst", PAIRS)
+def test_stream_equals_one_shot(src, dst, max_chunk):
+    rng = np.random.default_rng(src + dst)
+    y = (0.2 * rng.standard_normal(src // 10)).astype(np.float32)
+    rs = StreamResampler(src, dst)
+    parts, i = [], 0
+    while i < len(y):
+        n = int(rng.integers(1, max_chunk))
+        parts.append(rs.process(y[i:i + n]))
+        i += n
+    parts.append(rs.flush())
+    np.testing.assert_allclose(np.concatenate(parts), resample(y, src, dst), atol=1e-5)
@@ -0,0 +1,38 @@
+def split_stream(server, tokens) -> tuple[list, list]:
+    """(sentences per feed() call, flush())"""
+    sp = server.SentenceSplitter()
+    return [sp.feed(t) for t in tokens], sp.flush()
+
+
+def test_sentence_ends_only_when_whitespace_follows(server):
+    sp = server.SentenceSplitter()
+    assert sp.feed("Pi is about 3.") == []   # could be a decimal point
+    assert sp.feed("14. Neat") == ["Pi is about 3.14."]
+    assert sp.feed("!") == []
+    assert sp.feed(" Bye") == ["Neat!"]
+    assert sp.flush() == ["Bye."]
+
+
+def test_token_boundaries_dont_matter(server):
+    text = "well, relativity is simple. Time slows down near mass? Yes! Gravity bends light"
+    fed, tail = split_stream(server, [text])
+    coarse = fed[0] + tail
+    sp = server.SentenceSplitter()
+    fine = [s for ch in text for s in sp.feed(ch)] + sp.flush()
+    assert fine == coarse
+    assert fine == [server.clean_and_punctuate("well, relativity is simple."),
+                    "Time slows down near mass?", "Yes!", "Gravity bends light."]
+
+
+def test_matches_the_one_shot_split(server):
+    reply = "The speed of light is constant. Everything else is relative! Ask me more?"
+    sp = server.SentenceSplitter()
+    streamed = [s for w in reply.split(" ") for s in sp.feed(w + " ")] + sp.flush()
+    assert streamed == server.split_sentences(server.clean_and_punctuate(reply))
+
+
+def test_empty_and_whitespace_only(server):
+    sp = server.SentenceSplitter()
+    assert sp.feed("") == [] and sp.feed("   ") == []
+    assert sp.flush() == []
+    assert sp.flush() == []  # flushing twice yields nothing new
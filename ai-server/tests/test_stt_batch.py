@@ -0,0 +1,108 @@
+import asyncio, glob, os, time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from stt_batch import TranscribeBatcher, _check, transcribe_batch
+
+
+def clip(n: int) -> np.ndarray:
+    return np.full(16000, n, dtype=np.float32)  # the "audio" carries its id
+
+
+class Fake:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches: list[list[int]] = []
+
+    def single(self, audio):
+        time.sleep(self.delay)
+        return f"single {int(audio[0])}"
+
+    def batch(self, audios):
+        time.sleep(self.delay)
+        ids = [int(a[0]) for a in audios]
+        self.batches.append(ids)
+        return [None if i == 99 else f"batch {i}" for i in ids]  # 99: "too long to batch"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_lone_request_skips_the_window():
+    fake = Fake()
+    b = TranscribeBatcher(fake.single, fake.batch, ThreadPoolExecutor(1), concurrency=1, max_batch=4, window_ms=300)
+
+    async def main():
+        t = time.perf_counter()
+        text = await b.transcribe(clip(1))
+        return text, time.perf_counter() - t
+    text, took = run(main())
+    assert text == "single 1"
+    assert took < 0.15
+    assert b.stats()["queue_wait_ms"]["max"] < 50
+
+
+def test_requests_arriving_while_busy_share_a_batch():
+    fake = Fake(delay=0.2)
+    b = TranscribeBatcher(fake.single, fake.batch, ThreadPoolExecutor(1), concurrency=1, max_batch=4, window_ms=50)
+
+    async def main():
+        first = asyncio.ensure_future(b.transcribe(clip(1)))
+        await asyncio.sleep(0.05)  # 1 is decoding; 2..4 queue up behind it
+        rest = [asyncio.ensure_future(b.transcribe(clip(i))) for i in (2, 3, 4)]
+        return await asyncio.gather(first, *rest)
+    assert run(main()) == ["single 1", "batch 2", "batch 3", "batch 4"]
+    assert fake.batches == [[2, 3, 4]]
+    assert b.stats()["fill"] == {"1": 1, "3": 1}
+
+
+def test_clip_the_batch_cant_take_goes_single():
+    fake = Fake(delay=0.1)
+    b = TranscribeBatcher(fake.single, fake.batch, ThreadPoolExecutor(1), concurrency=1, max_batch=4, window_ms=50)
+
+    async def main():
+        first = asyncio.ensure_future(b.transcribe(clip(1)))
+        await asyncio.sleep(0.02)
+        rest = [asyncio.ensure_future(b.transcribe(clip(i))) for i in (2, 99)]
+        return await asyncio.gather(first, *rest)
+    assert run(main()) == ["single 1", "batch 2", "single 99"]
+
+
+def test_decodes_transcribe_would_retry_go_single():
+    assert _check("What is relativity?", -0.3, 0.01) == "ok"
+    assert _check("", -1.5, 0.9) == "silence"
+    assert _check("What is relativity?", -1.5, 0.1) == "fallback"       # low log-prob
+    assert _check("the the the " * 20, -0.2, 0.01) == "fallback"        # repetitive
+
+
+# Real-model parity: set WHISPER_TEST_MODEL (e.g. tiny.en, or a local CTranslate2 dir) and
+# WHISPER_TEST_AUDIO (a folder of spoken-question WAVs, like the load test's).
+@pytest.mark.skipif(not (os.environ.get("WHISPER_TEST_MODEL") and os.environ.get("WHISPER_TEST_AUDIO")),
+                    reason="needs WHISPER_TEST_MODEL and WHISPER_TEST_AUDIO")
+def test_batch_matches_single_transcripts():
+    import soundfile as sf
+    from faster_whisper import WhisperModel
+    from resample import resample
+
+    model = WhisperModel(os.environ["WHISPER_TEST_MODEL"], device="cpu", compute_type="int8")
+    prompt = "Casual, modern English conversation."
+    audios = []
+    for f in sorted(glob.glob(os.path.join(os.environ["WHISPER_TEST_AUDIO"], "*.wav")))[:4]:
+        y, sr = sf.read(f, dtype="float32")
+        audios.append(resample(y.mean(axis=1) if y.ndim > 1 else y, sr, 16000))
+    assert audios
+
+    def single(a):  # server.transcribe()
+        segments, _ = model.transcribe(a, beam_size=5, vad_filter=True, language="en", initial_prompt=prompt,
+                                       vad_parameters={"min_silence_duration_ms": 300})
+        return "".join(s.text for s in segments).strip()
+
+    norm = lambda t: " ".join(t.lower().replace(",", "").replace(".", "").split())
+    batched = transcribe_batch(model, audios, beam_size=5, initial_prompt=prompt)
+    for a, t in zip(audios, batched):
+        if t is None:  # needed a temperature fallback: the batcher sends it down the single path
+            continue
+        assert norm(t) == norm(single(a))
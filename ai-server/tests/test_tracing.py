@@ -0,0 +1,80 @@
+import contextvars, io, time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+import tracing
+
+
+def in_call(fn):
+    """Run fn in a fresh context so begin() doesn't leak the call ids into other tests."""
+    return contextvars.Context().run(fn)
+
+
+def names(tr) -> list:
+    return [e["name"] for e in tr.chrome()["traceEvents"] if e["ph"] == "X"]
+
+
+def test_span_outside_a_call_records_nothing():
+    with tracing.span("orphan"):
+        pass
+    assert tracing.current() == ()
+
+
+def test_spans_and_bound_threads_land_in_the_call():
+    def job():
+        with tracing.span("inner"):
+            time.sleep(0.01)
+
+    def call():
+        tracing.begin("t-bind")
+        with tracing.span("outer", n=1):
+            with ThreadPoolExecutor(1, thread_name_prefix="worker") as ex:
+                ex.submit(tracing.bind(job, wait="queue")).result()
+        tracing.finish("t-bind")
+        return tracing.get("t-bind").chrome()["traceEvents"]
+    events = in_call(call)
+    ev = {e["name"]: e for e in events if e["ph"] == "X"}
+    rows = {e["tid"]: e["args"]["name"] for e in events if e["name"] == "thread_name"}
+    assert set(ev) == {"outer", "queue", "inner", "call"}
+    assert ev["outer"]["args"] == {"n": 1}
+    assert ev["queue"]["tid"] == ev["outer"]["tid"]  # the wait is drawn on the caller's row
+    assert rows[ev["inner"]["tid"]].startswith("worker")
+
+
+def test_one_span_recorded_in_every_batched_call():
+    def call(cid):
+        tracing.begin(cid)
+    for cid in ("t-a", "t-b"):
+        in_call(lambda: call(cid))
+    t = time.perf_counter()
+    tracing.record(("t-a", "t-b", "t-gone"), "stt.generate", t, t + 0.01, batch=2)
+    for cid in ("t-a", "t-b"):
+        assert names(tracing.get(cid)) == ["stt.generate"]
+
+
+def test_only_the_last_trace_calls_are_kept(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_CALLS", 3)
+    for i in range(5):
+        in_call(lambda: tracing.begin(f"t-ring{i}"))
+    assert tracing.get("t-ring1") is None and tracing.get("t-ring4") is not None
+
+
+def question() -> bytes:
+    buf = io.BytesIO()
+    sf.write(buf, (np.sin(np.arange(16000) * 0.05) * 0.3).astype("float32"), 16000, format="WAV")
+    return buf.getvalue()
+
+
+def test_trace_endpoint_after_a_call(server):
+    client = TestClient(server.app)
+    r = client.post("/converse", data={"persona": "einstein"}, files={"audio": ("q.wav", question(), "audio/wav")})
+    tr = client.get(f"/trace/{r.headers['x-call-id']}").json()
+    spans = {e["name"]: e for e in tr["traceEvents"] if e["ph"] == "X"}
+    assert {"call", "stt", "tts.cache_get"} <= set(spans)
+    root = spans["call"]
+    assert all(root["ts"] <= e["ts"] and e["ts"] + e["dur"] <= root["ts"] + root["dur"] + 1
+               for e in spans.values())
+    assert client.get("/trace/nope").status_code == 404
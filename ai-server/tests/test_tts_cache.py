@@ -0,0 +1,50 @@
+import os
+
+from tts_cache import TTSCache
+
+
+def test_memory_lru_evicts_least_recently_used():
+    c = TTSCache(mem_bytes=300, disk_dir="")
+    for k in "abc":
+        c.put(k, k.encode() * 100)
+    assert c.get("a") == b"a" * 100  # a is now the most recent
+    c.put("d", b"d" * 100)
+    assert c.get("b") is None
+    assert all(c.get(k) for k in "acd")
+    assert c.stats()["mem_bytes"] == 300 and c.stats()["mem_entries"] == 3
+
+
+def test_clip_over_the_memory_budget_is_not_kept():
+    c = TTSCache(mem_bytes=100, disk_dir="")
+    c.put("big", b"x" * 101)
+    assert c.get("big") is None and c.stats()["mem_entries"] == 0
+
+
+def test_disk_tier_survives_restart_and_refills_memory(tmp_path):
+    TTSCache(disk_dir=str(tmp_path)).put("k" * 64, b"RIFF clip")
+    c = TTSCache(disk_dir=str(tmp_path))
+    assert c.stats()["disk_bytes"] == len(b"RIFF clip")
+    assert c.get("k" * 64) == b"RIFF clip"
+    assert c.get("k" * 64) == b"RIFF clip"
+    s = c.stats()
+    assert (s["hits_disk"], s["hits_mem"], s["misses"]) == (1, 1, 0)
+
+
+def test_disk_eviction_drops_oldest_files_to_90_percent(tmp_path):
+    c = TTSCache(mem_bytes=0, disk_dir=str(tmp_path), disk_bytes=1000)
+    keys = [f"{i:02d}" + "0" * 62 for i in range(4)]
+    for i, k in enumerate(keys):
+        c.put(k, b"x" * 300)
+        os.utime(c._path(k), (1000 + i, 1000 + i))  # put order = age order
+    assert c.stats()["disk_bytes"] <= 900
+    assert not os.path.exists(c._path(keys[0])) and os.path.exists(c._path(keys[3]))
+
+
+def test_key_covers_voice_file_and_normalizes_whitespace(tmp_path):
+    voice = tmp_path / "v.onnx"
+    voice.write_bytes(b"1")
+    k = TTSCache.key("Hello  there.", str(voice), str(voice) + ".json")
+    assert k == TTSCache.key(" Hello there. ", str(voice), str(voice) + ".json")
+    assert k != TTSCache.key("Hello there.", str(voice), str(voice) + ".json", "--length_scale 1.2")
+    os.utime(voice, (1, 1))  # a retrained voice: new mtime, new key
+    assert k != TTSCache.key("Hello there.", str(voice), str(voice) + ".json")
@@ -0,0 +1,82 @@
+import asyncio, os, time
+
+import pytest
+
+from tts_pool import PiperPool
+
+LOADTEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "loadtest")
+FAKE = os.path.join(LOADTEST, "fake_piper.py")
+VOICE = os.path.join(LOADTEST, "fake_voice.onnx")
+
+
+@pytest.fixture
+def hung_piper(tmp_path):
+    """A 'Piper' that reads sentences and never answers."""
+    p = tmp_path / "hung_piper"
+    p.write_text("#!/usr/bin/env python3\nimport sys, time\nfor _ in sys.stdin:\n    time.sleep(60)\n")
+    p.chmod(0o755)
+    return str(p)
+
+
+def test_synth_returns_wav_and_close_removes_worker_dirs():
+    pool = PiperPool(FAKE, size=2)
+    assert pool.synth("Hello there.", VOICE, VOICE + ".json")[:4] == b"RIFF"
+    dirs = [w.out_dir for v in pool._voices.values() for w in v.workers]
+    assert dirs and all(os.path.isdir(d) for d in dirs)
+    pool.close()
+    assert not any(os.path.exists(d) for d in dirs)
+
+
+def test_one_deadline_covers_synth_and_retry(hung_piper):
+    pool = PiperPool(hung_piper, size=1)
+    try:
+        t = time.monotonic()
+        with pytest.raises(TimeoutError):
+            pool.synth("Hello.", VOICE, VOICE + ".json", timeout=0.5)
+        assert time.monotonic() - t < 0.9  # not 0.5 for the try + 0.5 again for the retry
+    finally:
+        pool.close()
+
+
+def test_worker_wait_counts_against_the_deadline():
+    pool = PiperPool(FAKE, size=1)
+    try:
+        busy = pool._checkout((VOICE, VOICE + ".json"), time.monotonic() + 5)  # the only worker, held
+        t = time.monotonic()
+        with pytest.raises(TimeoutError):
+            pool.synth("Hello.", VOICE, VOICE + ".json", timeout=0.3)
+        assert time.monotonic() - t < 0.6
+        pool._checkin(*busy)
+        assert pool.synth("Hello.", VOICE, VOICE + ".json")[:4] == b"RIFF"
+    finally:
+        pool.close()
+
+
+def test_tts_clips_overlaps_sentences_and_keeps_order(server, monkeypatch):
+    delays = {"One.": 0.3, "Two.": 0.2, "Three.": 0.1}
+
+    async def fake_tts(text, *_):
+        await asyncio.sleep(delays[text])
+        return text.encode()
+    monkeypatch.setattr(server, "piper_tts_async", fake_tts)
+
+    async def sentences():
+        for s in delays:
+            yield s
+
+    async def main():
+        t = time.monotonic()
+        clips = [c async for c in server._tts_clips(sentences(), VOICE, VOICE + ".json", "test", {})]
+        return clips, time.monotonic() - t
+    clips, took = asyncio.run(main())
+    assert clips == [b"One.", b"Two.", b"Three."]
+    assert took < 0.45  # overlapped: ~0.3 s, not 0.6
+
+
+def test_one_shot_semaphore_follows_the_running_loop(server):
+    async def main():
+        return await server._piper_synth_async("Hello.", VOICE, VOICE + ".json"), server._tts_semaphore()
+    wav1, sem1 = asyncio.run(main())
+    wav2, sem2 = asyncio.run(main())  # a fresh loop must not reuse the first loop's semaphore
+    assert wav1[:4] == wav2[:4] == b"RIFF"
+    assert sem1 is not sem2
@@ -0,0 +1,156 @@
+import asyncio, contextvars, json, logging, logging.handlers, os, queue, threading, time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# Per-call spans on the monotonic clock. The current call ids live in a contextvar, so
+# spans opened anywhere below converse() (including worker threads started through
+# bind() or asyncio.to_thread) land in that call's trace; a batched Whisper decode
+# runs with several ids and is recorded in each of them. Spans are laid out per thread,
+# or per asyncio task on the event loop, so overlapping coroutines get their own rows.
+TRACE_CALLS      = int(os.environ.get("TRACE_CALLS", "200"))          # finished calls kept for /trace
+TRACE_FILE       = os.environ.get("TRACE_FILE", os.path.join(os.path.dirname(__file__), "traces", "calls.jsonl"))  # "" = off
+TRACE_FILE_MB    = float(os.environ.get("TRACE_FILE_MB", "20"))
+TRACE_FILE_KEEP  = int(os.environ.get("TRACE_FILE_KEEP", "5"))
+
+_ids: contextvars.ContextVar[tuple] = contextvars.ContextVar("trace_call_ids", default=())
+_PID = os.getpid()
+
+
+class Trace:
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        self.t0 = time.perf_counter()
+        self.events: list[dict] = []
+        self.lanes: dict[int, tuple[int, str]] = {}  # task/thread id → (tid, row name)
+        self.lock = threading.Lock()
+
+    def add(self, name: str, start: float, end: float, args: dict, at: Optional[tuple] = None) -> None:
+        key, lane = at or _lane()
+        ev = {"name": name, "ph": "X", "pid": _PID,
+              "ts": round((start - self.t0) * 1e6, 1), "dur": round((end - start) * 1e6, 1)}
+        if args:
+            ev["args"] = args
+        with self.lock:
+            if key not in self.lanes:
+                self.lanes[key] = (len(self.lanes) + 1, lane)
+            ev["tid"] = self.lanes[key][0]
+            self.events.append(ev)
+
+    def chrome(self) -> dict:
+        """Chrome trace-event JSON (chrome://tracing, Perfetto, speedscope)."""
+        with self.lock:
+            meta = [{"name": "process_name", "ph": "M", "pid": _PID, "args": {"name": f"call {self.call_id}"}}]
+            meta += [{"name": "thread_name", "ph": "M", "pid": _PID, "tid": tid, "args": {"name": n}}
+                     for tid, n in self.lanes.values()]
+            return {"traceEvents": meta + sorted(self.events, key=lambda e: e["ts"]),
+                    "displayTimeUnit": "ms", "otherData": {"call_id": self.call_id}}
+
+
+def _lane() -> tuple[int, str]:
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:  # not on an event loop thread
+        task = None
+    if task is not None:
+        return id(task), f"task {task.get_name()}"
+    th = threading.current_thread()
+    return th.ident or 0, th.name
+
+
+_traces: "OrderedDict[str, Trace]" = OrderedDict()
+_lock = threading.Lock()
+
+# ---- rotating JSONL (one line per finished call), written off the request path ----
+_file_q: Optional[queue.Queue] = None
+if TRACE_FILE:
+    try:
+        os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+        _handler = logging.handlers.RotatingFileHandler(
+            TRACE_FILE, maxBytes=int(TRACE_FILE_MB * 2**20), backupCount=TRACE_FILE_KEEP, encoding="utf-8")
+        _handler.setFormatter(logging.Formatter("%(message)s"))
+        _file_q = queue.Queue(maxsize=1000)
+        logging.handlers.QueueListener(_file_q, _handler).start()
+    except Exception:
+        _file_q = None
+
+_log = logging.getLogger("timephone.trace")
+_log.propagate = False
+if _file_q is not None:
+    _log.addHandler(logging.handlers.QueueHandler(_file_q))
+    _log.setLevel(logging.INFO)
+
+
+def begin(call_id: str) -> None:
+    """Start a trace for call_id and make it current for this task (and what it spawns)."""
+    with _lock:
+        _traces[call_id] = Trace(call_id)
+        while len(_traces) > TRACE_CALLS:
+            _traces.popitem(last=False)
+    _ids.set((call_id,))
+
+
+def finish(call_id: Optional[str], **args) -> None:
+    """Close the call's root span and append the trace to the JSONL file."""
+    tr = get(call_id) if call_id else None
+    if tr is None:
+        return
+    tr.add("call", tr.t0, time.perf_counter(), args)
+    if _file_q is not None:
+        try:
+            _log.info(json.dumps(tr.chrome(), default=str))
+        except Exception:
+            pass
+
+
+def get(call_id: str) -> Optional[Trace]:
+    with _lock:
+        return _traces.get(call_id)
+
+
+def current() -> tuple:
+    return _ids.get()
+
+
+def record(ids: tuple, name: str, start: float, end: float, at: Optional[tuple] = None, **args) -> None:
+    """Add a span measured elsewhere (perf_counter start/end) to each call in ids; `at` = a _lane()."""
+    for cid in ids:
+        tr = get(cid)
+        if tr is not None:
+            tr.add(name, start, end, args, at)
+
+
+@contextmanager
+def span(name: str, **args):
+    ids = _ids.get()
+    if not ids:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(ids, name, t, time.perf_counter(), **args)
+
+
+def bind(fn: Callable, wait: Optional[str] = None, ids: Optional[tuple] = None) -> Callable:
+    """
+    fn wrapped to run with the caller's trace ids (or `ids`) in a pool thread. With `wait`,
+    the time between bind() and the thread picking the job up is recorded under that name,
+    on the caller's row.
+    """
+    ids = current() if ids is None else ids
+    if not ids:
+        return fn
+    t_sub = time.perf_counter()
+    caller = _lane()
+
+    def run(*a, **kw):
+        if wait:
+            record(ids, wait, t_sub, time.perf_counter(), at=caller)
+        tok = _ids.set(ids)
+        try:
+            return fn(*a, **kw)
+        finally:
+            _ids.reset(tok)
+    return run
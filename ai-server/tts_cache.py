@@ -0,0 +1,148 @@
+import hashlib, json, os, tempfile, threading
+from collections import OrderedDict
+from typing import Optional
+
+TTS_CACHE_MB      = float(os.environ.get("TTS_CACHE_MB", "64"))        # in-memory LRU budget
+TTS_CACHE_DIR     = os.environ.get("TTS_CACHE_DIR", os.path.join(os.path.dirname(__file__), "tts_cache"))  # "" = no disk tier
+TTS_CACHE_DISK_MB = float(os.environ.get("TTS_CACHE_DISK_MB", "512"))
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class TTSCache:
+    """
+    Per-sentence WAV cache: memory LRU with a byte budget, then files on disk that
+    survive restarts. Keys cover the voice (path + mtime), its config, the extra
+    Piper args and the whitespace-normalized sentence.
+    """
+
+    def __init__(self, mem_bytes: int = int(TTS_CACHE_MB * 2**20), disk_dir: str = TTS_CACHE_DIR,
+                 disk_bytes: int = int(TTS_CACHE_DISK_MB * 2**20)):
+        self.mem_budget = mem_bytes
+        self.disk_dir = disk_dir
+        self.disk_budget = disk_bytes
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mem_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits_mem = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    @staticmethod
+    def key(text: str, model_path: str, json_path: str, extra_args: str = "") -> str:
+        parts = [model_path, _mtime(model_path), json_path, _mtime(json_path), extra_args, " ".join(text.split())]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + ".wav")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.hits_mem += 1
+                self.bytes_saved += len(data)
+                return data
+        if self.disk_dir:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)  # disk tier evicts least recently used by mtime
+            except OSError:
+                data = None
+            if data is not None:
+                with self._lock:
+                    self.hits_disk += 1
+                    self.bytes_saved += len(data)
+                self._put_mem(key, data)
+                return data
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        self._put_mem(key, data)
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes += len(data)
+            over = self._disk_bytes > self.disk_budget
+        if over:
+            self._evict_disk()
+
+    def _put_mem(self, key: str, data: bytes) -> None:
+        if len(data) > self.mem_budget:
+            return
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._mem_bytes -= len(old)
+            self._mem[key] = data
+            self._mem_bytes += len(data)
+            while self._mem_bytes > self.mem_budget:
+                _, d = self._mem.popitem(last=False)
+                self._mem_bytes -= len(d)
+
+    def _disk_files(self):
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".wav"):
+                    p = os.path.join(root, name)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    yield p, st.st_size, st.st_mtime
+
+    def _evict_disk(self) -> None:
+        """Drop least recently used files until the disk tier is back under 90% of budget."""
+        files = sorted(self._disk_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        target = int(self.disk_budget * 0.9)
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_mem + self.hits_disk + self.misses
+            return {
+                "hits_mem": self.hits_mem,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits_mem + self.hits_disk) / lookups, 3) if lookups else 0,
+                "bytes_saved": self.bytes_saved,
+                "mem_entries": len(self._mem),
+                "mem_bytes": self._mem_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
@@ -0,0 +1,249 @@
+import os, select, shlex, shutil, subprocess, tempfile, threading, time, queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import tracing
+
+# Piper's --output_raw mode streams PCM for every stdin line with no marker between
+# utterances, so workers run in --output_dir mode instead: one line in → one WAV
+# written to a RAM-backed dir → its path printed on stdout. The voice stays loaded.
+PIPER_POOL_SIZE     = int(os.environ.get("PIPER_POOL_SIZE", "2"))        # workers per voice; 0 = one process per sentence
+PIPER_POOL_THREADS  = int(os.environ.get("PIPER_POOL_THREADS", "8"))     # sentences synthesized in parallel (all voices)
+PIPER_POOL_IDLE_SEC = float(os.environ.get("PIPER_POOL_IDLE_SEC", "600"))
+PIPER_POOL_TIMEOUT  = float(os.environ.get("PIPER_POOL_TIMEOUT", "30"))  # per sentence, all in: worker wait + synth + retry
+PIPER_SHM_DIR       = os.environ.get("PIPER_SHM_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+
+
+class PiperWorker:
+    """One long-lived Piper process with a single voice loaded."""
+
+    def __init__(self, cmd: list[str]):
+        self.cmd = cmd
+        self.out_dir = tempfile.mkdtemp(prefix="piper-", dir=PIPER_SHM_DIR)
+        self.proc: Optional[subprocess.Popen] = None
+        self.restarts = -1
+        self.served = 0
+        self.start()
+
+    def start(self) -> None:
+        self.kill()
+        self.proc = subprocess.Popen(
+            self.cmd + ["-d", self.out_dir],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            bufsize=0,  # unbuffered so select() sees exactly what Piper wrote
+        )
+        self.restarts += 1
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def synth(self, text: str, timeout: float = PIPER_POOL_TIMEOUT) -> bytes:
+        line = " ".join(text.split())  # Piper reads one utterance per line
+        if not line:
+            raise ValueError("empty text")
+        if timeout <= 0:
+            raise TimeoutError("no time left for piper")
+        self.proc.stdin.write((line + "\n").encode("utf-8"))
+        ready, _, _ = select.select([self.proc.stdout], [], [], timeout)
+        if not ready:
+            raise TimeoutError(f"piper gave no output in {timeout:.1f}s")
+        path = self.proc.stdout.readline().decode("utf-8", "replace").strip()
+        if not path:
+            raise RuntimeError("piper exited")
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        finally:
+            try:
+                os.unlink(path)
+            except Exception:
+                pass
+        self.served += 1
+        return data
+
+    def kill(self) -> None:
+        if self.proc is None:
+            return
+        try:
+            self.proc.kill()
+            self.proc.wait(timeout=2)
+        except Exception:
+            pass
+        self.proc = None
+
+    def close(self) -> None:
+        self.kill()
+        shutil.rmtree(self.out_dir, ignore_errors=True)
+
+
+class _Voice:
+    def __init__(self):
+        self.idle: "queue.Queue[PiperWorker]" = queue.Queue()
+        self.workers: list[PiperWorker] = []
+        self.last_used = time.monotonic()
+        self.busy = 0
+
+
+class PiperPool:
+    """
+    Long-lived Piper workers keyed by (voice_path, voice_json), up to `size` per voice.
+    Dead workers are restarted on checkout and by the reaper; voices unused for
+    `idle_sec` are shut down.
+    """
+
+    def __init__(self, piper_bin: str, extra_args: str = "", size: int = PIPER_POOL_SIZE,
+                 threads: int = PIPER_POOL_THREADS, idle_sec: float = PIPER_POOL_IDLE_SEC):
+        self.piper_bin = piper_bin
+        self.extra_args = shlex.split(extra_args) if extra_args else []
+        self.size = size
+        self.idle_sec = idle_sec
+        self.executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="piper")
+        self._voices: dict[tuple[str, str], _Voice] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def _cmd(self, model_path: str, json_path: str) -> list[str]:
+        cmd = [self.piper_bin, "-m", model_path]
+        if os.path.exists(json_path):
+            cmd += ["-c", json_path]
+        return cmd + self.extra_args
+
+    def _checkout(self, key: tuple[str, str], deadline: float) -> tuple[_Voice, PiperWorker]:
+        with self._lock:
+            v = self._voices.get(key)
+            if v is None:
+                v = self._voices[key] = _Voice()
+            v.last_used = time.monotonic()
+            v.busy += 1
+            spawn = v.idle.empty() and len(v.workers) < self.size
+            w = None
+            try:
+                if spawn:
+                    w = PiperWorker(self._cmd(*key))
+                    v.workers.append(w)
+            except Exception:
+                v.busy -= 1
+                raise
+        self._ensure_reaper()
+        if w is None:
+            try:
+                w = v.idle.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                with self._lock:
+                    v.busy -= 1
+                raise TimeoutError("no idle piper worker")
+        if not w.alive():
+            try:
+                w.start()
+            except Exception:
+                self._checkin(v, w)
+                raise
+        return v, w
+
+    def _checkin(self, v: _Voice, w: PiperWorker) -> None:
+        with self._lock:
+            v.busy -= 1
+            v.last_used = time.monotonic()
+        v.idle.put(w)
+
+    def synth(self, text: str, model_path: str, json_path: str, timeout: float = PIPER_POOL_TIMEOUT) -> bytes:
+        """
+        Synthesize one sentence → WAV bytes. Restarts and retries once if the worker died
+        or hung. The wait for a worker, the synthesis and the retry share one `timeout`.
+        """
+        deadline = time.monotonic() + timeout
+        with tracing.span("tts.pool_checkout"):
+            v, w = self._checkout((model_path, json_path), deadline)
+        try:
+            try:
+                with tracing.span("tts.worker_synth", restarts=w.restarts):
+                    return w.synth(text, deadline - time.monotonic())
+            except ValueError:
+                raise
+            except Exception:
+                if deadline - time.monotonic() <= 0:
+                    raise
+                w.start()
+                return w.synth(text, deadline - time.monotonic())
+        except Exception:
+            w.kill()  # unknown state; restarted on next checkout
+            raise
+        finally:
+            self._checkin(v, w)
+
+    def prewarm(self, model_path: str, json_path: str) -> None:
+        """Start one worker for this voice so the first call doesn't pay the model load."""
+        if not self.enabled:
+            return
+        v, w = self._checkout((model_path, json_path), time.monotonic() + PIPER_POOL_TIMEOUT)
+        self._checkin(v, w)
+
+    # ---- health / eviction ----
+    def _ensure_reaper(self) -> None:
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while True:
+            time.sleep(10)
+            try:
+                self.reap()
+            except Exception:
+                pass
+
+    def reap(self) -> None:
+        now = time.monotonic()
+        evict = []
+        with self._lock:
+            for key, v in list(self._voices.items()):
+                if v.busy == 0 and now - v.last_used > self.idle_sec:
+                    evict.append(self._voices.pop(key))
+        for v in evict:
+            for w in v.workers:
+                w.close()
+        # health check: restart idle workers whose process died
+        with self._lock:
+            voices = list(self._voices.values())
+        for v in voices:
+            for _ in range(v.idle.qsize()):
+                try:
+                    w = v.idle.get_nowait()
+                except queue.Empty:
+                    break
+                if not w.alive():
+                    try:
+                        w.start()
+                    except Exception:
+                        pass
+                v.idle.put(w)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "voices": {
+                    os.path.basename(key[0]): {
+                        "workers": len(v.workers),
+                        "alive": sum(1 for w in v.workers if w.alive()),
+                        "busy": v.busy,
+                        "served": sum(w.served for w in v.workers),
+                        "restarts": sum(w.restarts for w in v.workers),
+                        "idle_sec": int(time.monotonic() - v.last_used),
+                    }
+                    for key, v in self._voices.items()
+                },
+            }
+
+    def close(self) -> None:
+        """Stop every worker and remove its output dir (server shutdown)."""
+        with self._lock:
+            voices = list(self._voices.values())
+            self._voices.clear()
+        for v in voices:
+            for w in v.workers:
+                w.close()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the vLLM server: OpenAI-compatible /v1/models and /v1/chat/completions
+(streamed or not), with tunable time-to-first-token and per-token latency. Stdlib only.
+
+  python loadtest/fake_llm.py --port 8001 --ttft-ms 250 --token-ms 25
+  LLM_ENDPOINT=http://127.0.0.1:8001/v1 ./ai-server/start_api.sh
+"""
+import argparse, json, random, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+REPLY = ("Ah, a fine question! Time and space are not fixed stages but depend on how you move. "
+         "Imagine two trains passing in the night; each sees the other's clocks tick slowly. "
+         "Curious, is it not?")
+
+
+def make_handler(opts):
+    words = [w + " " for w in opts.reply.split(" ")]
+
+    def delay(ms: float) -> None:
+        if ms > 0:
+            time.sleep(max(0.0, random.gauss(ms, ms * opts.jitter)) / 1000.0)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *a):
+            pass
+
+        def _json(self, obj: dict, code: int = 200) -> None:
+            body = json.dumps(obj).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._json({"object": "list", "data": [{"id": opts.model, "object": "model"}]})
+            else:
+                self._json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._json({"error": "not found"}, 404)
+            if opts.error_rate and random.random() < opts.error_rate:
+                return self._json({"error": "injected failure"}, 500)
+            toks = words[: req.get("max_tokens") or len(words)]
+            delay(opts.ttft_ms)
+            if not req.get("stream"):
+                delay(opts.token_ms * (len(toks) - 1))
+                return self._json({"object": "chat.completion", "model": opts.model,
+                                   "choices": [{"index": 0, "finish_reason": "stop",
+                                                "message": {"role": "assistant", "content": "".join(toks).strip()}}]})
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            try:
+                for i, t in enumerate(toks):
+                    if i:
+                        delay(opts.token_ms)
+                    chunk = {"object": "chat.completion.chunk", "model": opts.model,
+                             "choices": [{"index": 0, "delta": {"content": t}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            self.close_connection = True
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8001)
+    ap.add_argument("--model", default="fake-llm")
+    ap.add_argument("--ttft-ms", type=float, default=250, help="time to first token")
+    ap.add_argument("--token-ms", type=float, default=25, help="time between tokens (one word each)")
+    ap.add_argument("--jitter", type=float, default=0.2, help="gaussian sd as a fraction of each delay")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of completions answered with 500")
+    ap.add_argument("--reply", default=REPLY)
+    opts = ap.parse_args()
+    srv = ThreadingHTTPServer((opts.host, opts.port), make_handler(opts))
+    srv.daemon_threads = True
+    print(f"fake LLM on http://{opts.host}:{opts.port}/v1 (ttft {opts.ttft_ms:g} ms, {opts.token_ms:g} ms/token)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
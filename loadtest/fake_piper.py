@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the Piper binary, speaking the two modes the server uses:
+  -f OUT.wav        one utterance from stdin → OUT.wav          (one process per sentence)
+  -d DIR            one utterance per stdin line → DIR/N.wav, path printed on stdout  (pool)
+Audio is a quiet tone, FAKE_PIPER_CHAR_SEC seconds per character, at the voice's sample
+rate (-c voice.onnx.json, else 22050). Synthesis takes FAKE_PIPER_RTF × the audio length;
+starting takes FAKE_PIPER_LOAD_SEC (the model load). Stdlib only.
+
+  PIPER_BIN=$PWD/loadtest/fake_piper.py PIPER_VOICE=$PWD/loadtest/fake_voice.onnx ./ai-server/start_api.sh
+"""
+import json, math, os, struct, sys, time, wave
+
+RTF      = float(os.environ.get("FAKE_PIPER_RTF", "0.1"))        # synthesis time / audio time
+CHAR_SEC = float(os.environ.get("FAKE_PIPER_CHAR_SEC", "0.06"))  # audio seconds per character
+LOAD_SEC = float(os.environ.get("FAKE_PIPER_LOAD_SEC", "0.5"))
+
+
+def opt(args: list[str], *names: str):
+    for n in names:
+        if n in args and args.index(n) + 1 < len(args):
+            return args[args.index(n) + 1]
+    return None
+
+
+def sample_rate(config: str) -> int:
+    try:
+        with open(config, "r", encoding="utf-8") as f:
+            return int(json.load(f)["audio"]["sample_rate"])
+    except Exception:
+        return 22050
+
+
+def synth(text: str, sr: int) -> bytes:
+    n = int(sr * CHAR_SEC * max(1, len(text)))
+    t0 = time.perf_counter()
+    step = 2 * math.pi * 220 / sr
+    pcm = struct.pack(f"<{n}h", *(int(3000 * math.sin(i * step)) for i in range(n)))
+    time.sleep(max(0.0, RTF * n / sr - (time.perf_counter() - t0)))
+    return pcm
+
+
+def write_wav(path: str, pcm: bytes, sr: int) -> None:
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(pcm)
+
+
+def main(args: list[str]) -> int:
+    sr = sample_rate(opt(args, "-c", "--config") or f"{opt(args, '-m', '--model')}.json")
+    time.sleep(LOAD_SEC)
+    out_file, out_dir = opt(args, "-f", "--output_file"), opt(args, "-d", "--output_dir")
+    if out_file:
+        write_wav(out_file, synth(sys.stdin.read().strip(), sr), sr)
+        return 0
+    if not out_dir:
+        print("fake_piper: need -f FILE or -d DIR", file=sys.stderr)
+        return 2
+    n = 0
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        n += 1
+        path = os.path.join(out_dir, f"{os.getpid()}_{n}.wav")
+        write_wav(path, synth(line, sr), sr)
+        sys.stdout.write(path + "\n")
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
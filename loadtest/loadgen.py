@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Load generator for /converse: replays a directory of WAV questions at a fixed concurrency
+(closed loop: N phones, each asks again as soon as it hears the reply) or at a fixed
+arrival rate (open loop, Poisson arrivals). Reports throughput, error rate and per-stage
+p50/p95/p99 from the X-Timing-* headers, plus client-side time to first byte and total.
+
+  python loadtest/loadgen.py questions/ --concurrency 4 --duration 60
+  python loadtest/loadgen.py questions/ --rate 2 --requests 200 --stream --json out.json
+
+With no GPU or network: run the server against loadtest/fake_llm.py and fake_piper.py
+(see README) and a small Whisper model (WHISPER_MODEL=tiny.en).
+"""
+import argparse, asyncio, glob, json, math, os, random, sys, time
+from collections import Counter, defaultdict
+
+import httpx
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..1)."""
+    if not values:
+        return 0.0
+    v = sorted(values)
+    return v[min(len(v) - 1, max(0, math.ceil(round(q * len(v), 9)) - 1))]  # round: 0.07 * 100 is 7.000000000000001
+
+
+def load_questions(path: str) -> list[tuple[str, bytes]]:
+    files = sorted(glob.glob(os.path.join(path, "*.wav"))) if os.path.isdir(path) else [path]
+    out = []
+    for f in files:
+        with open(f, "rb") as fh:
+            out.append((os.path.basename(f), fh.read()))
+    if not out:
+        sys.exit(f"no .wav files in {path}")
+    return out
+
+
+class Results:
+    def __init__(self):
+        self.ok = 0
+        self.errors: Counter = Counter()
+        self.stages: dict[str, list[float]] = defaultdict(list)
+        self.sources: Counter = Counter()
+        self.t0 = time.perf_counter()
+        self.t1 = self.t0
+
+    def add(self, resp: httpx.Response, ttfb: float, total: float) -> None:
+        self.t1 = time.perf_counter()
+        if resp.status_code != 200:
+            self.errors[f"http {resp.status_code}"] += 1
+            return
+        self.ok += 1
+        for k, v in resp.headers.items():  # x-timing-stt-ms → stt
+            if k.startswith("x-timing-") and k.endswith("-ms"):
+                try:
+                    self.stages[k[9:-3]].append(float(v))
+                except ValueError:
+                    pass
+        self.stages["client_ttfb"].append(ttfb * 1000)
+        self.stages["client_total"].append(total * 1000)
+        cache = resp.headers.get("x-reply-cache")
+        self.sources["cache" if cache in ("exact", "near") else
+                     "llm" if resp.headers.get("x-llm-used") == "1" else "fallback"] += 1
+
+    def fail(self, err: Exception) -> None:
+        self.t1 = time.perf_counter()
+        self.errors[type(err).__name__] += 1
+
+    def report(self) -> dict:
+        n = self.ok + sum(self.errors.values())
+        wall = max(1e-9, self.t1 - self.t0)
+        return {
+            "requests": n,
+            "ok": self.ok,
+            "errors": dict(self.errors),
+            "error_rate": round(sum(self.errors.values()) / n, 4) if n else 0.0,
+            "wall_sec": round(wall, 2),
+            "throughput_rps": round(self.ok / wall, 3),
+            "reply_source": dict(self.sources),
+            "stages_ms": {k: {"p50": percentile(v, 0.50), "p95": percentile(v, 0.95),
+                              "p99": percentile(v, 0.99), "max": max(v), "n": len(v)}
+                          for k, v in sorted(self.stages.items())},
+        }
+
+
+async def one_call(client: httpx.AsyncClient, opts, question: tuple[str, bytes], res: Results) -> None:
+    name, wav = question
+    t = time.perf_counter()
+    try:
+        async with client.stream(
+            "POST", opts.url.rstrip("/") + "/converse",
+            params={"stream": 1} if opts.stream else None,
+            data={"persona": opts.persona, "format": opts.format},
+            files={"audio": (name, wav, "audio/wav")},
+        ) as resp:
+            ttfb = None
+            async for _ in resp.aiter_raw():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - t
+            total = time.perf_counter() - t
+            res.add(resp, ttfb if ttfb is not None else total, total)
+    except Exception as e:
+        res.fail(e)
+
+
+async def run(opts) -> dict:
+    questions = load_questions(opts.questions)
+    res = Results()
+    limits = httpx.Limits(max_connections=max(opts.concurrency, 64), max_keepalive_connections=max(opts.concurrency, 64))
+    deadline = time.perf_counter() + opts.duration if opts.duration else None
+    budget = {"left": opts.requests}
+
+    def take() -> bool:
+        if deadline and time.perf_counter() >= deadline:
+            return False
+        if budget["left"] is not None:
+            if budget["left"] <= 0:
+                return False
+            budget["left"] -= 1
+        return True
+
+    async with httpx.AsyncClient(timeout=opts.timeout, limits=limits) as client:
+        if opts.wait_ready:
+            await wait_ready(client, opts)
+            res = Results()
+        if opts.rate:
+            tasks = set()
+            while take():
+                tasks.add(asyncio.create_task(one_call(client, opts, random.choice(questions), res)))
+                tasks = {t for t in tasks if not t.done()}
+                await asyncio.sleep(random.expovariate(opts.rate))
+            await asyncio.gather(*tasks)
+        else:
+            async def phone(i: int) -> None:
+                q = i
+                while take():
+                    await one_call(client, opts, questions[q % len(questions)], res)
+                    q += opts.concurrency
+            await asyncio.gather(*(phone(i) for i in range(opts.concurrency)))
+    return res.report()
+
+
+async def wait_ready(client: httpx.AsyncClient, opts, limit: float = 300) -> None:
+    end = time.perf_counter() + limit
+    while time.perf_counter() < end:
+        try:
+            if (await client.get(opts.url.rstrip("/") + "/ready")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(1)
+    sys.exit("server never became ready")
+
+
+def print_report(rep: dict, opts) -> None:
+    mode = f"rate {opts.rate:g}/s" if opts.rate else f"concurrency {opts.concurrency}"
+    print(f"{rep['requests']} requests ({mode}, {'stream' if opts.stream else 'file'}) in {rep['wall_sec']} s")
+    print(f"  ok {rep['ok']}   errors {sum(rep['errors'].values())} ({rep['error_rate']:.1%}) {rep['errors'] or ''}")
+    print(f"  throughput {rep['throughput_rps']} calls/s   reply source {rep['reply_source']}")
+    print(f"  {'stage (ms)':<14}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}{'n':>6}")
+    for k, s in rep["stages_ms"].items():
+        print(f"  {k:<14}{s['p50']:>8.0f}{s['p95']:>8.0f}{s['p99']:>8.0f}{s['max']:>8.0f}{s['n']:>6}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("questions", help="directory of .wav questions (or one .wav)")
+    ap.add_argument("--url", default=os.environ.get("API_URL", "http://127.0.0.1:8000"))
+    ap.add_argument("--persona", default="1")
+    ap.add_argument("--concurrency", "-c", type=int, default=1, help="closed loop: phones calling back to back")
+    ap.add_argument("--rate", type=float, default=0.0, help="open loop: mean new calls per second (overrides -c)")
+    ap.add_argument("--requests", "-n", type=int, default=None, help="stop after this many calls")
+    ap.add_argument("--duration", "-d", type=float, default=None, help="stop after this many seconds")
+    ap.add_argument("--stream", action="store_true", help="use /converse?stream=1")
+    ap.add_argument("--format", default="wav")
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--wait-ready", action="store_true", help="poll /ready before starting")
+    ap.add_argument("--json", help="also write the report here")
+    ap.add_argument("--seed", type=int, default=None)
+    opts = ap.parse_args()
+    if opts.requests is None and opts.duration is None:
+        opts.requests = 20
+    random.seed(opts.seed)
+    rep = asyncio.run(run(opts))
+    print_report(rep, opts)
+    if opts.json:
+        with open(opts.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(opts), **rep}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
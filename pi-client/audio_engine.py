@@ -0,0 +1,217 @@
+"""
+In-process audio output for the phone: one ALSA playback stream stays open for the life
+of the process and a mixer thread sums whatever is playing into it. Clips are decoded
+once (WAV → int16 mono at the engine rate) and kept in memory, so play / stop / loop /
+fade are a list append or a couple of attribute writes — no aplay, sox or pkill.
+
+Needs pyalsaaudio (`sudo apt install python3-alsaaudio` or `pip install pyalsaaudio`) and numpy.
+AUDIO_PERIODS needs pyalsaaudio >= 0.10; older versions keep the driver's buffer size.
+"""
+import os, threading, wave
+from typing import Optional
+
+import numpy as np
+import alsaaudio
+
+PERIOD_MS = int(os.environ.get("AUDIO_PERIOD_MS", "10"))  # mixer step; output latency ≈ PERIODS × this
+PERIODS   = int(os.environ.get("AUDIO_PERIODS", "4"))
+
+
+def load_wav(path: str, rate: int) -> np.ndarray:
+    """WAV file → int16 mono at `rate` (linear resample; done once per clip)."""
+    with wave.open(path, "rb") as w:
+        ch, width, sr = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 1:
+        y = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif width == 2:
+        y = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        y = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"{path}: {8 * width}-bit WAV not supported")
+    if ch > 1:
+        y = y.reshape(-1, ch).mean(axis=1)
+    if sr != rate and len(y):
+        n = int(round(len(y) * rate / sr))
+        y = np.interp(np.arange(n) * (sr / rate), np.arange(len(y)), y)
+    return np.clip(y * 32768.0, -32768, 32767).astype(np.int16)
+
+
+class Voice:
+    """One playing sound. wait() blocks until it ends (Popen-style), stop() ends it."""
+
+    def __init__(self, engine: "AudioEngine", data: Optional[np.ndarray], loop: bool = False,
+                 gain: float = 1.0, limit: Optional[int] = None, fade_in: int = 0):
+        self.engine = engine
+        self.data = data
+        self.loop = loop
+        self.pos = 0
+        self.limit = limit             # samples to play at most (None = whole clip / forever if looping)
+        self.played = 0
+        self.gain = 0.0 if fade_in else gain
+        self.target = gain
+        self.step = gain / fade_in if fade_in else 0.0
+        self.stop_after_fade = False
+        self.done = threading.Event()
+
+    def read(self, n: int) -> Optional[np.ndarray]:
+        """Next n samples (int16, zero-padded at the end) or None when finished. Mixer thread only."""
+        if self.done.is_set():
+            return None
+        n_live = n if self.limit is None else max(0, min(n, self.limit - self.played))
+        out = np.zeros(n, dtype=np.int16)
+        got = 0
+        while got < n_live:
+            take = min(n_live - got, len(self.data) - self.pos)
+            if take <= 0:
+                if not self.loop or not len(self.data):
+                    break
+                self.pos = 0
+                continue
+            out[got:got + take] = self.data[self.pos:self.pos + take]
+            self.pos += take
+            got += take
+        self.played += got
+        if got < n_live or (self.limit is not None and self.played >= self.limit):
+            self.done.set()  # clip over (or max_sec reached); this last chunk still gets mixed
+        return self._envelope(out)
+
+    def _envelope(self, out: np.ndarray) -> np.ndarray:
+        if self.step == 0.0:
+            return out if self.gain == 1.0 else (out * self.gain).astype(np.int16)
+        g = self.gain + self.step * np.arange(1, len(out) + 1, dtype=np.float32)
+        g = np.minimum(g, self.target) if self.step > 0 else np.maximum(g, self.target)
+        self.gain = float(g[-1])
+        if self.gain == self.target:
+            self.step = 0.0
+            if self.stop_after_fade:
+                self.done.set()
+        return (out * g).astype(np.int16)
+
+    def fade(self, to: float, ms: float) -> None:
+        n = max(1, int(self.engine.rate * ms / 1000))
+        self.target = to
+        self.step = (to - self.gain) / n
+
+    def stop(self, fade_ms: float = 0) -> None:
+        if fade_ms > 0 and not self.done.is_set():
+            self.stop_after_fade = True
+            self.fade(0.0, fade_ms)
+        else:
+            self.done.set()
+
+    def playing(self) -> bool:
+        return not self.done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+
+class StreamVoice(Voice):
+    """A voice fed with S16LE PCM as it arrives (the streamed reply). Gaps play as silence."""
+
+    def __init__(self, engine: "AudioEngine", gain: float = 1.0):
+        super().__init__(engine, None, gain=gain)
+        self._buf = bytearray()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def write(self, pcm: bytes) -> bool:
+        """Queue PCM; False once the voice was stopped (hang-up)."""
+        if self.done.is_set():
+            return False
+        with self._lock:
+            self._buf += pcm
+        return True
+
+    def close(self) -> None:
+        """No more PCM: the voice ends when what's queued has played."""
+        self._closed = True
+
+    def read(self, n: int) -> Optional[np.ndarray]:
+        if self.done.is_set():
+            return None
+        with self._lock:
+            k = min(len(self._buf) // 2, n)
+            chunk = bytes(self._buf[:2 * k])
+            del self._buf[:2 * k]
+            empty = not self._buf
+        out = np.zeros(n, dtype=np.int16)
+        out[:k] = np.frombuffer(chunk, dtype="<i2")
+        if k < n and empty and self._closed:
+            self.done.set()
+        return self._envelope(out)
+
+
+class AudioEngine:
+    def __init__(self, device: str = "default", rate: int = 16000):
+        self.rate = rate
+        self.period = rate * PERIOD_MS // 1000
+        args = dict(device=device, rate=rate, channels=1, format=alsaaudio.PCM_FORMAT_S16_LE,
+                    periodsize=self.period)
+        try:
+            self.pcm = alsaaudio.PCM(alsaaudio.PCM_PLAYBACK, alsaaudio.PCM_NORMAL, periods=PERIODS, **args)
+        except TypeError:  # pyalsaaudio < 0.10 (Debian's python3-alsaaudio) has no `periods`
+            print(f"[AUDIO] pyalsaaudio {getattr(alsaaudio, '__version__', '?')} can't set periods; "
+                  f"using the driver's buffer (AUDIO_PERIODS ignored, output latency may be higher)", flush=True)
+            self.pcm = alsaaudio.PCM(alsaaudio.PCM_PLAYBACK, alsaaudio.PCM_NORMAL, **args)
+        self.clips: dict[str, np.ndarray] = {}
+        self.voices: list[Voice] = []
+        self._lock = threading.Lock()
+        self._silence = bytes(2 * self.period)
+        self._thread = threading.Thread(target=self._mix, name="audio-mixer", daemon=True)
+        self._thread.start()
+
+    # ---- clips ----
+    def load(self, path: str) -> np.ndarray:
+        """Decode once; later plays of the same path reuse the samples."""
+        clip = self.clips.get(path)
+        if clip is None:
+            clip = self.clips[path] = load_wav(path, self.rate)
+        return clip
+
+    # ---- control (any thread; all O(1)) ----
+    def play(self, path: str, loop: bool = False, gain: float = 1.0,
+             max_sec: Optional[float] = None, fade_in_ms: float = 0) -> Voice:
+        v = Voice(self, self.load(path), loop=loop, gain=gain,
+                  limit=int(max_sec * self.rate) if max_sec else None,
+                  fade_in=int(self.rate * fade_in_ms / 1000))
+        with self._lock:
+            self.voices.append(v)
+        return v
+
+    def stream(self, gain: float = 1.0) -> StreamVoice:
+        v = StreamVoice(self, gain=gain)
+        with self._lock:
+            self.voices.append(v)
+        return v
+
+    def stop_all(self, fade_ms: float = 0) -> None:
+        with self._lock:
+            voices = list(self.voices)
+        for v in voices:
+            v.stop(fade_ms)
+
+    def busy(self) -> bool:
+        return any(v.playing() for v in self.voices)
+
+    # ---- mixer thread ----
+    def _mix(self) -> None:
+        acc = np.zeros(self.period, dtype=np.int32)
+        while True:
+            with self._lock:
+                voices = self.voices = [v for v in self.voices if v.playing()]
+            if not voices:
+                self.pcm.write(self._silence)  # keeps the stream running: the next play starts within a period
+                continue
+            acc[:] = 0
+            for v in voices:
+                try:
+                    chunk = v.read(self.period)
+                except Exception:
+                    v.done.set()
+                    continue
+                if chunk is not None:
+                    acc += chunk
+            self.pcm.write(np.clip(acc, -32768, 32767).astype("<i2").tobytes())
@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
-import os, time, subprocess, threading, signal, requests, shlex, random, glob
+import os, time, subprocess, threading, signal, requests, shlex, random, glob, math, struct
+from array import array
+from collections import deque
+from datetime import datetime, timezone
 from threading import Timer
 from gpiozero import Button
+try:
+    from audio_engine import AudioEngine  # one persistent ALSA stream + mixer; needs pyalsaaudio
+except Exception:
+    AudioEngine = None                    # → aplay / sox subprocesses as before
 
 # ====== CONFIG ======
 HOOK_GPIO = 13
@@ -26,6 +33,23 @@ PERSONAS  = {"314":"einstein", "186":"lincoln", "168":"newton"}
 
 INTER_DIGIT_GAP = 0.70
 MAX_RECORD_SEC  = 30
+UPLOAD_FMT      = os.environ.get("UPLOAD_FMT", "flac")   # wav | flac | ogg (sox writes it; server decodes in memory)
+UPLOAD_MIME     = {"wav": "audio/wav", "flac": "audio/flac", "ogg": "audio/ogg"}
+REPLY_SR        = int(os.environ.get("REPLY_SR", "16000"))  # server resamples the reply to what the dongle plays
+REPLY_JITTER_MS = int(os.environ.get("REPLY_JITTER_MS", "150"))  # reply audio buffered before aplay starts
+# 1 = upload raw PCM while speaking (/converse/pcm): 32 kB/s, about twice the UPLOAD_FMT=flac file;
+# 0 = record a UPLOAD_FMT file first (less upload, but the server only starts once you stop talking)
+UPLOAD_STREAM   = os.environ.get("UPLOAD_STREAM", "1") == "1"
+VAD_LEVEL       = float(os.environ.get("VAD_LEVEL", "0.02"))   # RMS (fraction of full scale) that counts as speech
+VAD_START_SEC   = 0.2    # this much speech starts the question (like `sox silence 1 0.2 2%`)
+VAD_END_SEC     = 2.0    # this much silence after speech ends it
+VAD_FRAME_MS    = 20
+UPLOAD_CHUNK_MS = 200    # PCM per length-prefixed frame sent to the server
+AUDIO_ENGINE    = os.environ.get("AUDIO_ENGINE", "1") == "1"  # 0 = always use aplay/sox subprocesses
+STOP_FADE_MS    = 8      # fade-out on stop, so cutting a clip doesn't click
+EVENTS_MAX      = 256    # telemetry queue bound (oldest dropped first)
+EVENTS_BATCH    = 50     # events per POST /events/batch
+EVENTS_LINGER   = 0.05   # wait this long after the first queued event before sending
 HOOK_BOUNCE     = 0.15
 HANGUP_GRACE    = 0.35
 # ====================
@@ -33,11 +57,80 @@ HANGUP_GRACE    = 0.35
 ARECORD_PAT  = f"arecord -q -D {USB_DEV}"
 SOX_PIPE_PAT = "sox -t wav - -t wav"
 
+# ---- telemetry: queued here, sent in batches by a background thread ----
+_events = deque(maxlen=EVENTS_MAX)   # drop-oldest when the server is slow or gone
+_events_cv = threading.Condition()
+_events_dropped = 0
+_events_inflight = 0                  # events taken off the queue whose POST hasn't finished
+_events_session = requests.Session()  # keep-alive: one connection for every batch
+
 def emit(event: str, data: dict | None = None):
-    try:
-        requests.post(f"{SERVER_BASE}/event", json={"type": event, "data": data or {}}, timeout=1.5)
-    except Exception:
-        pass
+    """Queue a dashboard event; never blocks the dial or call flow."""
+    global _events_dropped
+    ev = {"type": event, "data": data or {},
+          "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")}
+    with _events_cv:
+        if len(_events) == _events.maxlen:
+            _events_dropped += 1
+        _events.append(ev)
+        _events_cv.notify_all()  # the sender, and flush_events() if it's waiting
+
+def _send_events():
+    global _events_dropped, _events_inflight
+    backoff = 0.0
+    batch_url, single_url = f"{SERVER_BASE}/events/batch", f"{SERVER_BASE}/event"
+    while True:
+        with _events_cv:
+            while not _events:
+                _events_cv.wait()
+        time.sleep(EVENTS_LINGER)  # let a burst (dial digit + ringback + …) share one request
+        with _events_cv:
+            batch = [_events.popleft() for _ in range(min(EVENTS_BATCH, len(_events)))]
+            dropped, _events_dropped = _events_dropped, 0
+            _events_inflight = len(batch)
+        try:
+            r = _events_session.post(batch_url, json={"events": batch, "dropped": dropped}, timeout=2)
+            if r.status_code == 404:  # older server: one event per request, best effort like before
+                for ev in batch:
+                    try:
+                        _events_session.post(single_url, json=ev, timeout=2)
+                    except Exception:
+                        pass
+            elif 400 <= r.status_code < 500 and r.status_code not in (408, 429):
+                # the server will never take this batch: drop it rather than retry it forever
+                log(f"[EVENTS] server refused {len(batch)} events (HTTP {r.status_code}); dropped")
+            else:
+                r.raise_for_status()
+                try:
+                    rejected = r.json().get("rejected")
+                except Exception:
+                    rejected = None
+                if rejected:  # the good ones went out; the bad ones would fail again
+                    log(f"[EVENTS] server skipped {len(rejected)} bad events: {rejected[:3]}")
+            backoff = 0.0
+        except Exception:
+            with _events_cv:  # put the batch back in front, keeping the newest if there's no room
+                room = _events.maxlen - len(_events)
+                keep = batch[len(batch) - room:] if room < len(batch) else batch
+                _events.extendleft(reversed(keep))
+                _events_dropped += dropped + len(batch) - len(keep)
+            backoff = min(10.0, backoff * 2 or 0.5)
+        finally:
+            with _events_cv:
+                _events_inflight = 0
+                _events_cv.notify_all()
+        if backoff:
+            time.sleep(backoff)
+
+def start_event_sender():
+    threading.Thread(target=_send_events, name="telemetry", daemon=True).start()
+
+def flush_events(timeout: float = 1.0):
+    """Give queued events, and the batch being sent, a moment to go out (shutdown)."""
+    end = time.monotonic() + timeout
+    with _events_cv:
+        while (_events or _events_inflight) and time.monotonic() < end:
+            _events_cv.wait(end - time.monotonic())
 
 def log(msg: str):
     print(msg, flush=True)
@@ -76,7 +169,31 @@ recording_proc = None
 state_lock = threading.Lock()
 
 # ---- helpers: audio play/stop ----
+ENGINE = None  # AudioEngine once main() opened it; play/stop then never spawn a process
+
+def start_audio_engine():
+    """Open the ALSA stream and decode every clip the call flow plays, once."""
+    global ENGINE
+    if not (AUDIO_ENGINE and AudioEngine):
+        log("[AUDIO] using aplay/sox subprocesses")
+        return
+    try:
+        ENGINE = AudioEngine(USB_DEV, rate=REPLY_SR)
+    except Exception as e:
+        log(f"[AUDIO] engine unavailable ({e}); using aplay/sox subprocesses")
+        return
+    names = ["dial_tone.wav", "ringback.wav", "receiver_lift.wav", "click.wav", "greet_einstein.wav"]
+    paths = [p for p in map(find_sound, names) if p] + _collect_fillers()
+    for p in paths:
+        try:
+            ENGINE.load(p)
+        except Exception as e:
+            log(f"[AUDIO] can't preload {p}: {e}")
+    log(f"[AUDIO] engine on {USB_DEV} @ {REPLY_SR} Hz, {len(ENGINE.clips)} clips in memory")
+
 def play_wav(path, loop=False):
+    if ENGINE:
+        return ENGINE.play(path, loop=loop)
     args = ["aplay", "-q", "-D", USB_DEV, path]
     if loop:
         def looper():
@@ -95,6 +212,8 @@ def play_wav(path, loop=False):
 
 def play_wav_for(path, seconds: float):
     secs = max(0.1, float(seconds))
+    if ENGINE:
+        return ENGINE.play(path, max_sec=secs)
     # Output RAW PCM from sox → aplay in RAW mode; add -q to keep sox quiet
     cmd = (
         f"sox -q {shlex.quote(path)} -r 16000 -b 16 -e signed-integer -c 1 -t raw - trim 0 {secs} | "
@@ -105,6 +224,9 @@ def play_wav_for(path, seconds: float):
 
 
 def stop_playing():
+    if ENGINE:
+        ENGINE.stop_all(fade_ms=STOP_FADE_MS)
+        return
     # stop any aplay quickly
     subprocess.call(["pkill", "-f", f"aplay -q -D {USB_DEV}"],
                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -184,7 +306,10 @@ def play_one_filler_once():
 
 def stop_filler():
     global filler_proc
-    if filler_proc and filler_proc.poll() is None:
+    if ENGINE:
+        if filler_proc:
+            filler_proc.stop(fade_ms=STOP_FADE_MS)
+    elif filler_proc and filler_proc.poll() is None:
         try:
             os.killpg(os.getpgid(filler_proc.pid), signal.SIGTERM)
         except Exception:
@@ -194,13 +319,13 @@ def stop_filler():
     emit("filler_stop", {})
 
 # ---- record + converse ----
-def record_until_silence(out_wav):
+def record_until_silence(out_path):
     global recording_proc
     stop_playing()
     kill_stale_capture()
     cmd = (
         f"{ARECORD_PAT} -f S16_LE -c1 -r16000 -d {MAX_RECORD_SEC} | "
-        f"sox -q -t wav - -t wav {out_wav} silence 1 0.2 2% 1 2.0 2%"
+        f"sox -q -t wav - -t {UPLOAD_FMT} {out_path} silence 1 0.2 2% 1 2.0 2%"
     )
     recording_proc = subprocess.Popen(cmd, shell=True, preexec_fn=os.setsid,
                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -208,30 +333,242 @@ def record_until_silence(out_wav):
     recording_proc = None
 
 
-def converse(persona, in_wav, out_wav):
-    """POST to FastAPI /converse; save reply to out_wav. Fallback to click if it fails."""
-    try:
-        log(f"[NET] POST {SERVER}")
+class StreamPlayer:
+    """
+    Raw S16LE mono PCM → the audio engine's stream voice (or aplay's stdin), as it downloads.
+    Playback starts once jitter_ms of audio is buffered (or the reply ends), so a late network
+    chunk doesn't stutter the start; after that the voice's queue (or the pipe) and ALSA's
+    own buffer absorb the gaps.
+    """
+
+    def __init__(self, sr: int = REPLY_SR, jitter_ms: int = REPLY_JITTER_MS):
+        self.sr = sr
+        self.prebuffer = int(sr * 2 * jitter_ms / 1000)
+        self.buf = bytearray()
+        self.proc = None  # StreamVoice (audio engine) or aplay Popen
+        self.bytes = 0
+
+    def _start(self):
+        if ENGINE:
+            self.proc = ENGINE.stream()  # mixed into the already-open ALSA stream
+            return
+        self.proc = subprocess.Popen(
+            ["aplay", "-q", "-D", USB_DEV, "-t", "raw", "-f", "S16_LE", "-r", str(self.sr), "-c", "1", "-"],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def _drain(self) -> bool:
+        n = len(self.buf) & ~1  # whole samples only
+        if ENGINE:
+            if not self.proc.write(bytes(self.buf[:n])):
+                return False
+            del self.buf[:n]
+            self.bytes += n
+            return True
+        try:
+            self.proc.stdin.write(self.buf[:n])
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            return False  # aplay killed (hang-up → stop_playing)
+        del self.buf[:n]
+        self.bytes += n
+        return True
+
+    def feed(self, data: bytes) -> bool | None:
+        """Queue PCM. True the moment audio first reaches aplay, False once playback is gone, else None."""
+        self.buf += data
+        if self.proc is None:
+            if len(self.buf) < self.prebuffer:
+                return None
+            self._start()
+            return self._drain()
+        return None if self._drain() else False
+
+    def finish(self):
+        """Play out whatever is buffered, then wait for aplay to drain."""
+        if self.proc is None and self.buf:
+            self._start()
+        if self.proc is None:
+            return
+        if self.buf:
+            self._drain()
+        if ENGINE:
+            self.proc.close()
+            self.proc.wait()
+            return
+        try:
+            self.proc.stdin.close()
+        except Exception:
+            pass
+        self.proc.wait()
+
+    def abort(self):
+        if ENGINE:
+            if self.proc:
+                self.proc.stop(fade_ms=STOP_FADE_MS)
+        elif self.proc and self.proc.poll() is None:
+            self.proc.kill()
+
+
+class HungUp(Exception):
+    pass
+
+
+class LiveQuestion:
+    """
+    arecord → in-process energy VAD → length-prefixed PCM frames for /converse/pcm, yielded
+    while the caller speaks (requests sends an iterable body with chunked transfer).
+    Leading silence is dropped except a short pre-roll; trailing silence is held back and
+    only sent if speech resumes. After VAD_END_SEC of silence (or MAX_RECORD_SEC) a
+    zero-length frame tells the server the utterance is over.
+    """
+
+    SR = 16000
+
+    def __init__(self):
+        self.t_end = None  # monotonic time the end-of-utterance frame went out
+        self.sec = 0.0
+
+    @staticmethod
+    def _frame(pcm) -> bytes:
+        return struct.pack(">I", len(pcm)) + bytes(pcm)
+
+    @staticmethod
+    def _loud(pcm: bytes) -> bool:
+        a = array("h", pcm)
+        return bool(a) and math.sqrt(sum(x * x for x in a) / len(a)) >= VAD_LEVEL * 32768
+
+    def __iter__(self):
+        global recording_proc
+        stop_playing()
+        kill_stale_capture()
+        proc = subprocess.Popen(f"{ARECORD_PAT} -t raw -f S16_LE -c1 -r{self.SR} -d {MAX_RECORD_SEC}",
+                                shell=True, preexec_fn=os.setsid,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        recording_proc = proc
+        frame_bytes = self.SR * VAD_FRAME_MS // 1000 * 2
+        start_frames = int(VAD_START_SEC * 1000 / VAD_FRAME_MS)
+        end_frames = int(VAD_END_SEC * 1000 / VAD_FRAME_MS)
+        send_bytes = self.SR * UPLOAD_CHUNK_MS // 1000 * 2
+        preroll = deque(maxlen=start_frames + 5)  # ~100 ms before the speech onset too
+        out, held = bytearray(), bytearray()
+        voiced = silent = 0
+        started = False
+        t0 = time.monotonic()
+        try:
+            while True:
+                pcm = proc.stdout.read(frame_bytes)
+                if not pcm:
+                    break  # MAX_RECORD_SEC reached (or capture killed by a hang-up)
+                if hook_on_cradle():
+                    raise HungUp()
+                loud = self._loud(pcm)
+                if not started:
+                    preroll.append(pcm)
+                    voiced = voiced + 1 if loud else 0
+                    if voiced >= start_frames:
+                        started = True
+                        out += b"".join(preroll)
+                    continue
+                if loud:
+                    out += held + pcm
+                    held.clear()
+                    silent = 0
+                else:
+                    held += pcm
+                    silent += 1
+                    if silent >= end_frames:
+                        break
+                if len(out) >= send_bytes:
+                    yield self._frame(out)
+                    out.clear()
+        finally:
+            try:
+                os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+            except Exception:
+                pass
+            recording_proc = None
+        if hook_on_cradle():
+            raise HungUp()
+        if out:
+            yield self._frame(out)
+        self.sec = round(time.monotonic() - t0, 2)
+        self.t_end = time.monotonic()
+        emit("record_done", {"sec": self.sec})
+        log("[LLM] Utterance sent; waiting for the reply…")
         schedule_filler(1.0)
-        rc = subprocess.call([
-            "curl","-s","-X","POST",
-            "-F", f"persona={persona}",
-            "-F", f"audio=@{in_wav};type=audio/wav",
-            SERVER, "-o", out_wav
-        ])
-        cancel_filler_schedule()
-        stop_filler()
-        if rc != 0 or not os.path.exists(out_wav) or os.path.getsize(out_wav) < 44:
-            raise RuntimeError("server failed")
+        yield self._frame(b"")
+
+
+REPLY_FIELDS = {"format": "pcm", "sample_rate": REPLY_SR, "channels": 1}
+
+def converse_and_play(persona, question) -> bool | None:
+    """
+    POST to FastAPI /converse?stream=1 (a recorded file) or /converse/pcm?stream=1 (a
+    LiveQuestion, uploaded while the caller speaks) and play the reply while it downloads.
+    The filler is cut at the first reply bytes. Falls back to a click if the call fails;
+    None if the caller hung up while still speaking.
+    """
+    t0 = time.monotonic()
+    live = isinstance(question, LiveQuestion)
+    player = StreamPlayer()
+    first_sound = None
+    f = None
+    try:
+        if live:
+            post = dict(url=f"{SERVER}/pcm", data=question, headers={"Content-Type": "application/octet-stream"},
+                        params={"persona": persona, "stream": 1, **REPLY_FIELDS})
+        else:
+            schedule_filler(1.0)
+            f = open(question, "rb")
+            post = dict(url=SERVER, params={"stream": 1}, data={"persona": persona, **REPLY_FIELDS},
+                        files={"audio": (os.path.basename(question), f, UPLOAD_MIME.get(UPLOAD_FMT, "audio/wav"))})
+        log(f"[NET] POST {post['url']}?stream=1")
+        with requests.post(**post, stream=True, timeout=(5, 60)) as r:
+            if live:
+                t0 = question.t_end or t0  # latency the caller hears starts when they stop talking
+            if r.status_code != 200:
+                raise RuntimeError(f"server returned {r.status_code}")
+            for chunk in r.iter_content(chunk_size=None):
+                if not chunk:
+                    continue
+                if player.proc is None and not player.buf:  # first reply audio: silence the filler
+                    cancel_filler_schedule()
+                    stop_filler()
+                started = player.feed(chunk)
+                if started:
+                    first_sound = int((time.monotonic() - t0) * 1000)
+                    log(f"[PLAY] first sound {first_sound} ms after {'end of speech' if live else 'upload start'}")
+                    emit("first_sound", {"ms": first_sound})
+                elif started is False or hook_on_cradle():
+                    player.abort()
+                    return True
+        if not player.bytes and not player.buf:
+            raise RuntimeError("empty reply")
+        if first_sound is None:  # reply shorter than the jitter buffer
+            first_sound = int((time.monotonic() - t0) * 1000)
+            log(f"[PLAY] first sound {first_sound} ms after {'end of speech' if live else 'upload start'}")
+            emit("first_sound", {"ms": first_sound})
+        player.finish()
         return True
+    except HungUp:
+        player.abort()
+        cancel_filler_schedule()
+        return None
     except Exception as e:
         log(f"[NET] ERROR posting to server: {e}")
+        player.abort()
+        cancel_filler_schedule()
         stop_filler()
+        if player.bytes:  # died mid-reply: keep what was heard, no click
+            return True
         click = find_sound("click.wav")
         if click:
-            subprocess.call(["cp", click, out_wav])
+            p = play_wav(click);  p and p.wait()
         emit("call_end", {"reason": "net_error"})
-        return True
+        return False
+    finally:
+        if f:
+            f.close()
 
 # ---- digit handling ----
 def cancel_flush_timer():
@@ -329,17 +666,19 @@ def finalize_digit():
         else:
             log("[GREET] greet_einstein.wav not found; skipping.")
 
-        # record question
-        qwav = os.path.expanduser("~/timephone/question.wav")
-        rwav = os.path.expanduser("~/timephone/reply.wav")
+        # record question: streamed to the server while the caller speaks, or to a file first
         log("[REC] Ask your question… (auto-stops after silence or hard cap)")
         emit("record_start", {})
-        t0 = time.monotonic()
-        record_until_silence(qwav)
-        dur = round(time.monotonic() - t0, 2)
-        emit("record_done", {"sec": dur})
+        if UPLOAD_STREAM:
+            ok = converse_and_play(persona, LiveQuestion())
+        else:
+            qwav = os.path.expanduser(f"~/timephone/question.{UPLOAD_FMT}")
+            t0 = time.monotonic()
+            record_until_silence(qwav)
+            emit("record_done", {"sec": round(time.monotonic() - t0, 2)})
+            ok = None if hook_on_cradle() else converse_and_play(persona, qwav)
 
-        if hook_on_cradle():
+        if ok is None:
             log("[HOOK] Hung up during record; abort.")
             stop_filler()
             stop_playing()
@@ -348,20 +687,16 @@ def finalize_digit():
             reset_call_state()
             return
 
-        # send to LLM & play reply
-        log("[LLM] Sending to server…")
-        ok = converse(persona, qwav, rwav)
-        if ok and not hook_on_cradle():
-            log("[PLAY] Reply…")
-            p = play_wav(rwav);  p and p.wait()
         stop_filler()
         stop_playing()
-        emit("call_end", {"reason": "ok"})
+        if ok:
+            emit("call_end", {"reason": "ok"})
 
 # ---- graceful shutdown ----
 def _sigterm(*_):
     try:
         on_hook_down()
+        flush_events()
     finally:
         os._exit(0)
 
@@ -369,7 +704,10 @@ def main():
     signal.signal(signal.SIGTERM, _sigterm)
     signal.signal(signal.SIGINT, _sigterm)
 
+    start_event_sender()
+
     # cold-start hygiene
+    start_audio_engine()
     stop_playing()
     kill_stale_capture()
 
@@ -12,16 +12,16 @@ sd.wait()
 sf.write("last_input.wav", audio, SR, format="WAV", subtype="PCM_16")
 print("✅ Saved your input to last_input.wav")
 
-# Send to server
+# Send to server (FLAC: same audio, far fewer bytes; the server decodes it in memory)
 buf = io.BytesIO()
-sf.write(buf, audio, SR, format="WAV")
+sf.write(buf, audio, SR, format="FLAC")
 buf.seek(0)
 
 print("Sending to server...")
 r = requests.post(
     API,
     data={"persona": "Albert Einstein"},
-    files={"audio": ("ask.wav", buf.getvalue(), "audio/wav")},
+    files={"audio": ("ask.flac", buf.getvalue(), "audio/flac")},
     timeout=120
 )
 
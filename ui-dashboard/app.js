@@ -82,7 +82,7 @@
       },
 
       // Append final reply instead of replacing (so greeting/filler lines remain)
-      setReply(text, used, ms) {
+      setReply(text, used, ms, cache) {
         const cont = body.querySelector(".reply");
         const line = document.createElement("div");
         line.textContent = text || "";
@@ -90,7 +90,7 @@
         this.times.llm = ms ?? this.times.llm;
         header.querySelector(".llm").textContent = `LLM: ${prettyMs(
           this.times.llm
-        )}${used ? "" : " (fallback)"}`;
+        )}${used ? "" : cache === "exact" || cache === "near" ? " (cached)" : " (fallback)"}`;
       },
 
       // Generic appender (for greeting / filler lines)
@@ -240,6 +240,11 @@
         if (card) card.note("Transcribing…");
         break;
       }
+      case "stt_partial": {
+        const card = ensureActiveCard(raw);
+        if (card) card.note(`Hearing… “${data.transcript || ""}”`);
+        break;
+      }
       case "stt_done": {
         const card = ensureActiveCard(raw);
         if (card) {
@@ -270,7 +275,7 @@
       case "llm_done": {
         const card = ensureActiveCard(raw);
         if (card) {
-          card.setReply(data.reply || "", !!data.used, data.ms);
+          card.setReply(data.reply || "", !!data.used, data.ms, data.cache);
           card.note("");
         }
         break;
@@ -280,6 +285,11 @@
         if (card) card.note("Speaking…");
         break;
       }
+      case "tts_first_audio": {
+        const card = ensureActiveCard(raw);
+        if (card) card.note(`Speaking… (first audio ${prettyMs(data.ms)})`);
+        break;
+      }
       case "tts_done": {
         const card = ensureActiveCard(raw);
         if (card) {
@@ -325,12 +335,14 @@
     "record_start",
     "record_done",
     "stt_start",
+    "stt_partial",
     "stt_done",
     "filler_start",
     "filler_stop",
     "llm_start",
     "llm_done",
     "tts_start",
+    "tts_first_audio",
     "tts_done",
     "call_end",
     "test",